@@ -1,178 +1,468 @@
-from flask import Flask, request, jsonify
+from flask import Flask, Response, g, request, jsonify
 from flask_cors import CORS
-from morphik import Morphik
-from dotenv import load_dotenv
-import os
 import json
+import os
 
-# Load environment variables
-load_dotenv()
+import settings
+from document_catalog import DocumentCatalog
+from metrics import (
+    PROMETHEUS_CONTENT_TYPE, REGISTRY, SEARCHES, finish_request, new_request_id, record_cache_stats,
+    start_request, timed_stage
+)
+from morphik_client import morphik_clients
+from query_log import WARMUP_HEADER, QueryLog, start_warmup
+from resilience import morphik_calls
+from search_cache import SearchCache
+from search_filters import to_morphik_filters
+from search_service import (
+    chunks_missing_documents, choose_engine, clause_lookup_response, completion_source_ids,
+    definition_search_response, format_catalog_documents, format_chunk_results, format_completion_results,
+    format_document_list, get_citation_graph, get_clause_index, get_glossary_index, get_local_index,
+    get_suggest_index, local_search_response, parse_clause_request, parse_definition_request,
+    parse_related_request, parse_search_request, parse_suggest_request, start_suggest_index_build
+)
+from semantic_cache import SemanticCache
+from single_flight import SingleFlight
 
 app = Flask(__name__)
 CORS(app, origins=["https://ecss-hunt.vercel.app"])  # Enable CORS for Vercel frontend
 
-# Initialize Morphik client
+# Search results shared by all requests of this worker (and, with Redis, all workers)
+search_cache = SearchCache()
+
+# Generated answers, reused for paraphrased queries with the same filters
+semantic_cache = SemanticCache()
+
+# Searches currently waiting on Morphik, by cache key
+search_flights = SingleFlight()
+
+# external_id -> filename/metadata, so sources resolve without per-request lookups
+document_catalog = DocumentCatalog()
+
+# Sampled /api/search log, replayed into search_cache by the warm-up
+query_log = QueryLog()
+
+REGISTRY.add_collector(lambda: record_cache_stats('search', search_cache.stats()))
+REGISTRY.add_collector(lambda: record_cache_stats('catalog', document_catalog.stats()))
+REGISTRY.add_collector(lambda: record_cache_stats('semantic', semantic_cache.stats()))
+
+# Typeahead suggestions for /api/suggest
+start_suggest_index_build()
+
+@app.before_request
+def begin_request_timing():
+    """Assign a request ID and start collecting stage timings."""
+    g.request_id = new_request_id(request.headers.get('X-Request-ID'))
+    start_request(g.request_id, request.url_rule.rule if request.url_rule else 'unmatched')
+
+@app.after_request
+def end_request_timing(response):
+    """Record endpoint metrics, log one JSON timing line and echo the request ID."""
+    response.headers['X-Request-ID'] = g.get('request_id', '')
+    entry = finish_request(request.method, request.full_path.rstrip('?'), response.status_code,
+                           **g.get('log_fields', {}))
+    if entry and 'outcome' in entry and g.get('search_cache_key') and WARMUP_HEADER not in request.headers:
+        query_log.record(request.args, g.search_cache_key, entry['engine'], entry['outcome'], entry['duration_ms'])
+    return response
+
+def json_response(payload):
+    """jsonify() with its serialization time recorded as a request stage."""
+    with timed_stage('serialize'):
+        return jsonify(payload)
+
+def search_outcome(engine: str, outcome: str) -> None:
+    """Count a finished search and attach engine/outcome to its timing log line."""
+    SEARCHES.inc(engine=engine, outcome=outcome)
+    g.log_fields = {'engine': engine, 'outcome': outcome}
+
+# Shared Morphik client
 def get_morphik_client():
-    """Get Morphik client instance."""
-    morphik_uri = os.getenv("MORPHIK_URI")
-    if not morphik_uri:
-        print("⚠ MORPHIK_URI not set in .env file")
-        return None
+    """Get the process-wide pooled Morphik client."""
+    with timed_stage('morphik.client'):
+        client = morphik_clients.get_client()
+    if client is not None:
+        document_catalog.start_refresher(morphik_clients.get_client)
+    return client
+
+def fetch_documents(db):
+    """batch_get_documents under the read deadline, for catalog misses."""
+    def fetch(external_ids):
+        return morphik_calls.call('batch_get_documents', db.batch_get_documents, external_ids,
+                                  deadline=settings.MORPHIK_READ_DEADLINE, hedge=True)
+    return fetch
+
+def morphik_search(db, query: str, filters: dict) -> list:
+    """
+    Run a RAG query against Morphik and convert the answer to our result format.
     
-    try:
-        return Morphik(uri=morphik_uri)
-    except Exception as e:
-        print(f"✗ Failed to connect to Morphik: {e}")
-        return None
+    Filters are applied by Morphik during retrieval, so the completion is
+    grounded only on matching standards. Generation is not idempotent, so
+    it is never hedged.
+    """
+    print(f"Searching Morphik for: '{query}' (filters: {filters or 'none'})")
+    morphik_response = morphik_calls.call('query', db.query, query, filters=to_morphik_filters(filters),
+                                          deadline=settings.MORPHIK_QUERY_DEADLINE)
+    
+    # Get document info from sources (catalog lookup, no extra round-trip)
+    documents = document_catalog.resolve(completion_source_ids(morphik_response), fetch_documents(db))
+    return format_completion_results(morphik_response, documents)
+
+def morphik_retrieve(db, query: str, filters: dict, limit: int, offset: int) -> list:
+    """Retrieve the top-ranked chunks for a query without generating an answer."""
+    print(f"Retrieving from Morphik: '{query}' (filters: {filters or 'none'}, offset {offset}, limit {limit})")
+    chunks = morphik_calls.call(
+        'retrieve_chunks',
+        db.retrieve_chunks,
+        query,
+        filters=to_morphik_filters(filters),
+        k=offset + limit,
+        use_colpali=settings.RETRIEVAL_USE_COLPALI,
+        deadline=settings.MORPHIK_READ_DEADLINE,
+        hedge=True
+    )
+    chunks = chunks[offset:offset + limit]
+    
+    # Chunks usually carry their document's metadata; resolve the rest in one lookup
+    documents = document_catalog.resolve(chunks_missing_documents(chunks), fetch_documents(db))
+    return format_chunk_results(chunks, documents)
+
+def morphik_search_response(db, params: dict) -> dict:
+    """Build (and cache) the /api/search response for a Morphik search."""
+    filters, limit, offset, generate = params['filters'], params['limit'], params['offset'], params['generate']
+    if generate:
+        results = morphik_search(db, params['query'], filters)
+    else:
+        results = morphik_retrieve(db, params['query'], filters, limit, offset)
+    
+    response = {
+        'results': results,
+        'total': len(results),
+        'query': params['query'],
+        'engine': 'morphik',
+        'offset': offset,
+        'limit': limit,
+        'generated': generate
+    }
+    if results:
+        search_cache.set(params['cache_key'], response)
+        if generate:
+            semantic_cache.set(params['query'], params['context_key'], response)
+    return response
+
+def degraded_search_response(params: dict, index, error: str):
+    """
+    Best answer available without Morphik.
+    
+    Serves the last cached result for the same request even if expired,
+    then the local index, and only then the error.
+    """
+    query = params['query']
+    stale = search_cache.get_stale(params['cache_key'])
+    if stale is not None:
+        search_outcome(stale.get('engine', 'morphik'), 'stale')
+        return json_response({**stale, 'query': query, 'cached': True, 'stale': True, 'degraded': True})
+    if index is not None:
+        search_outcome('local', 'fallback')
+        return json_response({**local_search_response(index, params), 'degraded': True})
+    search_outcome('morphik', 'error')
+    return json_response({
+        'results': [],
+        'total': 0,
+        'error': error,
+        'query': query,
+        'degraded': True
+    })
 
 @app.route('/api/search', methods=['GET'])
 def search():
-    """Search ECSS documents using Morphik."""
+    """
+    Search ECSS documents using Morphik or the local BM25 index.
+    
+    By default returns a page of ranked chunks (limit/offset) without calling
+    the LLM; generate=true returns a synthesized answer instead. Queries that
+    are only a clause reference ("ECSS-E-ST-40C 5.4.2.1a") are answered from
+    the clause index when it has the clause.
+    """
     query = request.args.get('q', '')
     
     if not query.strip():
-        return jsonify({
+        return json_response({
             'results': [],
             'total': 0,
             'query': query
         })
     
-    try:
-        # Get Morphik client
-        db = get_morphik_client()
-        if not db:
-            return jsonify({
+    params, error = parse_search_request(request.args)
+    if error:
+        return json_response({
+            'results': [],
+            'total': 0,
+            'error': error,
+            'query': query
+        }), 400
+    g.search_cache_key = params['cache_key']
+    
+    clause_index = get_clause_index() if not params['generate'] else None
+    if clause_index is not None:
+        with timed_stage('clause'):
+            response = clause_lookup_response(clause_index, params)
+        if response is not None:
+            search_outcome('clause', 'ok')
+            return json_response(response)
+    
+    glossary_index = get_glossary_index() if not params['generate'] else None
+    if glossary_index is not None:
+        with timed_stage('glossary'):
+            response = definition_search_response(glossary_index, params)
+        if response is not None:
+            search_outcome('glossary', 'ok')
+            return json_response(response)
+    
+    cached = search_cache.get(params['cache_key'])
+    if cached is not None:
+        search_outcome(cached.get('engine', params['engine']), 'cached')
+        return json_response({**cached, 'query': query, 'cached': True})
+    
+    if params['generate'] and params['engine'] != 'local':
+        # Generation is the expensive path: reuse the answer to a paraphrase of this query
+        match = semantic_cache.get(query, params['context_key'])
+        if match is not None:
+            cached, matched_query, similarity = match
+            search_outcome(cached.get('engine', 'morphik'), 'semantic')
+            return json_response({**cached, 'query': query, 'cached': True,
+                                  'matched_query': matched_query, 'similarity': round(similarity, 4)})
+    
+    index = get_local_index() if params['engine'] in ('local', 'auto') else None
+    engine = choose_engine(params, index)
+    
+    if engine == 'local':
+        if index is None:
+            search_outcome('local', 'error')
+            return json_response({
                 'results': [],
                 'total': 0,
-                'error': 'Morphik connection failed',
+                'error': 'Local index not available, run local_index.py to build it',
                 'query': query
             })
+        response = local_search_response(index, params)
+        search_cache.set(params['cache_key'], response)
+        search_outcome('local', 'ok')
+        return json_response(response)
+    
+    if morphik_calls.breaker.rejects_calls():
+        # Morphik keeps failing: answer at once instead of waiting on it
+        return degraded_search_response(params, index, 'Morphik unavailable (circuit open)')
+    
+    try:
+        # Get Morphik client
+        db = get_morphik_client()
+        if not db:
+            return degraded_search_response(params, index, 'Morphik connection failed')
         
-        # Search using Morphik
-        print(f"Searching Morphik for: '{query}'")
-        morphik_response = db.query(query)
-        
-        # Convert Morphik response to our format
-        results = []
+        # Identical concurrent searches share one Morphik call
+        response, coalesced = search_flights.do(
+            params['cache_key'], lambda: morphik_search_response(db, params), lookup=search_cache.peek)
         
-        if morphik_response and hasattr(morphik_response, 'completion'):
-            # Get document info from sources
-            document_info = None
-            if hasattr(morphik_response, 'sources') and morphik_response.sources:
-                # Get the first source document
-                first_source = morphik_response.sources[0]
-                doc_id = getattr(first_source, 'document_id', None)
-                
-                if doc_id:
-                    try:
-                        document = db.get_document(doc_id)
-                        document_info = {
-                            'filename': getattr(document, 'filename', 'Unknown'),
-                            'metadata': getattr(document, 'metadata', {})
-                        }
-                    except Exception as e:
-                        print(f"Error getting document {doc_id}: {e}")
-            
-            # Create result
-            result = {
-                'id': getattr(morphik_response.sources[0], 'document_id', '1') if morphik_response.sources else '1',
-                'title': document_info['filename'] if document_info else 'ECSS Document',
-                'content': morphik_response.completion,
-                'score': 0.95,  # Default score
-                'relevance': getattr(morphik_response.sources[0], 'score', 0) if morphik_response.sources else 0,
-                'metadata': document_info['metadata'] if document_info else {
-                    'branch': 'S',
-                    'branch_name': 'Space Product Assurance',
-                    'discipline': 'ST',
-                    'discipline_name': 'Space Systems',
-                    'document_number': '00C',
-                    'revision': '1',
-                    'filename': document_info['filename'] if document_info else 'Unknown',
-                    'document_type': 'ECSS_Standard',
-                    'source': 'ECSS_Published_Standards'
-                }
-            }
-            results.append(result)
-        
-        return jsonify({
-            'results': results,
-            'total': len(results),
-            'query': query
-        })
+        search_outcome('morphik', 'coalesced' if coalesced else 'ok')
+        return json_response({**response, 'query': query})
         
     except Exception as e:
         print(f"Search error: {e}")
-        return jsonify({
+        morphik_clients.report_failure(e)
+        return degraded_search_response(params, index, str(e))
+
+@app.route('/api/suggest', methods=['GET'])
+def suggest():
+    """
+    Typeahead suggestions for a prefix: standard numbers, branch and
+    discipline names and frequent terms, best first (limit, default 8).
+    """
+    prefix, limit = parse_suggest_request(request.args)
+    suggestions = get_suggest_index().suggest(prefix, limit)
+    return json_response({'query': prefix, 'suggestions': suggestions, 'total': len(suggestions)})
+
+@app.route('/api/clause', methods=['GET'])
+def clause_lookup():
+    """
+    Look up a clause or requirement by number in the clause index.
+    
+    Takes standard and clause ("E-ST-40C", "5.4.2.1a"), or q with a full
+    reference; without a standard every standard with that clause is listed
+    (Active standards first, newest first).
+    """
+    params, error = parse_clause_request(request.args)
+    if error:
+        return json_response({'results': [], 'total': 0, 'error': error}), 400
+    
+    index = get_clause_index()
+    if index is None:
+        return json_response({
             'results': [],
             'total': 0,
-            'error': str(e),
-            'query': query
-        })
+            'error': 'Clause index not available, run clause_index.py to build it'
+        }), 503
+    
+    results = index.lookup(params['clause'], params['standard'], params['filters'])
+    response = {
+        'results': results,
+        'total': len(results),
+        'clause': params['clause'],
+        'standard': params['standard']
+    }
+    if not results:
+        return json_response({**response, 'error': 'Clause not found'}), 404
+    return json_response(response)
+
+@app.route('/api/define', methods=['GET'])
+def define():
+    """
+    Definitions of a term from the ECSS glossary and the standards'
+    "Terms, definitions and abbreviated terms" clauses, glossary first.
+    """
+    params, error = parse_definition_request(request.args)
+    if error:
+        return json_response({'results': [], 'total': 0, 'error': error}), 400
+    
+    index = get_glossary_index()
+    if index is None:
+        return json_response({
+            'results': [],
+            'total': 0,
+            'error': 'Glossary index not available, run glossary_index.py to build it'
+        }), 503
+    
+    results = index.lookup(params['term'], params['filters'])
+    response = {'results': results, 'total': len(results), 'term': params['term']}
+    if not results:
+        return json_response({**response, 'error': 'Term not defined'}), 404
+    return json_response(response)
+
+@app.route('/api/related', methods=['GET'])
+def related_documents():
+    """
+    Standards related to one standard through citations.
+    
+    Returns the standards it cites (outbound) and those citing it (inbound),
+    with mention counts, and every standard reachable within depth hops in
+    the given direction (out, in or both).
+    """
+    params, error = parse_related_request(request.args)
+    if error:
+        return json_response({'error': error}), 400
+    
+    graph = get_citation_graph()
+    if graph is None:
+        return json_response({'error': 'Citation graph not available, run citation_graph.py to build it'}), 503
+    
+    doc_id = graph.find(params['standard'])
+    if doc_id is None:
+        return json_response({'error': f"Unknown standard '{params['standard']}'"}), 404
+    return json_response(graph.related(doc_id, params['depth'], params['direction']))
 
 @app.route('/api/documents', methods=['GET'])
 def list_documents():
-    """List all documents in Morphik."""
+    """List all documents in Morphik (from the document catalog while Morphik is unavailable)."""
     try:
+        if morphik_calls.breaker.rejects_calls():
+            return catalog_documents_response('Morphik unavailable (circuit open)')
+        
         db = get_morphik_client()
         if not db:
-            return jsonify({
-                'documents': [],
-                'total': 0,
-                'error': 'Morphik connection failed'
-            })
+            return catalog_documents_response('Morphik connection failed')
         
-        documents = db.list_documents()
+        documents = morphik_calls.call('list_documents', db.list_documents,
+                                       deadline=settings.MORPHIK_READ_DEADLINE, hedge=True)
+        documents = getattr(documents, 'documents', documents)
+        document_catalog.update(documents)
         
-        doc_list = []
-        for doc in documents:
-            doc_info = {
-                'id': getattr(doc, 'external_id', 'Unknown'),
-                'filename': getattr(doc, 'filename', 'Unknown'),
-                'status': getattr(doc, 'system_metadata', {}).get('status', 'Unknown'),
-                'metadata': getattr(doc, 'metadata', {})
-            }
-            doc_list.append(doc_info)
+        doc_list = format_document_list(documents)
         
-        return jsonify({
+        return json_response({
             'documents': doc_list,
             'total': len(doc_list)
         })
         
     except Exception as e:
         print(f"Error listing documents: {e}")
-        return jsonify({
-            'documents': [],
-            'total': 0,
-            'error': str(e)
-        })
+        morphik_clients.report_failure(e)
+        return catalog_documents_response(str(e))
+
+def catalog_documents_response(error: str):
+    """Degraded /api/documents answer built from the document catalog."""
+    doc_list = format_catalog_documents(document_catalog.entries())
+    response = {
+        'documents': doc_list,
+        'total': len(doc_list),
+        'degraded': True
+    }
+    if not doc_list:
+        response['error'] = error
+    return json_response(response)
 
 @app.route('/api/health', methods=['GET'])
 def health_check():
     """Health check endpoint."""
     try:
         db = get_morphik_client()
-        if db:
-            return jsonify({
+        if db and not morphik_calls.breaker.is_open():
+            return json_response({
                 'status': 'healthy',
-                'morphik_connected': True
+                'morphik_connected': True,
+                'pool': morphik_clients.stats(),
+                'cache': search_cache.stats(),
+                'catalog': document_catalog.stats(),
+                'resilience': morphik_calls.stats(),
+                'semantic_cache': semantic_cache.stats(),
+                'single_flight': search_flights.stats(),
+                'query_log': query_log.stats()
             })
         else:
-            return jsonify({
+            return json_response({
                 'status': 'degraded',
-                'morphik_connected': False
+                'morphik_connected': db is not None,
+                'pool': morphik_clients.stats(),
+                'cache': search_cache.stats(),
+                'catalog': document_catalog.stats(),
+                'resilience': morphik_calls.stats(),
+                'semantic_cache': semantic_cache.stats(),
+                'single_flight': search_flights.stats(),
+                'query_log': query_log.stats()
             })
     except Exception as e:
-        return jsonify({
+        return json_response({
             'status': 'unhealthy',
             'morphik_connected': False,
             'error': str(e)
         })
 
+@app.route('/api/metrics', methods=['GET'])
+def metrics():
+    """Prometheus metrics of this worker process."""
+    return Response(REGISTRY.render(), content_type=PROMETHEUS_CONTENT_TYPE)
+
+def replay_search(params: dict) -> bool:
+    """Run a logged search through /api/search so its response lands in search_cache."""
+    response = app.test_client().get('/api/search', query_string=params, headers={WARMUP_HEADER: '1'})
+    return response.status_code == 200 and 'error' not in response.get_json()
+
+# Replay the most frequent logged searches in the background once the routes exist;
+# under the debug reloader only in the serving child, not in the watching parent
+if __name__ != '__main__' or os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+    start_warmup(query_log, replay_search, lambda key: search_cache.peek(key) is not None,
+                 shared=search_cache.shared is not None)
+
 if __name__ == '__main__':
     print("Starting ECSS Standards Navigator API Server...")
     print("Available endpoints:")
-    print("  GET /api/search?q=<query> - Search ECSS documents")
+    print("  GET /api/search?q=<query>&engine=morphik|local|auto - Search ECSS documents")
+    print("      filters: branch, discipline, revision, status=Active|Superseded, date_from, date_to")
+    print("      paging: limit, offset; generate=true returns an LLM answer instead of ranked chunks")
+    print("  GET /api/suggest?q=<prefix>&limit=<n> - Typeahead suggestions")
+    print("  GET /api/clause?standard=<E-ST-40C>&clause=<5.4.2.1a> - Look up a clause or requirement")
+    print("  GET /api/define?term=<term> - Definitions of a term")
+    print("  GET /api/related?standard=<E-ST-40C>&depth=<n>&direction=out|in|both - Citing and cited standards")
     print("  GET /api/documents - List all documents")
     print("  GET /api/health - Health check")
+    print("  GET /api/metrics - Prometheus metrics")
     
     app.run(host='0.0.0.0', port=5000, debug=True) 
\ No newline at end of file
@@ -0,0 +1,471 @@
+import asyncio
+
+from quart import Quart, Response, g, request, jsonify
+from quart_cors import cors
+
+import settings
+from document_catalog import DocumentCatalog
+from metrics import (
+    PROMETHEUS_CONTENT_TYPE, REGISTRY, SEARCHES, finish_request, new_request_id, record_cache_stats,
+    start_request, timed_stage
+)
+from morphik_client import async_morphik_clients, morphik_clients
+from query_log import WARMUP_HEADER, QueryLog, start_warmup
+from resilience import morphik_calls
+from search_cache import SearchCache
+from search_filters import to_morphik_filters
+from search_service import (
+    chunks_missing_documents, choose_engine, clause_lookup_response, completion_source_ids,
+    definition_search_response, format_catalog_documents, format_chunk_results, format_completion_results,
+    format_document_list, get_citation_graph, get_clause_index, get_glossary_index, get_local_index,
+    get_suggest_index, local_search_response, parse_clause_request, parse_definition_request,
+    parse_related_request, parse_search_request, parse_suggest_request, start_suggest_index_build
+)
+from semantic_cache import SemanticCache
+from single_flight import AsyncSingleFlight
+
+app = Quart(__name__)
+app = cors(app, allow_origin=["https://ecss-hunt.vercel.app"])  # Enable CORS for Vercel frontend
+
+# Search results shared by all requests of this worker (and, with Redis, all workers)
+search_cache = SearchCache()
+
+# Generated answers, reused for paraphrased queries with the same filters
+semantic_cache = SemanticCache()
+
+# Searches currently waiting on Morphik, by cache key
+search_flights = AsyncSingleFlight()
+
+# external_id -> filename/metadata, so sources resolve without per-request lookups
+document_catalog = DocumentCatalog()
+
+# Sampled /api/search log, replayed into search_cache by the warm-up
+query_log = QueryLog()
+
+REGISTRY.add_collector(lambda: record_cache_stats('search', search_cache.stats()))
+REGISTRY.add_collector(lambda: record_cache_stats('catalog', document_catalog.stats()))
+REGISTRY.add_collector(lambda: record_cache_stats('semantic', semantic_cache.stats()))
+
+
+@app.before_request
+async def begin_request_timing():
+    """Assign a request ID and start collecting stage timings."""
+    g.request_id = new_request_id(request.headers.get('X-Request-ID'))
+    start_request(g.request_id, request.url_rule.rule if request.url_rule else 'unmatched')
+
+
+@app.after_request
+async def end_request_timing(response):
+    """Record endpoint metrics, log one JSON timing line and echo the request ID."""
+    response.headers['X-Request-ID'] = g.get('request_id', '')
+    entry = finish_request(request.method, request.full_path.rstrip('?'), response.status_code,
+                           **g.get('log_fields', {}))
+    if entry and 'outcome' in entry and g.get('search_cache_key') and WARMUP_HEADER not in request.headers:
+        await asyncio.to_thread(query_log.record, request.args, g.search_cache_key, entry['engine'],
+                                entry['outcome'], entry['duration_ms'])
+    return response
+
+
+def json_response(payload):
+    """jsonify() with its serialization time recorded as a request stage."""
+    with timed_stage('serialize'):
+        return jsonify(payload)
+
+
+def search_outcome(engine: str, outcome: str) -> None:
+    """Count a finished search and attach engine/outcome to its timing log line."""
+    SEARCHES.inc(engine=engine, outcome=outcome)
+    g.log_fields = {'engine': engine, 'outcome': outcome}
+
+
+def get_morphik_client():
+    """Get this worker's pooled AsyncMorphik client."""
+    with timed_stage('morphik.client'):
+        client = async_morphik_clients.get_client()
+    if client is not None:
+        # The background refresher runs in a thread with the synchronous client
+        document_catalog.start_refresher(morphik_clients.get_client)
+    return client
+
+
+async def resolve_documents(db, external_ids: list) -> dict:
+    """Catalog lookup; misses are fetched with one non-blocking batch request."""
+    found, missing = document_catalog.lookup(external_ids)
+    if missing:
+        try:
+            document_catalog.add_fetched(found, await morphik_calls.async_call(
+                'batch_get_documents', db.batch_get_documents, missing,
+                deadline=settings.MORPHIK_READ_DEADLINE, hedge=True))
+        except Exception as e:
+            print(f"Error fetching documents {missing}: {e}")
+    return found
+
+
+async def morphik_retrieve(db, query: str, filters: dict, limit: int, offset: int) -> list:
+    """Retrieve the top-ranked chunks for a query without generating an answer."""
+    print(f"Retrieving from Morphik: '{query}' (filters: {filters or 'none'}, offset {offset}, limit {limit})")
+    chunks = await morphik_calls.async_call(
+        'retrieve_chunks',
+        db.retrieve_chunks,
+        query,
+        filters=to_morphik_filters(filters),
+        k=offset + limit,
+        use_colpali=settings.RETRIEVAL_USE_COLPALI,
+        deadline=settings.MORPHIK_READ_DEADLINE,
+        hedge=True
+    )
+    chunks = chunks[offset:offset + limit]
+    documents = await resolve_documents(db, chunks_missing_documents(chunks))
+    return format_chunk_results(chunks, documents)
+
+
+async def morphik_search(db, query: str, filters: dict, limit: int) -> tuple:
+    """
+    Generate an answer and fetch its ranked source chunks concurrently.
+
+    The completion and the chunk retrieval are independent upstream calls,
+    so the response costs one round-trip instead of two; document metadata
+    for both is then resolved in a single lookup. Only the retrieval is
+    hedged, generation is not idempotent.
+
+    Returns:
+        (answer results, source chunk results)
+    """
+    print(f"Searching Morphik for: '{query}' (filters: {filters or 'none'})")
+    morphik_filters = to_morphik_filters(filters)
+    morphik_response, chunks = await asyncio.gather(
+        morphik_calls.async_call('query', db.query, query, filters=morphik_filters,
+                                 deadline=settings.MORPHIK_QUERY_DEADLINE),
+        morphik_calls.async_call('retrieve_chunks', db.retrieve_chunks, query, filters=morphik_filters, k=limit,
+                                 use_colpali=settings.RETRIEVAL_USE_COLPALI,
+                                 deadline=settings.MORPHIK_READ_DEADLINE, hedge=True)
+    )
+
+    documents = await resolve_documents(
+        db, completion_source_ids(morphik_response) + chunks_missing_documents(chunks))
+    return format_completion_results(morphik_response, documents), format_chunk_results(chunks, documents)
+
+
+async def morphik_search_response(db, params: dict) -> dict:
+    """Build (and cache) the /api/search response for a Morphik search."""
+    filters, limit, offset, generate = params['filters'], params['limit'], params['offset'], params['generate']
+    response = {
+        'query': params['query'],
+        'engine': 'morphik',
+        'offset': offset,
+        'limit': limit,
+        'generated': generate
+    }
+    if generate:
+        results, sources = await morphik_search(db, params['query'], filters, limit)
+        response['sources'] = sources
+    else:
+        results = await morphik_retrieve(db, params['query'], filters, limit, offset)
+    response.update(results=results, total=len(results))
+
+    if results:
+        await asyncio.to_thread(search_cache.set, params['cache_key'], response)
+        if generate:
+            semantic_cache.set(params['query'], params['context_key'], response)
+    return response
+
+
+async def degraded_search_response(params: dict, index, error: str):
+    """
+    Best answer available without Morphik.
+
+    Serves the last cached result for the same request even if expired,
+    then the local index, and only then the error.
+    """
+    query = params['query']
+    stale = await asyncio.to_thread(search_cache.get_stale, params['cache_key'])
+    if stale is not None:
+        search_outcome(stale.get('engine', 'morphik'), 'stale')
+        return json_response({**stale, 'query': query, 'cached': True, 'stale': True, 'degraded': True})
+    if index is not None:
+        search_outcome('local', 'fallback')
+        return json_response({**await asyncio.to_thread(local_search_response, index, params), 'degraded': True})
+    search_outcome('morphik', 'error')
+    return json_response({
+        'results': [],
+        'total': 0,
+        'error': error,
+        'query': query,
+        'degraded': True
+    })
+
+
+def catalog_documents_response(error: str):
+    """Degraded /api/documents answer built from the document catalog."""
+    doc_list = format_catalog_documents(document_catalog.entries())
+    response = {
+        'documents': doc_list,
+        'total': len(doc_list),
+        'degraded': True
+    }
+    if not doc_list:
+        response['error'] = error
+    return json_response(response)
+
+
+@app.route('/api/search', methods=['GET'])
+async def search():
+    """
+    Search ECSS documents using Morphik or the local BM25 index.
+
+    Same parameters and response as api_server.py; with generate=true the
+    response additionally carries the ranked source chunks under 'sources'.
+    """
+    query = request.args.get('q', '')
+
+    if not query.strip():
+        return json_response({
+            'results': [],
+            'total': 0,
+            'query': query
+        })
+
+    params, error = parse_search_request(request.args)
+    if error:
+        return json_response({
+            'results': [],
+            'total': 0,
+            'error': error,
+            'query': query
+        }), 400
+    g.search_cache_key = params['cache_key']
+
+    clause_index = await asyncio.to_thread(get_clause_index) if not params['generate'] else None
+    if clause_index is not None:
+        with timed_stage('clause'):
+            response = clause_lookup_response(clause_index, params)
+        if response is not None:
+            search_outcome('clause', 'ok')
+            return json_response(response)
+
+    glossary_index = await asyncio.to_thread(get_glossary_index) if not params['generate'] else None
+    if glossary_index is not None:
+        with timed_stage('glossary'):
+            response = definition_search_response(glossary_index, params)
+        if response is not None:
+            search_outcome('glossary', 'ok')
+            return json_response(response)
+
+    cached = await asyncio.to_thread(search_cache.get, params['cache_key'])
+    if cached is not None:
+        search_outcome(cached.get('engine', params['engine']), 'cached')
+        return json_response({**cached, 'query': query, 'cached': True})
+
+    if params['generate'] and params['engine'] != 'local':
+        # Generation is the expensive path: reuse the answer to a paraphrase of this query
+        match = semantic_cache.get(query, params['context_key'])
+        if match is not None:
+            cached, matched_query, similarity = match
+            search_outcome(cached.get('engine', 'morphik'), 'semantic')
+            return json_response({**cached, 'query': query, 'cached': True,
+                                  'matched_query': matched_query, 'similarity': round(similarity, 4)})
+
+    # Loading and scanning the index is CPU work: keep it off the event loop
+    index = await asyncio.to_thread(get_local_index) if params['engine'] in ('local', 'auto') else None
+    engine = choose_engine(params, index)
+
+    if engine == 'local':
+        if index is None:
+            search_outcome('local', 'error')
+            return json_response({
+                'results': [],
+                'total': 0,
+                'error': 'Local index not available, run local_index.py to build it',
+                'query': query
+            })
+        response = await asyncio.to_thread(local_search_response, index, params)
+        await asyncio.to_thread(search_cache.set, params['cache_key'], response)
+        search_outcome('local', 'ok')
+        return json_response(response)
+
+    if morphik_calls.breaker.rejects_calls():
+        # Morphik keeps failing: answer at once instead of waiting on it
+        return await degraded_search_response(params, index, 'Morphik unavailable (circuit open)')
+
+    try:
+        db = get_morphik_client()
+        if not db:
+            return await degraded_search_response(params, index, 'Morphik connection failed')
+
+        # Identical concurrent searches share one Morphik call
+        response, coalesced = await search_flights.do_async(
+            params['cache_key'], lambda: morphik_search_response(db, params), lookup=search_cache.peek)
+
+        search_outcome('morphik', 'coalesced' if coalesced else 'ok')
+        return json_response({**response, 'query': query})
+
+    except Exception as e:
+        print(f"Search error: {e}")
+        await async_morphik_clients.report_failure(e)
+        return await degraded_search_response(params, index, str(e))
+
+
+@app.route('/api/suggest', methods=['GET'])
+async def suggest():
+    """Typeahead suggestions for a prefix; same parameters and response as api_server.py."""
+    prefix, limit = parse_suggest_request(request.args)
+    index = await asyncio.to_thread(get_suggest_index)
+    suggestions = index.suggest(prefix, limit)
+    return json_response({'query': prefix, 'suggestions': suggestions, 'total': len(suggestions)})
+
+
+@app.route('/api/clause', methods=['GET'])
+async def clause_lookup():
+    """Look up a clause or requirement by number; same parameters and response as api_server.py."""
+    params, error = parse_clause_request(request.args)
+    if error:
+        return json_response({'results': [], 'total': 0, 'error': error}), 400
+
+    index = await asyncio.to_thread(get_clause_index)
+    if index is None:
+        return json_response({
+            'results': [],
+            'total': 0,
+            'error': 'Clause index not available, run clause_index.py to build it'
+        }), 503
+
+    results = index.lookup(params['clause'], params['standard'], params['filters'])
+    response = {
+        'results': results,
+        'total': len(results),
+        'clause': params['clause'],
+        'standard': params['standard']
+    }
+    if not results:
+        return json_response({**response, 'error': 'Clause not found'}), 404
+    return json_response(response)
+
+
+@app.route('/api/define', methods=['GET'])
+async def define():
+    """Definitions of a term; same parameters and response as api_server.py."""
+    params, error = parse_definition_request(request.args)
+    if error:
+        return json_response({'results': [], 'total': 0, 'error': error}), 400
+
+    index = await asyncio.to_thread(get_glossary_index)
+    if index is None:
+        return json_response({
+            'results': [],
+            'total': 0,
+            'error': 'Glossary index not available, run glossary_index.py to build it'
+        }), 503
+
+    results = index.lookup(params['term'], params['filters'])
+    response = {'results': results, 'total': len(results), 'term': params['term']}
+    if not results:
+        return json_response({**response, 'error': 'Term not defined'}), 404
+    return json_response(response)
+
+
+@app.route('/api/related', methods=['GET'])
+async def related_documents():
+    """Standards related to one standard through citations; same parameters and response as api_server.py."""
+    params, error = parse_related_request(request.args)
+    if error:
+        return json_response({'error': error}), 400
+
+    graph = await asyncio.to_thread(get_citation_graph)
+    if graph is None:
+        return json_response({'error': 'Citation graph not available, run citation_graph.py to build it'}), 503
+
+    doc_id = graph.find(params['standard'])
+    if doc_id is None:
+        return json_response({'error': f"Unknown standard '{params['standard']}'"}), 404
+    return json_response(graph.related(doc_id, params['depth'], params['direction']))
+
+
+@app.route('/api/documents', methods=['GET'])
+async def list_documents():
+    """List all documents in Morphik (from the document catalog while Morphik is unavailable)."""
+    try:
+        if morphik_calls.breaker.rejects_calls():
+            return catalog_documents_response('Morphik unavailable (circuit open)')
+
+        db = get_morphik_client()
+        if not db:
+            return catalog_documents_response('Morphik connection failed')
+
+        documents = await morphik_calls.async_call('list_documents', db.list_documents,
+                                                   deadline=settings.MORPHIK_READ_DEADLINE, hedge=True)
+        documents = getattr(documents, 'documents', documents)
+        document_catalog.update(documents)
+
+        doc_list = format_document_list(documents)
+
+        return json_response({
+            'documents': doc_list,
+            'total': len(doc_list)
+        })
+
+    except Exception as e:
+        print(f"Error listing documents: {e}")
+        await async_morphik_clients.report_failure(e)
+        return catalog_documents_response(str(e))
+
+
+@app.route('/api/health', methods=['GET'])
+async def health_check():
+    """Health check endpoint."""
+    try:
+        db = get_morphik_client()
+        return json_response({
+            'status': 'healthy' if db and not morphik_calls.breaker.is_open() else 'degraded',
+            'morphik_connected': bool(db),
+            'server': 'asgi',
+            'pool': async_morphik_clients.stats(),
+            'cache': search_cache.stats(),
+            'catalog': document_catalog.stats(),
+            'resilience': morphik_calls.stats(),
+            'semantic_cache': semantic_cache.stats(),
+            'single_flight': search_flights.stats(),
+            'query_log': query_log.stats()
+        })
+    except Exception as e:
+        return json_response({
+            'status': 'unhealthy',
+            'morphik_connected': False,
+            'error': str(e)
+        })
+
+
+@app.route('/api/metrics', methods=['GET'])
+async def metrics():
+    """Prometheus metrics of this worker process."""
+    return Response(REGISTRY.render(), content_type=PROMETHEUS_CONTENT_TYPE)
+
+
+async def replay_search(params: dict) -> bool:
+    """Run a logged search through /api/search so its response lands in search_cache."""
+    response = await app.test_client().get('/api/search', query_string=params, headers={WARMUP_HEADER: '1'})
+    return response.status_code == 200 and 'error' not in await response.get_json()
+
+
+@app.before_serving
+async def build_suggest_index():
+    start_suggest_index_build()
+
+
+@app.before_serving
+async def warm_search_cache():
+    # The warm-up runs in threads; each replay is scheduled on the serving event loop
+    loop = asyncio.get_running_loop()
+    start_warmup(query_log, lambda params: asyncio.run_coroutine_threadsafe(replay_search(params), loop).result(),
+                 lambda key: search_cache.peek(key) is not None, shared=search_cache.shared is not None)
+
+
+@app.after_serving
+async def close_morphik_client():
+    await async_morphik_clients.close()
+
+
+if __name__ == '__main__':
+    print("Starting ECSS Standards Navigator API Server (ASGI)...")
+    print("Same endpoints as api_server.py; use hypercorn or uvicorn with several workers in production")
+
+    app.run(host='0.0.0.0', port=5000)
@@ -0,0 +1,195 @@
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.parse
+from typing import Callable, Dict, List, Optional
+
+import settings
+from bench_load import run_load, wait_for_url
+from bench_servers import SERVER_COMMANDS, start_server
+from fake_morphik import start_fake_morphik
+
+# Queries reused by the cached-search scenario
+CACHED_QUERIES = ['thermal vacuum testing', 'software product assurance', 'verification requirements',
+                  'space debris mitigation', 'EEE components']
+
+# Requests per 10 in the mixed scenario, by scenario name
+MIXED_WEIGHTS = {'search': 6, 'search_cached': 2, 'documents': 1, 'health': 1}
+
+# Relative throughput drop or p95 increase reported as a regression
+DEFAULT_TOLERANCE = 0.10
+
+
+def scenario_urls(base_url: str) -> Dict[str, Callable[[int], str]]:
+    """URL generator per benchmark scenario; searches vary the query to control caching."""
+    def search_url(params: Dict) -> str:
+        return f"{base_url}/api/search?{urllib.parse.urlencode(params)}"
+
+    scenarios = {
+        'health': lambda n: f"{base_url}/api/health",
+        'documents': lambda n: f"{base_url}/api/documents",
+        # A distinct query per request: always a cache miss
+        'search': lambda n: search_url({'q': f"thermal vacuum test {n}", 'engine': 'morphik'}),
+        'search_cached': lambda n: search_url({'q': CACHED_QUERIES[n % len(CACHED_QUERIES)],
+                                               'engine': 'morphik'}),
+        'search_generate': lambda n: search_url({'q': f"what is required for thermal testing {n}",
+                                                 'engine': 'morphik', 'generate': 'true'}),
+    }
+
+    mixed = [name for name, weight in MIXED_WEIGHTS.items() for _ in range(weight)]
+    scenarios['mixed'] = lambda n: scenarios[mixed[n % len(mixed)]](n)
+    return scenarios
+
+
+def response_error(body: bytes) -> Optional[str]:
+    """Count 200 responses that carry an 'error' field (upstream failure) as errors."""
+    try:
+        payload = json.loads(body)
+    except ValueError:
+        return 'invalid_json'
+    if isinstance(payload, dict) and payload.get('error'):
+        return 'error_field'
+    return None
+
+
+def git_revision() -> Dict:
+    """Commit the benchmark ran against, so results can be compared across commits."""
+    cwd = os.path.dirname(os.path.abspath(__file__))
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=cwd,
+                                capture_output=True, text=True, check=True).stdout.strip()
+        dirty = bool(subprocess.run(['git', 'status', '--porcelain', '--untracked-files=no'], cwd=cwd,
+                                    capture_output=True, text=True).stdout.strip())
+    except (OSError, subprocess.CalledProcessError):
+        return {'commit': 'unknown', 'dirty': False}
+    return {'commit': commit, 'dirty': dirty}
+
+
+def compare_results(current: Dict, baseline: Dict, tolerance: float) -> List[str]:
+    """
+    Compare two result files scenario by scenario.
+
+    Returns:
+        One message per regression (throughput drop or p95 increase beyond tolerance)
+    """
+    regressions = []
+    print(f"\n=== Compared with {baseline['revision']['commit']} ===")
+    for name, result in current['scenarios'].items():
+        before = baseline['scenarios'].get(name)
+        if not before:
+            continue
+        rps_before, rps_now = before['requests_per_second'], result['requests_per_second']
+        p95_before, p95_now = before['latency_ms']['p95'], result['latency_ms']['p95']
+        rps_change = (rps_now - rps_before) / rps_before if rps_before else 0.0
+        p95_change = (p95_now - p95_before) / p95_before if p95_before else 0.0
+        print(f"  {name:<16} req/s {rps_before:>8} -> {rps_now:<8} ({rps_change:+.0%})  "
+              f"p95 {p95_before:>8}ms -> {str(p95_now) + 'ms':<10} ({p95_change:+.0%})")
+        if rps_change < -tolerance:
+            regressions.append(f"{name}: throughput {rps_change:+.0%}")
+        if p95_change > tolerance:
+            regressions.append(f"{name}: p95 latency {p95_change:+.0%}")
+    return regressions
+
+
+def run_benchmark(args) -> Dict:
+    """Start the fake Morphik and the API server, run every scenario, return the results."""
+    upstream = start_fake_morphik(latency=args.latency, error_rate=args.error_rate,
+                                  payload_size=args.payload_size)
+    data_dir = tempfile.mkdtemp(prefix="ecss-bench-")
+    env = {
+        **os.environ,
+        'MORPHIK_URI': upstream.uri,
+        # Empty data dir: no local index to fall back on, every search goes upstream
+        'ECSS_DATA_DIR': data_dir,
+        'SEARCH_CACHE_REDIS_URL': '',
+        'PYTHONUNBUFFERED': '1'
+    }
+
+    base_url = f"http://127.0.0.1:{args.port}"
+    log_path = os.path.join(data_dir, f"{args.server}.log")
+    process = start_server(args.server, args.port, env, log_path, workers=args.workers)
+    try:
+        if not wait_for_url(f"{base_url}/api/health"):
+            raise RuntimeError(f"{args.server} server did not start, see {log_path}")
+
+        urls = scenario_urls(base_url)
+        results = {}
+        print(f"{args.server} server, {args.workers} worker(s), {args.concurrency} clients, "
+              f"{args.duration}s per scenario; fake Morphik latency {args.latency}s, "
+              f"error rate {args.error_rate}, payload {args.payload_size} chars")
+        for name in args.scenarios:
+            result = run_load(urls[name], args.concurrency, args.duration,
+                              warmup=args.warmup, validate=response_error)
+            results[name] = result
+            latency = result['latency_ms']
+            print(f"  {name:<16} {result['requests_per_second']:>8} req/s  "
+                  f"p50 {latency['p50']:>7}ms  p95 {latency['p95']:>7}ms  p99 {latency['p99']:>7}ms  "
+                  f"errors {result['errors']}")
+    finally:
+        process.terminate()
+        process.wait(timeout=10)
+        upstream.shutdown()
+
+    return {
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'revision': git_revision(),
+        'config': {
+            'server': args.server,
+            'workers': args.workers,
+            'concurrency': args.concurrency,
+            'duration': args.duration,
+            'latency': args.latency,
+            'error_rate': args.error_rate,
+            'payload_size': args.payload_size
+        },
+        'upstream': {'requests': upstream.requests, 'errors': upstream.errors},
+        'scenarios': results
+    }
+
+
+if __name__ == "__main__":
+    scenario_names = list(scenario_urls('').keys())
+    parser = argparse.ArgumentParser(
+        description="Load-test the API against a local fake Morphik and record throughput and latency")
+    parser.add_argument('--server', choices=sorted(SERVER_COMMANDS), default='flask', help="Server under test")
+    parser.add_argument('--workers', type=int, default=1, help="Server worker processes")
+    parser.add_argument('--concurrency', type=int, default=10, help="Concurrent clients")
+    parser.add_argument('--duration', type=float, default=10.0, help="Measured seconds per scenario")
+    parser.add_argument('--warmup', type=float, default=1.0, help="Unmeasured seconds before each scenario")
+    parser.add_argument('--scenarios', nargs='+', choices=scenario_names, default=scenario_names)
+    parser.add_argument('--latency', type=float, default=0.1, help="Fake Morphik latency in seconds")
+    parser.add_argument('--error-rate', type=float, default=0.0, help="Fraction of failed Morphik calls")
+    parser.add_argument('--payload-size', type=int, default=1000, help="Characters of text per chunk")
+    parser.add_argument('--port', type=int, default=5055, help="Port for the server under test")
+    parser.add_argument('--output', help="Results file (default: data/bench/api-<commit>.json)")
+    parser.add_argument('--compare', help="Baseline results file to compare against")
+    parser.add_argument('--tolerance', type=float, default=DEFAULT_TOLERANCE,
+                        help="Allowed relative throughput drop / p95 increase before failing --compare")
+    args = parser.parse_args()
+
+    try:
+        report = run_benchmark(args)
+    except RuntimeError as e:
+        print(f"✗ {e}")
+        sys.exit(1)
+
+    output = args.output or os.path.join(settings.DATA_DIR, 'bench', f"api-{report['revision']['commit']}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+    print(f"\nResults written to {output}")
+
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            baseline = json.load(f)
+        regressions = compare_results(report, baseline, args.tolerance)
+        if regressions:
+            print(f"\n✗ {len(regressions)} regression(s):")
+            for regression in regressions:
+                print(f"  {regression}")
+            sys.exit(1)
+        print(f"\n✓ No regressions beyond {args.tolerance:.0%}")
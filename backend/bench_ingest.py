@@ -0,0 +1,231 @@
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Dict, List, Optional
+
+from morphik import Morphik
+from pypdf import PdfReader
+
+import settings
+from bench_api import git_revision
+from fake_morphik import start_fake_morphik
+from ingest_documents import ingest_file
+from ingest_manifest import hash_file
+from pdf_extract import load_extraction_stats
+from rate_limit import TokenBucket
+from status_tracker import StatusTracker
+
+# Per-file stages, in pipeline order
+STAGES = ('hash', 'metadata', 'split', 'rate_limit', 'upload', 'processing')
+
+# Simulated upstream defaults: upload link and server-side processing speed (bytes/s)
+DEFAULT_UPLOAD_BANDWIDTH = 10e6
+DEFAULT_PROCESSING_RATE = 2e6
+
+
+def count_pages(full_path: str, sha256: str, extraction_stats: Dict[str, Dict]) -> Optional[int]:
+    """Page count of a PDF, from the pdf_extract stats when available."""
+    stats = extraction_stats.get(sha256)
+    if stats and not stats.get('error'):
+        return stats['pages']
+    try:
+        return len(PdfReader(full_path).pages)
+    except Exception:
+        return None
+
+
+def benchmark_run(
+    db: Morphik,
+    pdf_directory: str,
+    document_paths: List[str],
+    workers: int,
+    rate_limit: float = 0.0,
+    rate_burst: int = 1,
+    processing_timeout: float = settings.PROCESSING_TIMEOUT
+) -> Dict:
+    """
+    Ingest the documents once with the given worker count and time every stage.
+
+    Each worker hashes, parses metadata for and uploads one file at a time
+    (the same ingest_file() used by ingest_documents.py); processing time
+    is measured from the end of the upload until Morphik reports a
+    terminal status.
+
+    Returns:
+        Dict with the run summary and one record per file
+    """
+    rate_limiter = TokenBucket(rate_limit, rate_burst) if rate_limit > 0 else None
+    completed_at: Dict[str, float] = {}
+    tracker = StatusTracker(db, initial_interval=0.2, max_interval=2.0, show_progress=False,
+                            on_complete=lambda doc_id, status: completed_at.setdefault(doc_id, time.monotonic()))
+
+    def process(doc_path: str) -> Dict:
+        full_path = os.path.join(pdf_directory, doc_path)
+        stage_started = time.monotonic()
+        sha256 = hash_file(full_path) if os.path.exists(full_path) else None
+        hash_seconds = time.monotonic() - stage_started
+        result = ingest_file(db, pdf_directory, doc_path, rate_limiter)
+        result['stages']['hash'] = hash_seconds
+        result['sha256'] = sha256
+        result['uploaded_at'] = time.monotonic()
+        return result
+
+    started = time.monotonic()
+    results = []
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        for future in as_completed([executor.submit(process, doc_path) for doc_path in document_paths]):
+            result = future.result()
+            results.append(result)
+            for document in result['documents']:
+                tracker.add(document['external_id'], document['filename'])
+    upload_elapsed = time.monotonic() - started
+
+    if tracker.statuses:
+        tracker.wait(processing_timeout)
+    total_elapsed = time.monotonic() - started
+
+    files = []
+    for result in results:
+        stages = dict(result['stages'])
+        # Split PDFs are processed once their last part is
+        finished = [completed_at.get(d['external_id']) for d in result['documents']]
+        if finished and None not in finished:
+            stages['processing'] = max(finished) - result['uploaded_at']
+        files.append({
+            'filename': result['filename'],
+            'path': result['path'],
+            'sha256': result['sha256'],
+            'status': result['status'],
+            'error': result['error'],
+            'bytes': result['bytes'],
+            'parts': result['parts'],
+            'stages': {stage: round(seconds, 4) for stage, seconds in stages.items()}
+        })
+
+    ingested = [f for f in files if f['status'] == 'ingested']
+    processed = sum(1 for f in files if 'processing' in f['stages'])
+    uploaded_bytes = sum(f['bytes'] for f in ingested)
+    stage_totals = {stage: round(sum(f['stages'].get(stage, 0.0) for f in files), 3) for stage in STAGES}
+    return {
+        'workers': workers,
+        'files': len(files),
+        'ingested': len(ingested),
+        'failed': len(files) - len(ingested),
+        'processed': processed,
+        'bytes': uploaded_bytes,
+        'upload_seconds': round(upload_elapsed, 3),
+        'total_seconds': round(total_elapsed, 3),
+        'files_per_second': round(len(ingested) / upload_elapsed, 2) if upload_elapsed else 0.0,
+        'bytes_per_second': round(uploaded_bytes / upload_elapsed) if upload_elapsed else 0,
+        'end_to_end_files_per_second': round(processed / total_elapsed, 2) if total_elapsed else 0.0,
+        'stage_seconds': stage_totals,
+        'file_results': files
+    }
+
+
+def print_run(run: Dict) -> None:
+    stages = "  ".join(f"{stage} {run['stage_seconds'][stage]:.1f}s" for stage in STAGES)
+    print(f"  workers={run['workers']:<3} {run['files_per_second']:>7} files/s  "
+          f"{run['bytes_per_second'] / 1e6:>7.2f} MB/s  upload {run['upload_seconds']:>7.1f}s  "
+          f"end-to-end {run['total_seconds']:>7.1f}s  failed {run['failed']}")
+    print(f"             stage totals: {stages}")
+
+
+def print_slowest_files(files: List[Dict], count: int = 10) -> None:
+    """Print the files with the longest upload plus processing time, with size and pages."""
+    def elapsed(f: Dict) -> float:
+        return f['stages'].get('upload', 0.0) + f['stages'].get('processing', 0.0)
+
+    print(f"\n=== Slowest files (upload + processing) ===")
+    for f in sorted(files, key=elapsed, reverse=True)[:count]:
+        pages = f.get('pages') if f.get('pages') is not None else '?'
+        print(f"  {elapsed(f):>7.2f}s  {f['bytes'] / 1e6:>6.1f} MB  {pages:>5} pages  "
+              f"upload {f['stages'].get('upload', 0.0):.2f}s  "
+              f"processing {f['stages'].get('processing', 0.0):.2f}s  {f['filename']}")
+
+    print(f"\n=== Largest files ===")
+    for f in sorted(files, key=lambda f: f['bytes'], reverse=True)[:count]:
+        pages = f.get('pages') if f.get('pages') is not None else '?'
+        print(f"  {f['bytes'] / 1e6:>6.1f} MB  {pages:>5} pages  {elapsed(f):>7.2f}s  {f['filename']}")
+
+
+def run_ingest_benchmark(
+    pdf_directory: str,
+    document_paths: List[str],
+    worker_counts: List[int],
+    upload_bandwidth: float = DEFAULT_UPLOAD_BANDWIDTH,
+    processing_rate: float = DEFAULT_PROCESSING_RATE,
+    latency: float = 0.0,
+    rate_limit: float = 0.0,
+    rate_burst: int = 1,
+    output: Optional[str] = None
+) -> Dict:
+    """
+    Benchmark ingestion against a local upload stand-in across worker counts.
+
+    Nothing is sent to the real Morphik instance and neither the ingestion
+    manifest nor the document catalog is touched. Results (summary per
+    worker count plus per-file stage times, sizes and page counts) are
+    written as JSON.
+
+    Args:
+        pdf_directory: Base directory of the PDFs
+        document_paths: PDFs to ingest (relative to pdf_directory)
+        worker_counts: Worker counts to compare, each run ingests every file
+        upload_bandwidth: Simulated upload speed in bytes/s (0 = unlimited)
+        processing_rate: Simulated server-side processing speed in bytes/s
+        latency: Extra seconds added to every stand-in response
+        rate_limit: Uploads started per second (0 disables), as in ingest_documents.py
+        rate_burst: Uploads allowed back-to-back before the rate limit applies
+        output: JSON results file (default: data/bench/ingest-<commit>.json)
+
+    Returns:
+        The benchmark report
+    """
+    upstream = start_fake_morphik(latency=latency, upload_bandwidth=upload_bandwidth,
+                                  processing_rate=processing_rate)
+    print(f"Ingestion benchmark: {len(document_paths)} file(s), workers {worker_counts}, "
+          f"upload {upload_bandwidth / 1e6:g} MB/s, processing {processing_rate / 1e6:g} MB/s")
+
+    runs = []
+    try:
+        for workers in worker_counts:
+            db = Morphik(uri=upstream.uri)
+            try:
+                run = benchmark_run(db, pdf_directory, document_paths, workers, rate_limit, rate_burst)
+            finally:
+                db.close()
+            runs.append(run)
+            print_run(run)
+    finally:
+        upstream.shutdown()
+
+    # Page counts for the report, once per file
+    extraction_stats = load_extraction_stats()
+    files = runs[-1]['file_results'] if runs else []
+    for f in files:
+        if f['sha256']:
+            f['pages'] = count_pages(f['path'], f['sha256'], extraction_stats)
+    print_slowest_files(files)
+
+    report = {
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'revision': git_revision(),
+        'config': {
+            'files': len(document_paths),
+            'worker_counts': worker_counts,
+            'upload_bandwidth': upload_bandwidth,
+            'processing_rate': processing_rate,
+            'latency': latency,
+            'rate_limit': rate_limit
+        },
+        'runs': runs
+    }
+
+    output = output or os.path.join(settings.DATA_DIR, 'bench', f"ingest-{report['revision']['commit']}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+    print(f"\nResults written to {output}")
+    return report
@@ -0,0 +1,108 @@
+import itertools
+import math
+import threading
+import time
+import urllib.error
+import urllib.request
+from typing import Callable, Dict, List, Optional
+
+
+def percentile(values: List[float], fraction: float) -> float:
+    """Nearest-rank percentile of a list of numbers (0 for an empty list)."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(0, min(len(ordered) - 1, math.ceil(fraction * len(ordered)) - 1))
+    return ordered[rank]
+
+
+def wait_for_url(url: str, timeout: float = 30.0) -> bool:
+    """Poll a URL until it answers (any HTTP status) or the timeout expires."""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            urllib.request.urlopen(url, timeout=2).read()
+            return True
+        except urllib.error.HTTPError:
+            return True
+        except OSError:
+            time.sleep(0.2)
+    return False
+
+
+def run_load(
+    make_url: Callable[[int], str],
+    concurrency: int,
+    duration: float,
+    timeout: float = 60.0,
+    warmup: float = 0.0,
+    validate: Optional[Callable[[bytes], Optional[str]]] = None
+) -> Dict:
+    """
+    Drive closed-loop load: each of `concurrency` threads sends requests back to back.
+
+    Args:
+        make_url: Returns the URL for the n-th request (vary it to defeat caches)
+        concurrency: Number of simultaneous clients
+        duration: Seconds of measured load
+        timeout: Per-request timeout in seconds
+        warmup: Seconds of unmeasured load before measuring
+        validate: Returns an error label for a successful response body
+            that should count as failed (e.g. a JSON 'error' field)
+
+    Returns:
+        Dict with requests, errors, requests_per_second and latency
+        percentiles (p50/p95/p99/max, in milliseconds)
+    """
+    counter = itertools.count()
+    lock = threading.Lock()
+    latencies: List[float] = []
+    errors: Dict[str, int] = {}
+    measure_from = time.monotonic() + warmup
+    stop_at = measure_from + duration
+
+    def client() -> None:
+        while True:
+            started = time.monotonic()
+            if started >= stop_at:
+                return
+            error: Optional[str] = None
+            try:
+                with urllib.request.urlopen(make_url(next(counter)), timeout=timeout) as response:
+                    body = response.read()
+                if validate is not None:
+                    error = validate(body)
+            except urllib.error.HTTPError as e:
+                error = f"HTTP {e.code}"
+            except OSError as e:
+                error = type(e).__name__
+            finished = time.monotonic()
+            if started < measure_from:
+                continue
+            with lock:
+                if error:
+                    errors[error] = errors.get(error, 0) + 1
+                else:
+                    latencies.append(finished - started)
+
+    threads = [threading.Thread(target=client, daemon=True) for _ in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    elapsed = max(time.monotonic() - measure_from, 1e-9)
+    return {
+        'concurrency': concurrency,
+        'duration': round(elapsed, 2),
+        'requests': len(latencies),
+        'errors': sum(errors.values()),
+        'error_types': errors,
+        'requests_per_second': round(len(latencies) / elapsed, 1),
+        'latency_ms': {
+            'p50': round(percentile(latencies, 0.50) * 1000, 1),
+            'p95': round(percentile(latencies, 0.95) * 1000, 1),
+            'p99': round(percentile(latencies, 0.99) * 1000, 1),
+            'max': round(max(latencies, default=0.0) * 1000, 1)
+        }
+    }
@@ -0,0 +1,111 @@
+import argparse
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import urllib.parse
+from typing import Dict, List
+
+from bench_load import run_load, wait_for_url
+from fake_morphik import start_fake_morphik
+
+# How each server is started
+SERVER_COMMANDS = {
+    'flask': ['gunicorn', '--workers', '{workers}', '--bind', '127.0.0.1:{port}', 'api_server:app'],
+    'asgi': ['hypercorn', '--workers', '{workers}', '--bind', '127.0.0.1:{port}', 'asgi_server:app']
+}
+
+
+def start_server(name: str, port: int, env: Dict[str, str], log_path: str, workers: int = 1) -> subprocess.Popen:
+    """Start one server in a subprocess from the backend directory."""
+    command = [part.format(port=port, workers=workers) for part in SERVER_COMMANDS[name]]
+    if shutil.which(command[0]) is None:
+        raise RuntimeError(f"{command[0]} is not installed (pip install -r requirements.txt)")
+    log = open(log_path, 'w')
+    return subprocess.Popen(command, cwd=os.path.dirname(os.path.abspath(__file__)),
+                            env=env, stdout=log, stderr=subprocess.STDOUT)
+
+
+def benchmark_server(
+    name: str,
+    port: int,
+    env: Dict[str, str],
+    concurrency_levels: List[int],
+    duration: float,
+    generate: bool,
+    log_dir: str
+) -> List[Dict]:
+    """Measure requests/s of one single-worker server at each concurrency level."""
+    base_url = f"http://127.0.0.1:{port}"
+    process = start_server(name, port, env, os.path.join(log_dir, f"{name}.log"))
+    try:
+        if not wait_for_url(f"{base_url}/api/health"):
+            raise RuntimeError(f"{name} server did not start, see {log_dir}/{name}.log")
+
+        def make_url(n: int) -> str:
+            # A distinct query per request, so the search cache never answers
+            params = {'q': f"thermal vacuum test {name} {n}", 'engine': 'morphik'}
+            if generate:
+                params['generate'] = 'true'
+            return f"{base_url}/api/search?{urllib.parse.urlencode(params)}"
+
+        results = []
+        for concurrency in concurrency_levels:
+            result = run_load(make_url, concurrency, duration, warmup=1.0)
+            result['server'] = name
+            results.append(result)
+            print(f"  {name:<6} c={concurrency:<4} {result['requests_per_second']:>8} req/s  "
+                  f"p50 {result['latency_ms']['p50']:>7}ms  p99 {result['latency_ms']['p99']:>7}ms  "
+                  f"errors {result['errors']}")
+        return results
+    finally:
+        process.terminate()
+        process.wait(timeout=10)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Compare requests/s per worker of the Flask and ASGI servers against a fake Morphik")
+    parser.add_argument('--latency', type=float, default=0.2, help="Simulated Morphik latency in seconds")
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 10, 50], help="Concurrent clients")
+    parser.add_argument('--duration', type=float, default=10.0, help="Seconds of load per level")
+    parser.add_argument('--generate', action='store_true', help="Benchmark generate=true instead of retrieval")
+    parser.add_argument('--servers', nargs='+', choices=sorted(SERVER_COMMANDS), default=['flask', 'asgi'])
+    parser.add_argument('--port', type=int, default=5055, help="Port for the server under test")
+    parser.add_argument('--output', help="Write results as JSON to this file")
+    args = parser.parse_args()
+
+    upstream = start_fake_morphik(latency=args.latency)
+    data_dir = tempfile.mkdtemp(prefix="ecss-bench-")
+    env = {
+        **os.environ,
+        'MORPHIK_URI': upstream.uri,
+        # Empty data dir: no local index and no catalog snapshot, every search goes upstream
+        'ECSS_DATA_DIR': data_dir,
+        'SEARCH_CACHE_REDIS_URL': '',
+        'PYTHONUNBUFFERED': '1'
+    }
+
+    print(f"Fake Morphik latency: {args.latency}s, {args.duration}s per level, logs in {data_dir}")
+    all_results = []
+    for name in args.servers:
+        try:
+            all_results.extend(benchmark_server(name, args.port, env, args.concurrency,
+                                                args.duration, args.generate, data_dir))
+        except RuntimeError as e:
+            print(f"✗ {e}")
+
+    print(f"\n=== Requests/s per worker ===")
+    for concurrency in args.concurrency:
+        row = {r['server']: r['requests_per_second'] for r in all_results if r['concurrency'] == concurrency}
+        print(f"  c={concurrency:<4} " + "  ".join(f"{name}: {row.get(name, '-'):>8}" for name in args.servers))
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump({'latency': args.latency, 'generate': args.generate, 'results': all_results}, f, indent=2)
+        print(f"\nResults written to {args.output}")
+
+    upstream.shutdown()
+    sys.exit(0 if all_results else 1)
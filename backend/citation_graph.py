@@ -0,0 +1,264 @@
+import argparse
+import gzip
+import json
+import os
+import time
+from collections import Counter
+from typing import Dict, List, Optional, Tuple
+
+import settings
+from clause_index import document_preference
+from ingest_documents import (
+    DASHES, STANDARD_ID_PATTERN, extract_metadata_from_path, parse_standard_id, standard_id_from_match
+)
+from pdf_extract import iter_corpus_pages
+
+GRAPH_VERSION = 1
+
+# Closure directions: what a standard cites, what cites it, or both
+DIRECTIONS = ('out', 'in', 'both')
+
+
+def _preferred(documents: List[Dict], key: str) -> Dict[str, int]:
+    """Map designation (or base designation) -> preferred document ID among its issues."""
+    preferred: Dict[str, int] = {}
+    for doc_id in sorted(range(len(documents)), key=lambda i: document_preference(documents[i])):
+        designation = documents[doc_id][key]
+        if designation and designation not in preferred:
+            preferred[designation] = doc_id
+    return preferred
+
+
+def build_citation_graph(
+    directories: List[str],
+    output_path: str = settings.CITATION_GRAPH_PATH,
+    workers: Optional[int] = None
+) -> Dict:
+    """
+    Build the citation graph between the ECSS PDFs from their extracted text.
+
+    Every ECSS designation in a document's text is resolved to a PDF: the
+    exact issue cited when the corpus has it, otherwise the Active, newest
+    issue of that standard. References to the document's own standard
+    (page headers, other issues) are ignored. The graph is stored in
+    compressed sparse row form: edges of document i are
+    targets[offsets[i]:offsets[i + 1]] with the number of mentions in
+    mentions[...] at the same positions.
+    """
+    started = time.monotonic()
+    documents = []
+    cited: List[Counter] = []
+
+    for chunk in iter_corpus_pages(directories, workers):
+        if not documents or documents[-1]['path'] != chunk['path']:
+            standard = parse_standard_id(chunk['filename']) or (None, None)
+            documents.append({
+                'path': chunk['path'],
+                'filename': chunk['filename'],
+                'designation': standard[0],
+                'base': standard[1],
+                'metadata': extract_metadata_from_path(os.path.join(settings.STANDARDS_DIR, chunk['path']))
+            })
+            cited.append(Counter())
+        for match in STANDARD_ID_PATTERN.finditer(chunk['text'].translate(DASHES)):
+            cited[-1][standard_id_from_match(match)] += 1
+
+    by_designation = _preferred(documents, 'designation')
+    by_base = _preferred(documents, 'base')
+    offsets = [0]
+    targets: List[int] = []
+    mentions: List[int] = []
+    unresolved: Counter = Counter()
+    for doc_id, references in enumerate(cited):
+        edges: Counter = Counter()
+        for (designation, base), count in references.items():
+            if base == documents[doc_id]['base']:
+                continue
+            target = by_designation.get(designation, by_base.get(base))
+            if target is None:
+                unresolved[designation] += count
+            else:
+                edges[target] += count
+        for target, count in sorted(edges.items()):
+            targets.append(target)
+            mentions.append(count)
+        offsets.append(len(targets))
+
+    graph = {
+        'version': GRAPH_VERSION,
+        'documents': documents,
+        'offsets': offsets,
+        'targets': targets,
+        'mentions': mentions,
+        'unresolved': dict(unresolved.most_common())
+    }
+    os.makedirs(os.path.dirname(output_path), exist_ok=True)
+    with gzip.open(output_path, 'wt', encoding='utf-8') as f:
+        json.dump(graph, f, separators=(',', ':'))
+
+    stats = {
+        'documents': len(documents),
+        'edges': len(targets),
+        'unresolved': len(unresolved),
+        'seconds': round(time.monotonic() - started, 1),
+        'bytes': os.path.getsize(output_path)
+    }
+    print(f"\n=== Citation Graph Summary ===")
+    print(f"Documents: {stats['documents']}")
+    print(f"Citation edges: {stats['edges']}")
+    print(f"Unresolved designations: {stats['unresolved']}")
+    if unresolved:
+        print("  Most cited: " + ", ".join(f"ECSS-{d} ({n})" for d, n in unresolved.most_common(5)))
+    print(f"Graph size: {stats['bytes'] / 1e3:.1f} kB")
+    print(f"Elapsed: {stats['seconds']}s")
+    return stats
+
+
+class CitationGraph:
+    """
+    In-memory citation graph between the ECSS PDFs.
+
+    Outbound edges come from the stored CSR arrays, inbound edges are the
+    same arrays transposed at load time, so both directions and bounded
+    transitive closures are plain array walks.
+    """
+
+    def __init__(self, graph: Dict):
+        self.documents = graph['documents']
+        self.offsets = graph['offsets']
+        self.targets = graph['targets']
+        self.mentions = graph['mentions']
+        self.unresolved = graph['unresolved']
+
+        # Transpose: sources citing each document, in the same CSR layout
+        counts = [0] * (len(self.documents) + 1)
+        for target in self.targets:
+            counts[target + 1] += 1
+        for i in range(len(self.documents)):
+            counts[i + 1] += counts[i]
+        self.in_offsets = counts[:]
+        self.in_sources = [0] * len(self.targets)
+        self.in_mentions = [0] * len(self.targets)
+        position = counts[:-1]
+        for source in range(len(self.documents)):
+            for edge in range(self.offsets[source], self.offsets[source + 1]):
+                target = self.targets[edge]
+                self.in_sources[position[target]] = source
+                self.in_mentions[position[target]] = self.mentions[edge]
+                position[target] += 1
+
+        self.by_designation = _preferred(self.documents, 'designation')
+        self.by_base = _preferred(self.documents, 'base')
+        self.by_filename = {document['filename']: doc_id for doc_id, document in enumerate(self.documents)}
+
+    @classmethod
+    def load(cls, path: str = settings.CITATION_GRAPH_PATH) -> Optional["CitationGraph"]:
+        """Load a graph written by build_citation_graph(), or None if there is none."""
+        if not os.path.exists(path):
+            return None
+        with gzip.open(path, 'rt', encoding='utf-8') as f:
+            graph = json.load(f)
+        if graph.get('version') != GRAPH_VERSION:
+            print(f"⚠ Citation graph {path} has an unsupported version, rebuild it")
+            return None
+        return cls(graph)
+
+    def find(self, standard: str) -> Optional[int]:
+        """
+        Document ID for a filename or ECSS designation.
+
+        A designation without issue letter ("E-ST-40") or with an issue
+        the corpus lacks resolves to the Active, newest issue.
+        """
+        if standard in self.by_filename:
+            return self.by_filename[standard]
+        parsed = parse_standard_id(standard if standard.upper().startswith('ECSS') else f"ECSS-{standard}")
+        if parsed is None:
+            return None
+        return self.by_designation.get(parsed[0], self.by_base.get(parsed[1]))
+
+    def outbound(self, doc_id: int) -> List[Tuple[int, int]]:
+        """(cited document, mentions) pairs of a document."""
+        start, end = self.offsets[doc_id], self.offsets[doc_id + 1]
+        return list(zip(self.targets[start:end], self.mentions[start:end]))
+
+    def inbound(self, doc_id: int) -> List[Tuple[int, int]]:
+        """(citing document, mentions) pairs of a document."""
+        start, end = self.in_offsets[doc_id], self.in_offsets[doc_id + 1]
+        return list(zip(self.in_sources[start:end], self.in_mentions[start:end]))
+
+    def closure(self, doc_id: int, depth: int, direction: str = 'out') -> List[Tuple[int, int]]:
+        """
+        Documents reachable within depth citation hops, breadth first.
+
+        Returns:
+            (document, hops) pairs, excluding the document itself
+        """
+        distance = {doc_id: 0}
+        frontier = [doc_id]
+        for hops in range(1, depth + 1):
+            reached = []
+            for node in frontier:
+                neighbours = []
+                if direction in ('out', 'both'):
+                    neighbours += self.targets[self.offsets[node]:self.offsets[node + 1]]
+                if direction in ('in', 'both'):
+                    neighbours += self.in_sources[self.in_offsets[node]:self.in_offsets[node + 1]]
+                for neighbour in neighbours:
+                    if neighbour not in distance:
+                        distance[neighbour] = hops
+                        reached.append(neighbour)
+            if not reached:
+                break
+            frontier = reached
+        return [(node, hops) for node, hops in distance.items() if node != doc_id]
+
+    def describe(self, doc_id: int) -> Dict:
+        document = self.documents[doc_id]
+        metadata = document['metadata']
+        return {
+            'standard': f"ECSS-{document['designation']}" if document['designation'] else None,
+            'filename': document['filename'],
+            'status': metadata.get('standard_status'),
+            'publication_date': metadata.get('publication_date')
+        }
+
+    def related(self, doc_id: int, depth: int = 1, direction: str = 'out') -> Dict:
+        """
+        Direct citations in both directions plus the closure up to depth hops.
+
+        Edges are ordered by number of mentions, the closure by hops and
+        then by standard.
+        """
+        def edges(pairs: List[Tuple[int, int]]) -> List[Dict]:
+            ranked = sorted(pairs, key=lambda pair: (-pair[1], self.documents[pair[0]]['filename']))
+            return [{**self.describe(node), 'mentions': count} for node, count in ranked]
+
+        closure = sorted(self.closure(doc_id, depth, direction),
+                         key=lambda pair: (pair[1], self.documents[pair[0]]['filename']))
+        return {
+            'document': self.describe(doc_id),
+            'outbound': edges(self.outbound(doc_id)),
+            'inbound': edges(self.inbound(doc_id)),
+            'closure': [{**self.describe(node), 'depth': hops} for node, hops in closure],
+            'depth': depth,
+            'direction': direction
+        }
+
+    def stats(self) -> Dict:
+        return {
+            'documents': len(self.documents),
+            'edges': len(self.targets),
+            'unresolved': len(self.unresolved)
+        }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build the citation graph between the ECSS PDFs")
+    parser.add_argument('--output', default=settings.CITATION_GRAPH_PATH, help="Graph file to write")
+    parser.add_argument('--workers', type=int, default=None, help="Extraction processes (default: all cores)")
+    args = parser.parse_args()
+
+    print(f"Building citation graph from: {settings.STANDARDS_DIR}")
+    build_citation_graph([settings.ACTIVE_STANDARDS_DIR, settings.SUPERSEDED_STANDARDS_DIR],
+                         args.output, args.workers)
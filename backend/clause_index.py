@@ -0,0 +1,349 @@
+import argparse
+import gzip
+import json
+import os
+import re
+import time
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import settings
+from ingest_documents import DASHES, STANDARD_ID_PATTERN, extract_metadata_from_path, parse_standard_id
+from pdf_extract import iter_corpus_pages
+from search_filters import metadata_matches
+
+INDEX_VERSION = 1
+
+# Characters of text kept per clause heading and per requirement
+CLAUSE_TEXT_LENGTH = 600
+REQUIREMENT_TEXT_LENGTH = 1500
+
+# "5.8.3.2 Verification of the technical specification" or "A.2.1 Scope";
+# list items ("1. software ...") have a trailing dot and do not match
+HEADING_PATTERN = re.compile(r'^((?:[A-Z]\.)?\d{1,2}(?:\.\d{1,2}){0,6})\s+([A-Z][^\s].{1,150})$')
+
+# "a. The supplier shall ..." starts requirement <clause>a
+REQUIREMENT_PATTERN = re.compile(r'^([a-z])\.\s+(\S.*)$')
+
+# Unique requirement identifiers printed above requirements in recent
+# standards ("ECSS-E-ST-32-10_0110001")
+REQUIREMENT_LABEL_PATTERN = re.compile(r'^ECSS-[A-Z0-9-]+_\d{7}$', re.IGNORECASE)
+
+# Running page headers ("6 March 2009") look like level-1 headings
+DATE_TITLE_PATTERN = re.compile(
+    r'^(January|February|March|April|May|June|July|August|September|October|November|December)\s+\d{4}$')
+
+# Table of contents lines end in dot leaders and a page number
+TOC_LINE_PATTERN = re.compile(r'(\.\s?){4,}\s*\d+\s*$')
+TOC_LINES_PER_PAGE = 3
+
+# A query that is only a clause reference, once the standard ID is removed
+CLAUSE_QUERY_PATTERN = re.compile(
+    r'^(?:(?:clause|section|sect\.|sec\.|§|requirement|req\.?)\s*)?((?:[A-Z]\.)?\d+(?:\.\d+)*)\s?([a-z])?\.?$',
+    re.IGNORECASE)
+REVISION_PATTERN = re.compile(r'\brev(?:ision)?\.?\s?\d+\b', re.IGNORECASE)
+
+
+def normalize_clause_id(clause: str, letter: Optional[str] = None) -> str:
+    """Canonical clause ID: annex letter upper case, requirement letter lower case ("A.2.1", "5.4.2.1a")."""
+    clause = clause.strip().rstrip('.')
+    if REQUIREMENT_LABEL_PATTERN.match(clause):
+        return clause.upper()
+    if clause[:1].isalpha() and clause[1:2] == '.':
+        clause = clause[0].upper() + clause[1:]
+    return clause + (letter or '').lower()
+
+
+def parse_clause_reference(query: str) -> Optional[Dict]:
+    """
+    Recognize queries such as "ECSS-E-ST-40C 5.4.2.1a", "clause 5.8.3.2"
+    or a requirement identifier ("ECSS-E-ST-32-10_0110001").
+
+    The query must be nothing but an (optional) ECSS standard ID and a clause
+    or requirement number; a bare number only counts when it is dotted or
+    has a requirement letter.
+
+    Returns:
+        Dict with 'standard' (designation or None) and 'clause', or None
+    """
+    text = query.translate(DASHES).strip()
+    if REQUIREMENT_LABEL_PATTERN.match(text):
+        return {'standard': None, 'clause': text.upper()}
+    standard = None
+    match = STANDARD_ID_PATTERN.search(text)
+    if match:
+        standard = parse_standard_id(match.group(0))[0]
+        text = text[:match.start()] + ' ' + text[match.end():]
+    text = REVISION_PATTERN.sub(' ', text).strip(' ,:;-')
+
+    match = CLAUSE_QUERY_PATTERN.match(text)
+    if not match:
+        return None
+    number, letter = match.groups()
+    if standard is None and '.' not in number and not letter:
+        return None
+    return {'standard': standard, 'clause': normalize_clause_id(number, letter)}
+
+
+def is_toc_page(lines: List[str]) -> bool:
+    return sum(1 for line in lines if TOC_LINE_PATTERN.search(line)) >= TOC_LINES_PER_PAGE
+
+
+def _clip(lines: List[str], length: int) -> str:
+    return ' '.join(' '.join(lines).split())[:length]
+
+
+def parse_clauses(pages: Iterable[Tuple[int, str]]) -> List[List]:
+    """
+    Clause headings and requirements of one standard, in document order.
+
+    Headings are numbered lines ("5.8.3.2 Title"); requirements are the
+    lettered paragraphs below a heading ("a. The supplier shall ..."),
+    identified as <clause><letter>. Letters must follow in order, so
+    lettered lists inside EXPECTED OUTPUT blocks and notes are not taken
+    for requirements. Headings on table-of-contents pages are ignored and
+    the first occurrence of a clause ID wins.
+
+    Returns:
+        [clause_id, page, kind ('clause' or 'requirement'), title, text, label]
+        rows, where label is the requirement identifier printed above the
+        requirement (or None)
+    """
+    entries: List[List] = []
+    seen = set()
+    clause: Optional[List] = None        # Current heading row
+    requirement: Optional[List] = None   # Current requirement row
+    body: List[str] = []                 # Lines of the current row
+    label: Optional[str] = None          # Requirement identifier awaiting its requirement
+    next_letter = 'a'
+    in_output = False
+
+    def close() -> None:
+        row = requirement or clause
+        if row is not None and row[4] is None:
+            row[4] = _clip(body, REQUIREMENT_TEXT_LENGTH if row is requirement else CLAUSE_TEXT_LENGTH)
+
+    for page, text in pages:
+        lines = [line.strip() for line in text.translate(DASHES).splitlines()]
+        toc = is_toc_page(lines)
+        for line in lines:
+            if not line:
+                continue
+            heading = HEADING_PATTERN.match(line)
+            if (heading and not toc and not TOC_LINE_PATTERN.search(line)
+                    and not DATE_TITLE_PATTERN.match(heading.group(2).strip())):
+                clause_id = normalize_clause_id(heading.group(1))
+                if clause_id not in seen:
+                    close()
+                    seen.add(clause_id)
+                    title = ' '.join(heading.group(2).split())
+                    clause = [clause_id, page, 'clause', title, None, None]
+                    requirement = None
+                    entries.append(clause)
+                    body = [title]
+                    next_letter = 'a'
+                    in_output = False
+                    continue
+
+            item = REQUIREMENT_PATTERN.match(line)
+            if (clause is not None and item and item.group(1) == next_letter
+                    and (not in_output or re.search(r'\b(shall|should)\b', line))):
+                close()
+                requirement_id = clause[0] + next_letter
+                if requirement_id not in seen:
+                    seen.add(requirement_id)
+                    requirement = [requirement_id, page, 'requirement', clause[3], None, label]
+                    entries.append(requirement)
+                    body = [item.group(2)]
+                next_letter = chr(ord(next_letter) + 1)
+                in_output = False
+                label = None
+                continue
+
+            if REQUIREMENT_LABEL_PATTERN.match(line):
+                label = line.upper()
+                continue
+            if requirement is None and clause is not None and body == [clause[3]] and line[0].islower():
+                # Heading title wrapped onto the next line
+                clause[3] = body[0] = f"{clause[3]} {' '.join(line.split())}"
+                continue
+            if line.startswith(('EXPECTED OUTPUT', 'NOTE')):
+                in_output = True
+            body.append(line)
+    close()
+    return entries
+
+
+def build_clause_index(
+    directories: List[str],
+    output_path: str = settings.CLAUSE_INDEX_PATH,
+    workers: Optional[int] = None
+) -> Dict:
+    """
+    Build the clause index from the page-level text of every PDF.
+
+    Text comes from the pdf_extract cache. The index is a gzipped JSON file
+    holding the document table (designation and metadata per PDF) and one
+    [document, clause_id, page, kind, title, text, label] row per clause
+    heading and requirement.
+    """
+    started = time.monotonic()
+    documents = []
+    entries = []
+
+    def add_document(path: str, filename: str, pages: List[Tuple[int, str]]) -> None:
+        standard = parse_standard_id(filename)
+        if standard is None:
+            return
+        documents.append({
+            'path': path,
+            'filename': filename,
+            'designation': standard[0],
+            'base': standard[1],
+            'metadata': extract_metadata_from_path(os.path.join(settings.STANDARDS_DIR, path))
+        })
+        for row in parse_clauses(pages):
+            entries.append([len(documents) - 1, *row])
+
+    current = None
+    pages: List[Tuple[int, str]] = []
+    for chunk in iter_corpus_pages(directories, workers):
+        if current is not None and current[0] != chunk['path']:
+            add_document(*current, pages)
+            pages = []
+        current = (chunk['path'], chunk['filename'])
+        pages.append((chunk['page'], chunk['text']))
+    if current is not None:
+        add_document(*current, pages)
+
+    index = {'version': INDEX_VERSION, 'documents': documents, 'entries': entries}
+    os.makedirs(os.path.dirname(output_path), exist_ok=True)
+    with gzip.open(output_path, 'wt', encoding='utf-8') as f:
+        json.dump(index, f, separators=(',', ':'))
+
+    stats = {
+        'documents': len(documents),
+        'clauses': sum(1 for e in entries if e[3] == 'clause'),
+        'requirements': sum(1 for e in entries if e[3] == 'requirement'),
+        'labels': sum(1 for e in entries if e[6]),
+        'seconds': round(time.monotonic() - started, 1),
+        'bytes': os.path.getsize(output_path)
+    }
+    print(f"\n=== Clause Index Summary ===")
+    print(f"Documents: {stats['documents']}")
+    print(f"Clauses: {stats['clauses']}")
+    print(f"Requirements: {stats['requirements']} ({stats['labels']} with an identifier)")
+    print(f"Index size: {stats['bytes'] / 1e6:.1f} MB")
+    print(f"Elapsed: {stats['seconds']}s")
+    return stats
+
+
+def document_preference(document: Dict) -> tuple:
+    """Sort key among issues of a standard: Active before Superseded, then the newest publication."""
+    metadata = document['metadata']
+    published = int((metadata.get('publication_date') or '0').replace('-', ''))
+    return (metadata.get('standard_status') != 'Active', -published)
+
+
+class ClauseIndex:
+    """
+    In-memory (standard, clause ID) -> clause/requirement lookup table.
+
+    Every entry is reachable in one dict lookup by its full designation
+    ("E-ST-40C"), by the designation without issue letter ("E-ST-40"), by
+    clause ID alone and, for requirements, by their identifier; candidates
+    are ordered Active first, newest first.
+    """
+
+    def __init__(self, index: Dict):
+        self.documents = index['documents']
+        self.entries = index['entries']
+        self.by_standard: Dict[Tuple[str, str], List[int]] = {}
+        self.by_clause: Dict[str, List[int]] = {}
+
+        rank = {doc_id: position for position, doc_id in enumerate(
+            sorted(range(len(self.documents)), key=lambda i: document_preference(self.documents[i])))}
+        for entry_id in sorted(range(len(self.entries)), key=lambda i: rank[self.entries[i][0]]):
+            doc_id, clause_id = self.entries[entry_id][:2]
+            label = self.entries[entry_id][6]
+            document = self.documents[doc_id]
+            for designation in dict.fromkeys((document['designation'], document['base'])):
+                self.by_standard.setdefault((designation, clause_id), []).append(entry_id)
+            self.by_clause.setdefault(clause_id, []).append(entry_id)
+            if label:
+                self.by_clause.setdefault(label, []).append(entry_id)
+
+    @classmethod
+    def load(cls, path: str = settings.CLAUSE_INDEX_PATH) -> Optional["ClauseIndex"]:
+        """Load an index written by build_clause_index(), or None if there is none."""
+        if not os.path.exists(path):
+            return None
+        with gzip.open(path, 'rt', encoding='utf-8') as f:
+            index = json.load(f)
+        if index.get('version') != INDEX_VERSION:
+            print(f"⚠ Clause index {path} has an unsupported version, rebuild it")
+            return None
+        return cls(index)
+
+    def lookup(
+        self,
+        clause: str,
+        standard: Optional[str] = None,
+        filters: Optional[Dict[str, str]] = None
+    ) -> List[Dict]:
+        """
+        Clause headings or requirements with this ID, formatted like /api/search results.
+
+        Args:
+            clause: Clause or requirement ID ("5.8.3.2", "5.8.3.2a", "A.2.1")
+                or requirement identifier ("ECSS-E-ST-32-10_0110001")
+            standard: ECSS designation, with or without "ECSS-" and issue
+                letter; None searches every standard
+            filters: Optional /api/search metadata filters
+        """
+        clause = normalize_clause_id(clause)
+        if standard and not REQUIREMENT_LABEL_PATTERN.match(clause):
+            parsed = parse_standard_id(standard if standard.upper().startswith('ECSS') else f"ECSS-{standard}")
+            if parsed is None:
+                return []
+            entry_ids = self.by_standard.get((parsed[0], clause)) or []
+        else:
+            entry_ids = self.by_clause.get(clause) or []
+
+        results = []
+        for entry_id in entry_ids:
+            doc_id, clause_id, page, kind, title, text, label = self.entries[entry_id]
+            document = self.documents[doc_id]
+            if filters and not metadata_matches(document['metadata'], filters):
+                continue
+            results.append({
+                'id': f"{document['filename']}#{clause_id}",
+                'title': document['filename'],
+                'content': text,
+                'score': 1.0,
+                'page': page,
+                'clause': clause_id,
+                'clause_title': title,
+                'kind': kind,
+                'requirement_id': label,
+                'standard': f"ECSS-{document['designation']}",
+                'metadata': {**document['metadata'], 'page_number': page}
+            })
+        return results
+
+    def stats(self) -> Dict:
+        return {
+            'documents': len(self.documents),
+            'entries': len(self.entries),
+            'keys': len(self.by_standard)
+        }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build the clause/requirement index over the ECSS PDFs")
+    parser.add_argument('--output', default=settings.CLAUSE_INDEX_PATH, help="Index file to write")
+    parser.add_argument('--workers', type=int, default=None, help="Extraction processes (default: all cores)")
+    args = parser.parse_args()
+
+    print(f"Building clause index from: {settings.STANDARDS_DIR}")
+    build_clause_index([settings.ACTIVE_STANDARDS_DIR, settings.SUPERSEDED_STANDARDS_DIR],
+                       args.output, args.workers)
@@ -0,0 +1,244 @@
+import fcntl
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+import settings
+from metrics import upstream_call
+
+# Documents fetched per list_documents page when loading the catalog
+LIST_PAGE_SIZE = 500
+
+
+def _document_entry(doc) -> Dict:
+    return {
+        'filename': getattr(doc, 'filename', None) or 'Unknown',
+        'metadata': getattr(doc, 'metadata', None) or {}
+    }
+
+
+def _read_snapshot(path: str) -> Dict[str, Dict]:
+    try:
+        with open(path, encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+@contextmanager
+def _snapshot_lock(path: str):
+    """Exclusive lock serializing read-modify-write of the snapshot across processes."""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(f"{path}.lock", 'a') as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def _write_snapshot(path: str, documents: Dict[str, Dict]) -> None:
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    partial = f"{path}.{os.getpid()}.tmp"
+    with open(partial, 'w', encoding='utf-8') as f:
+        json.dump(documents, f)
+    os.replace(partial, path)
+
+
+def record_documents(entries: Iterable[Dict], path: str = settings.DOCUMENT_CATALOG_PATH) -> None:
+    """
+    Add freshly ingested documents to the catalog snapshot.
+
+    Called by the ingestion scripts with dicts holding external_id, filename
+    and metadata; API workers pick the change up without a Morphik call.
+    """
+    with _snapshot_lock(path):
+        documents = _read_snapshot(path)
+        for entry in entries:
+            documents[entry['external_id']] = {'filename': entry['filename'], 'metadata': entry['metadata']}
+        _write_snapshot(path, documents)
+
+
+def forget_documents(external_ids: Iterable[str], path: str = settings.DOCUMENT_CATALOG_PATH) -> None:
+    """Remove deleted documents from the catalog snapshot."""
+    with _snapshot_lock(path):
+        documents = _read_snapshot(path)
+        for external_id in external_ids:
+            documents.pop(external_id, None)
+        _write_snapshot(path, documents)
+
+
+class DocumentCatalog:
+    """
+    In-process map of Morphik external_id -> filename and metadata.
+
+    Loaded once from list_documents(), kept in sync with the snapshot file
+    written by the ingestion scripts and refreshed from Morphik in the
+    background, so search responses resolve their sources without extra
+    network calls. Unknown IDs are fetched with one batch request.
+    """
+
+    def __init__(
+        self,
+        snapshot_path: str = settings.DOCUMENT_CATALOG_PATH,
+        refresh_interval: float = settings.DOCUMENT_CATALOG_REFRESH
+    ):
+        self.snapshot_path = snapshot_path
+        self.refresh_interval = refresh_interval
+        self._documents: Dict[str, Dict] = {}
+        self._lock = threading.Lock()
+        self._snapshot_mtime = 0.0
+        self._refresher_pid: Optional[int] = None
+        self.loaded_at: Optional[float] = None
+        self.hits = 0
+        self.misses = 0
+        self._load_snapshot()
+
+    def __len__(self) -> int:
+        return len(self._documents)
+
+    def _load_snapshot(self) -> None:
+        try:
+            mtime = os.path.getmtime(self.snapshot_path)
+        except OSError:
+            return
+        if mtime == self._snapshot_mtime:
+            return
+        documents = _read_snapshot(self.snapshot_path)
+        with self._lock:
+            # Replace rather than merge, so forget_documents() reaches running workers
+            self._documents = documents
+            self._snapshot_mtime = mtime
+
+    def update(self, documents: Iterable) -> None:
+        """Add or replace entries from Morphik Document objects."""
+        with self._lock:
+            for doc in documents:
+                external_id = getattr(doc, 'external_id', None)
+                if external_id:
+                    self._documents[external_id] = _document_entry(doc)
+
+    def load(self, db) -> int:
+        """
+        Replace the catalog with every document listed by Morphik.
+
+        Snapshot changes made by the ingestion scripts while the listing ran
+        (records and deletions since it started) are applied on top of it,
+        so the rewritten snapshot does not undo them.
+        """
+        base = _read_snapshot(self.snapshot_path)
+        documents = {}
+        skip = 0
+        while True:
+            response = upstream_call('list_documents', db.list_documents, skip=skip, limit=LIST_PAGE_SIZE)
+            # Newer SDKs return a ListDocsResponse, older ones a plain list
+            page = getattr(response, 'documents', response)
+            for doc in page:
+                documents[doc.external_id] = _document_entry(doc)
+            if len(page) < LIST_PAGE_SIZE or getattr(response, 'has_more', True) is False:
+                break
+            skip += LIST_PAGE_SIZE
+
+        with _snapshot_lock(self.snapshot_path):
+            current = _read_snapshot(self.snapshot_path)
+            for external_id, entry in current.items():
+                if base.get(external_id) != entry:
+                    documents[external_id] = entry
+            for external_id in base.keys() - current.keys():
+                documents.pop(external_id, None)
+            _write_snapshot(self.snapshot_path, documents)
+            mtime = os.path.getmtime(self.snapshot_path)
+        with self._lock:
+            self._documents = documents
+            self._snapshot_mtime = mtime
+        self.loaded_at = time.time()
+        return len(documents)
+
+    def lookup(self, external_ids: List[str]) -> Tuple[Dict[str, Dict], List[str]]:
+        """Answer document IDs from memory; returns the entries found and the missing IDs."""
+        self._load_snapshot()
+        found = {}
+        missing = []
+        with self._lock:
+            for external_id in dict.fromkeys(external_ids):
+                entry = self._documents.get(external_id)
+                if entry is not None:
+                    found[external_id] = entry
+                else:
+                    missing.append(external_id)
+        self.hits += len(found)
+        self.misses += len(missing)
+        return found, missing
+
+    def add_fetched(self, found: Dict[str, Dict], fetched: Iterable) -> Dict[str, Dict]:
+        """Store documents fetched for a lookup miss and add them to its result."""
+        fetched = list(fetched)
+        self.update(fetched)
+        for doc in fetched:
+            found[doc.external_id] = _document_entry(doc)
+        return found
+
+    def resolve(
+        self,
+        external_ids: List[str],
+        fetch: Optional[Callable[[List[str]], Iterable]] = None
+    ) -> Dict[str, Dict]:
+        """
+        Look up filename and metadata for document IDs.
+
+        Known IDs are answered from memory; all misses are fetched with a
+        single fetch(missing) call (e.g. a batch_get_documents wrapper) when
+        one is given. A failed fetch leaves the misses unresolved.
+        """
+        found, missing = self.lookup(external_ids)
+        if missing and fetch is not None:
+            try:
+                self.add_fetched(found, fetch(missing))
+            except Exception as e:
+                print(f"Error fetching documents {missing}: {e}")
+
+        return found
+
+    def entries(self) -> Dict[str, Dict]:
+        """Copy of every known external_id -> filename/metadata entry."""
+        self._load_snapshot()
+        with self._lock:
+            return dict(self._documents)
+
+    def start_refresher(self, client_factory: Callable) -> None:
+        """
+        Load the catalog and keep refreshing it in a daemon thread.
+
+        Safe to call on every request: a thread is started at most once per
+        process (threads do not survive a gunicorn fork).
+        """
+        if self._refresher_pid == os.getpid():
+            return
+        with self._lock:
+            if self._refresher_pid == os.getpid():
+                return
+            self._refresher_pid = os.getpid()
+        threading.Thread(target=self._refresh_loop, args=(client_factory,),
+                         name="document-catalog", daemon=True).start()
+
+    def _refresh_loop(self, client_factory: Callable) -> None:
+        while True:
+            db = client_factory()
+            if db is not None:
+                try:
+                    count = self.load(db)
+                    print(f"✓ Document catalog refreshed ({count} documents)")
+                except Exception as e:
+                    print(f"⚠ Document catalog refresh failed: {e}")
+            time.sleep(self.refresh_interval)
+
+    def stats(self) -> Dict:
+        return {
+            'documents': len(self._documents),
+            'loaded_at': self.loaded_at,
+            'hits': self.hits,
+            'misses': self.misses
+        }
@@ -0,0 +1,302 @@
+import argparse
+import gzip
+import hashlib
+import json
+import os
+import re
+import time
+import zlib
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional
+
+import numpy as np
+
+import settings
+from ingest_documents import extract_metadata_from_path
+from pdf_extract import extract_corpus
+
+# Words per shingle
+SHINGLE_SIZE = 5
+
+# MinHash signature length, split into LSH bands of rows; 16 bands of 8 rows
+# make pairs above ~0.7 similarity very likely to share a bucket
+NUM_HASHES = 128
+LSH_BANDS = 16
+LSH_ROWS = NUM_HASHES // LSH_BANDS
+
+# Shingles hashed per vectorized batch (bounds memory on very long documents)
+HASH_BATCH_SIZE = 8192
+
+# Fixed seed: signatures must stay comparable across runs for the cache
+_rng = np.random.default_rng(20240601)
+HASH_MULTIPLIERS = _rng.integers(1, 2**63, NUM_HASHES, dtype=np.uint64) * np.uint64(2) + np.uint64(1)
+HASH_OFFSETS = _rng.integers(0, 2**63, NUM_HASHES, dtype=np.uint64)
+
+SIGNATURE_CACHE_FILENAME = "minhash_signatures.npz"
+
+WORD_PATTERN = re.compile(r"[a-z0-9]+")
+
+
+def document_words(cache_file: str) -> List[str]:
+    """Lowercase words of a document's cached page text, in reading order."""
+    words = []
+    with gzip.open(cache_file, 'rt', encoding='utf-8') as f:
+        for line in f:
+            words.extend(WORD_PATTERN.findall(json.loads(line)['text'].lower()))
+    return words
+
+
+def word_shingles(words: List[str]) -> np.ndarray:
+    """Unique 64-bit hashes of every SHINGLE_SIZE-word window."""
+    if len(words) < SHINGLE_SIZE:
+        return np.zeros(0, dtype=np.uint64)
+    word_hashes = {}
+    hashed = np.fromiter((word_hashes.setdefault(w, zlib.crc32(w.encode('utf-8'))) for w in words),
+                         dtype=np.uint64, count=len(words))
+    # Polynomial rolling combination of the word hashes (wraps modulo 2^64)
+    shingles = np.zeros(len(words) - SHINGLE_SIZE + 1, dtype=np.uint64)
+    for offset in range(SHINGLE_SIZE):
+        shingles = shingles * np.uint64(1000003) + hashed[offset:offset + len(shingles)]
+    return np.unique(shingles)
+
+
+def minhash_signature(shingles: np.ndarray) -> np.ndarray:
+    """
+    MinHash signature: per hash function, the minimum over all shingles.
+
+    Uses multiply-shift hashing, (a * x + b) >> 32 modulo 2^64, evaluated
+    for all NUM_HASHES functions at once over batches of shingles.
+    """
+    signature = np.full(NUM_HASHES, np.iinfo(np.uint64).max, dtype=np.uint64)
+    for start in range(0, len(shingles), HASH_BATCH_SIZE):
+        batch = shingles[start:start + HASH_BATCH_SIZE]
+        hashes = (HASH_MULTIPLIERS[:, None] * batch[None, :] + HASH_OFFSETS[:, None]) >> np.uint64(32)
+        np.minimum(signature, hashes.min(axis=1), out=signature)
+    return signature
+
+
+def fingerprint_document(sha256: str, cache_file: str) -> Dict:
+    """Text hash, shingle count and MinHash signature of one extracted PDF (runs in a worker process)."""
+    words = document_words(cache_file)
+    shingles = word_shingles(words)
+    return {
+        'sha256': sha256,
+        'text_sha256': hashlib.sha256(' '.join(words).encode('utf-8')).hexdigest(),
+        'shingles': len(shingles),
+        'signature': minhash_signature(shingles)
+    }
+
+
+def _load_fingerprints(path: str) -> Dict[str, Dict]:
+    try:
+        with np.load(path, allow_pickle=False) as data:
+            meta = json.loads(str(data['meta']))
+            signatures = data['signatures']
+    except (OSError, KeyError, ValueError):
+        return {}
+    return {sha256: {**entry, 'signature': signatures[i]} for i, (sha256, entry) in enumerate(meta.items())}
+
+
+def _save_fingerprints(path: str, fingerprints: Dict[str, Dict]) -> None:
+    meta = {sha256: {'text_sha256': f['text_sha256'], 'shingles': f['shingles']}
+            for sha256, f in fingerprints.items()}
+    signatures = np.array([f['signature'] for f in fingerprints.values()], dtype=np.uint64)
+    partial = f"{path}.{os.getpid()}.tmp.npz"
+    np.savez(partial, meta=json.dumps(meta), signatures=signatures.reshape(-1, NUM_HASHES))
+    os.replace(partial, path)
+
+
+def fingerprint_corpus(documents: List[Dict], workers: Optional[int] = None) -> Dict[str, Dict]:
+    """
+    Fingerprints of every extracted document, keyed by content hash.
+
+    Signatures are cached next to the text cache, so only new PDFs are
+    shingled again; those are processed across all cores.
+    """
+    cache_path = os.path.join(settings.TEXT_CACHE_DIR, SIGNATURE_CACHE_FILENAME)
+    fingerprints = _load_fingerprints(cache_path)
+    pending = {d['sha256']: d['cache'] for d in documents
+               if d['sha256'] not in fingerprints and os.path.exists(d['cache'])}
+    if pending:
+        print(f"Fingerprinting {len(pending)} document(s)...")
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            for fingerprint in executor.map(fingerprint_document, pending.keys(), pending.values()):
+                fingerprints[fingerprint['sha256']] = fingerprint
+        _save_fingerprints(cache_path, fingerprints)
+    return fingerprints
+
+
+def estimated_similarity(a: np.ndarray, b: np.ndarray) -> float:
+    """Estimated Jaccard similarity of two documents' shingle sets."""
+    return float(np.mean(a == b))
+
+
+def candidate_pairs(signatures: Dict[str, np.ndarray]) -> set:
+    """Pairs of content hashes sharing at least one LSH band bucket."""
+    buckets = defaultdict(list)
+    for sha256, signature in signatures.items():
+        for band in range(LSH_BANDS):
+            rows = signature[band * LSH_ROWS:(band + 1) * LSH_ROWS]
+            buckets[(band, rows.tobytes())].append(sha256)
+
+    pairs = set()
+    for members in buckets.values():
+        for i in range(len(members)):
+            for j in range(i + 1, len(members)):
+                pairs.add(tuple(sorted((members[i], members[j]))))
+    return pairs
+
+
+def _canonical_order(member: Dict) -> tuple:
+    # Active before Superseded, newest publication first, then the longest text
+    published = int((member['publication_date'] or '0').replace('-', ''))
+    return (member['status'] != 'Active', -published, -member['shingles'], member['path'])
+
+
+def find_duplicate_clusters(
+    directories: List[str],
+    threshold: float = settings.DUPLICATE_SIMILARITY,
+    workers: Optional[int] = None
+) -> Dict:
+    """
+    Group the PDFs under the directories into duplicate clusters.
+
+    Files with the same content hash or the same extracted text are exact
+    duplicates; other pairs are found with MinHash/LSH over word shingles
+    and kept when their estimated similarity reaches the threshold. Each
+    cluster names a canonical member (Active, newest, longest) that should
+    be ingested in place of the others.
+
+    Returns:
+        The duplicate report (clusters with per-member match type and similarity)
+    """
+    started = time.monotonic()
+    documents = extract_corpus(directories, workers)
+    fingerprints = fingerprint_corpus(documents, workers)
+    documents = [d for d in documents if d['sha256'] in fingerprints]
+
+    # Union-find over content hashes: same file, same text, or similar text
+    parent = {d['sha256']: d['sha256'] for d in documents}
+
+    def find(sha256: str) -> str:
+        while parent[sha256] != sha256:
+            parent[sha256] = parent[parent[sha256]]
+            sha256 = parent[sha256]
+        return sha256
+
+    def union(a: str, b: str) -> None:
+        parent[find(a)] = find(b)
+
+    by_text = {}
+    for sha256 in parent:
+        text_sha256 = fingerprints[sha256]['text_sha256']
+        if fingerprints[sha256]['shingles'] == 0:
+            continue  # No extractable text (scanned PDF): only identical files match
+        union(sha256, by_text.setdefault(text_sha256, sha256))
+
+    signatures = {sha256: fingerprints[sha256]['signature'] for sha256 in parent
+                  if fingerprints[sha256]['shingles']}
+    pairs = candidate_pairs(signatures)
+    for a, b in pairs:
+        if estimated_similarity(signatures[a], signatures[b]) >= threshold:
+            union(a, b)
+
+    groups = defaultdict(list)
+    for document in documents:
+        metadata = extract_metadata_from_path(os.path.join(settings.STANDARDS_DIR, document['path']))
+        groups[find(document['sha256'])].append({
+            'path': document['path'],
+            'filename': document['filename'],
+            'sha256': document['sha256'],
+            'status': metadata.get('standard_status'),
+            'publication_date': metadata.get('publication_date'),
+            'shingles': fingerprints[document['sha256']]['shingles']
+        })
+
+    clusters = []
+    for members in groups.values():
+        if len(members) < 2:
+            continue
+        members.sort(key=_canonical_order)
+        canonical = members[0]
+        for member in members:
+            if member is canonical:
+                member['match'] = 'canonical'
+            elif member['sha256'] == canonical['sha256']:
+                member['match'] = 'identical_file'
+            elif fingerprints[member['sha256']]['text_sha256'] == fingerprints[canonical['sha256']]['text_sha256']:
+                member['match'] = 'identical_text'
+            else:
+                member['match'] = 'near_duplicate'
+            member['similarity'] = round(estimated_similarity(
+                fingerprints[member['sha256']]['signature'], fingerprints[canonical['sha256']]['signature']), 3)
+        clusters.append({'id': len(clusters) + 1, 'canonical': canonical['path'], 'members': members})
+
+    return {
+        'generated_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'documents': len(documents),
+        'threshold': threshold,
+        'candidate_pairs': len(pairs),
+        'seconds': round(time.monotonic() - started, 2),
+        'clusters': clusters
+    }
+
+
+def load_duplicate_report(path: str = settings.DUPLICATE_REPORT_PATH) -> Optional[Dict]:
+    """The report written by the last duplicate_detection.py run, if any."""
+    try:
+        with open(path, encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def duplicate_paths(report: Dict) -> Dict[str, Dict]:
+    """
+    Non-canonical cluster members by path (relative to STANDARDS_DIR).
+
+    Each value carries the cluster id, the canonical path, the match type
+    and the similarity to the canonical document.
+    """
+    duplicates = {}
+    for cluster in report['clusters']:
+        for member in cluster['members']:
+            if member['match'] != 'canonical':
+                duplicates[member['path']] = {
+                    'cluster': cluster['id'],
+                    'canonical': cluster['canonical'],
+                    'match': member['match'],
+                    'similarity': member['similarity']
+                }
+    return duplicates
+
+
+def print_report(report: Dict) -> None:
+    duplicates = sum(len(c['members']) - 1 for c in report['clusters'])
+    print(f"\n=== Duplicate clusters ({len(report['clusters'])} clusters, "
+          f"{duplicates} of {report['documents']} documents redundant) ===")
+    for cluster in report['clusters']:
+        print(f"\n  [{cluster['id']}] keep {cluster['canonical']}")
+        for member in cluster['members'][1:]:
+            print(f"      {member['match']:<15} {member['similarity']:.2f}  {member['path']}")
+    print(f"\nChecked {report['candidate_pairs']} candidate pair(s) in {report['seconds']:.1f}s")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Find duplicate and near-duplicate PDFs across the Active and Superseded trees")
+    parser.add_argument('--threshold', type=float, default=settings.DUPLICATE_SIMILARITY,
+                        help="Estimated text similarity (0-1) above which PDFs are near-duplicates")
+    parser.add_argument('--workers', type=int, default=None, help="Extraction processes (default: all cores)")
+    parser.add_argument('--output', default=settings.DUPLICATE_REPORT_PATH, help="Report file to write")
+    args = parser.parse_args()
+
+    report = find_duplicate_clusters([settings.ACTIVE_STANDARDS_DIR, settings.SUPERSEDED_STANDARDS_DIR],
+                                     args.threshold, args.workers)
+    print_report(report)
+
+    os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+    print(f"Report written to {args.output}")
@@ -0,0 +1,307 @@
+import argparse
+import gzip
+import json
+import os
+import re
+import time
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import settings
+from clause_index import document_preference, is_toc_page
+from ingest_documents import DASHES, extract_metadata_from_path, parse_standard_id
+from pdf_extract import iter_corpus_pages
+from search_filters import metadata_matches
+
+INDEX_VERSION = 1
+
+# The ECSS glossary; its definitions rank above those of individual standards
+GLOSSARY_STANDARD = 'S-ST-00-01'
+
+# Characters kept per definition and per block of notes
+DEFINITION_LENGTH = 1000
+NOTES_LENGTH = 1000
+
+# "3 Terms, definitions and abbreviated terms" (the number is often on its own line)
+SECTION_PATTERN = re.compile(r'^(?:\d{1,2}\s+)?Terms,? (?:and )?definitions', re.IGNORECASE)
+
+# "3.2.7 critical software": one defined term per numbered heading
+TERM_PATTERN = re.compile(r'^((\d{1,2})\.\d{1,2}\.\d{1,3}(?:\.\d{1,3})?)\s+(\S.{0,120})$')
+
+# "3.3 Abbreviated terms" and other subclauses of the section
+SUBCLAUSE_PATTERN = re.compile(r'^(\d{1,2})\.\d{1,2}\s+(\S.*)$')
+END_SUBCLAUSE_PATTERN = re.compile(r'abbreviat|symbols|nomenclature|conventions', re.IGNORECASE)
+
+# Numbered headings in the section that introduce text rather than a term
+NOT_A_TERM_PATTERN = re.compile(r'^(introduction|general|overview|definitions?\b|terms\b)', re.IGNORECASE)
+
+# Page header lines: designation, publication date and page number
+HEADER_PATTERNS = (re.compile(r'^ECSS-'), re.compile(r'^\d{1,2}\s+[A-Z][a-z]+\s+\d{4}$'), re.compile(r'^\d+$'))
+
+# "what is a critical item", "define configuration baseline", "definition of COTS"
+DEFINITION_QUERY_PATTERN = re.compile(
+    r'^(?:what\s+(?:is|are)|what\'s|define|definition\s+of|meaning\s+of|explain\s+the\s+term)\s+'
+    r'(?:(?:a|an|the)\s+)?(?:term\s+)?["\'“]?(.+?)["\'”]?\s*\??$',
+    re.IGNORECASE)
+# Longest query (in words) that /api/search tries as a bare term ("critical item")
+BARE_TERM_WORDS = 6
+
+# Qualifiers after a term: "(A-value)", "<test>", "[A5]"; an acronym qualifier
+# ("(MEOP)") is also a key of the term
+QUALIFIER_PATTERN = re.compile(r'\s*[(<\[]([^)>\]]*)[)>\]]')
+ACRONYM_PATTERN = re.compile(r'^[A-Z][A-Z0-9-]+$')
+
+
+def normalize_term(term: str) -> str:
+    """Lookup key of a term: lower case, plain hyphens, single spaces, no trailing punctuation."""
+    return ' '.join(term.translate(DASHES).lower().split()).strip(' .:;,')
+
+
+def term_keys(term: str) -> List[str]:
+    """Keys a defined term is found under: as written, without its qualifier and by its acronym."""
+    keys = [normalize_term(term)]
+    bare = normalize_term(QUALIFIER_PATTERN.sub('', term))
+    if bare and bare not in keys:
+        keys.append(bare)
+    for qualifier in QUALIFIER_PATTERN.findall(term):
+        if ACRONYM_PATTERN.match(qualifier.strip()) and normalize_term(qualifier) not in keys:
+            keys.append(normalize_term(qualifier))
+    return keys
+
+
+def parse_definition_query(query: str) -> Optional[str]:
+    """The term asked about in a definitional question ("what is a critical item?"), or None."""
+    match = DEFINITION_QUERY_PATTERN.match(query.strip())
+    return normalize_term(match.group(1)) if match else None
+
+
+def _strip_page_header(lines: List[str]) -> List[str]:
+    for position, pattern in enumerate(HEADER_PATTERNS):
+        if position < len(lines) and pattern.match(lines[position]):
+            continue
+        return lines[position:]
+    return lines[len(HEADER_PATTERNS):]
+
+
+def _split_notes(body: List[str]) -> Tuple[str, str]:
+    for position, line in enumerate(body):
+        if line.startswith(('NOTE', 'EXAMPLE')):
+            break
+    else:
+        position = len(body)
+    definition = ' '.join(' '.join(body[:position]).split())[:DEFINITION_LENGTH]
+    notes = ' '.join(' '.join(body[position:]).split())[:NOTES_LENGTH]
+    return definition, notes
+
+
+def parse_definitions(pages: Iterable[Tuple[int, str]]) -> List[List]:
+    """
+    Defined terms of one standard's "Terms, definitions and abbreviated terms" clause.
+
+    Terms are the numbered headings of the clause ("3.2.7 critical
+    software"), each followed by its definition and notes. Headings that
+    only group deeper ones, terms merely cited from other standards and the
+    abbreviated terms are skipped.
+
+    Returns:
+        [clause, page, term, definition, notes] rows
+    """
+    terms: Dict[str, List] = {}
+    bodies: Dict[str, List[str]] = {}
+    in_section = False
+    section = None     # Clause number of the section, from its first subclause
+    current = None     # Clause of the term being read
+
+    for page, text in pages:
+        lines = [line.strip() for line in text.translate(DASHES).splitlines()]
+        if is_toc_page(lines):
+            continue
+        lines = [line for line in _strip_page_header(lines) if line]
+        for position, line in enumerate(lines):
+            if not in_section:
+                in_section = bool(SECTION_PATTERN.match(line))
+                continue
+
+            heading = TERM_PATTERN.match(line)
+            subclause = None if heading else SUBCLAUSE_PATTERN.match(line)
+            number = heading.group(2) if heading else subclause.group(1) if subclause else None
+            if section is None and number:
+                section = number
+            if number and number != section:
+                return _rows(terms, bodies)
+            if (section and line == str(int(section) + 1) and position + 1 < len(lines)
+                    and not lines[position + 1][:1].islower()):
+                # Next chapter: its number on its own line, then its title
+                return _rows(terms, bodies)
+
+            if heading:
+                clause, title = heading.group(1), ' '.join(heading.group(3).split())
+                if current and current in terms and clause.startswith(current + '.') and not bodies[current]:
+                    # The previous heading only groups the terms below it
+                    del terms[current]
+                current = None
+                if not NOT_A_TERM_PATTERN.match(title):
+                    current = clause
+                    terms[clause] = [clause, page, title]
+                    bodies[clause] = []
+                continue
+            if subclause:
+                current = None
+                if END_SUBCLAUSE_PATTERN.search(subclause.group(2)):
+                    return _rows(terms, bodies)
+                continue
+            if current:
+                bodies[current].append(line)
+    return _rows(terms, bodies)
+
+
+def _rows(terms: Dict[str, List], bodies: Dict[str, List[str]]) -> List[List]:
+    rows = []
+    for clause, (_, page, title) in terms.items():
+        definition, notes = _split_notes(bodies[clause])
+        if definition:
+            rows.append([clause, page, title, definition, notes])
+    return rows
+
+
+def build_glossary_index(
+    directories: List[str],
+    output_path: str = settings.GLOSSARY_INDEX_PATH,
+    workers: Optional[int] = None
+) -> Dict:
+    """
+    Build the term -> definitions index from the page-level text of every PDF.
+
+    The index is a gzipped JSON file holding the document table and one
+    [document, clause, page, term, definition, notes] row per definition.
+    """
+    started = time.monotonic()
+    documents = []
+    entries = []
+
+    def add_document(path: str, filename: str, pages: List[Tuple[int, str]]) -> None:
+        standard = parse_standard_id(filename) or (None, None)
+        documents.append({
+            'path': path,
+            'filename': filename,
+            'designation': standard[0],
+            'base': standard[1],
+            'metadata': extract_metadata_from_path(os.path.join(settings.STANDARDS_DIR, path))
+        })
+        for row in parse_definitions(pages):
+            entries.append([len(documents) - 1, *row])
+
+    current = None
+    pages: List[Tuple[int, str]] = []
+    for chunk in iter_corpus_pages(directories, workers):
+        if current is not None and current[0] != chunk['path']:
+            add_document(*current, pages)
+            pages = []
+        current = (chunk['path'], chunk['filename'])
+        pages.append((chunk['page'], chunk['text']))
+    if current is not None:
+        add_document(*current, pages)
+
+    index = {'version': INDEX_VERSION, 'documents': documents, 'entries': entries}
+    os.makedirs(os.path.dirname(output_path), exist_ok=True)
+    with gzip.open(output_path, 'wt', encoding='utf-8') as f:
+        json.dump(index, f, separators=(',', ':'))
+
+    stats = {
+        'documents': len({entry[0] for entry in entries}),
+        'definitions': len(entries),
+        'terms': len({normalize_term(entry[3]) for entry in entries}),
+        'seconds': round(time.monotonic() - started, 1),
+        'bytes': os.path.getsize(output_path)
+    }
+    print(f"\n=== Glossary Index Summary ===")
+    print(f"Documents with definitions: {stats['documents']}")
+    print(f"Definitions: {stats['definitions']}")
+    print(f"Distinct terms: {stats['terms']}")
+    print(f"Index size: {stats['bytes'] / 1e6:.1f} MB")
+    print(f"Elapsed: {stats['seconds']}s")
+    return stats
+
+
+class GlossaryIndex:
+    """
+    In-memory term -> definitions map.
+
+    Definitions of a term are ordered glossary first, then Active before
+    Superseded and newest first; only the preferred issue of each standard
+    is kept, so a term defined identically by several issues appears once.
+    """
+
+    def __init__(self, index: Dict):
+        self.documents = index['documents']
+        self.entries = index['entries']
+        self.by_term: Dict[str, List[int]] = {}
+
+        def preference(entry_id: int) -> tuple:
+            document = self.documents[self.entries[entry_id][0]]
+            return (document['base'] != GLOSSARY_STANDARD, document_preference(document))
+
+        standards: Dict[str, set] = {}
+        for entry_id in sorted(range(len(self.entries)), key=preference):
+            document = self.documents[self.entries[entry_id][0]]
+            standard = document['base'] or document['filename']
+            for key in term_keys(self.entries[entry_id][3]):
+                if standard not in standards.setdefault(key, set()):
+                    standards[key].add(standard)
+                    self.by_term.setdefault(key, []).append(entry_id)
+
+    @classmethod
+    def load(cls, path: str = settings.GLOSSARY_INDEX_PATH) -> Optional["GlossaryIndex"]:
+        """Load an index written by build_glossary_index(), or None if there is none."""
+        if not os.path.exists(path):
+            return None
+        with gzip.open(path, 'rt', encoding='utf-8') as f:
+            index = json.load(f)
+        if index.get('version') != INDEX_VERSION:
+            print(f"⚠ Glossary index {path} has an unsupported version, rebuild it")
+            return None
+        return cls(index)
+
+    def find(self, term: str) -> Optional[str]:
+        """The indexed key for a term, trying the singular of a plural; None when it is not defined."""
+        key = normalize_term(term)
+        for candidate in (key, key[:-1] if key.endswith('s') else None, key[:-2] if key.endswith('es') else None):
+            if candidate and candidate in self.by_term:
+                return candidate
+        return None
+
+    def lookup(self, term: str, filters: Optional[Dict[str, str]] = None) -> List[Dict]:
+        """Definitions of a term, formatted like /api/search results."""
+        key = self.find(term)
+        results = []
+        for entry_id in self.by_term.get(key, []) if key else []:
+            doc_id, clause, page, title, definition, notes = self.entries[entry_id]
+            document = self.documents[doc_id]
+            if filters and not metadata_matches(document['metadata'], filters):
+                continue
+            results.append({
+                'id': f"{document['filename']}#{clause}",
+                'title': document['filename'],
+                'content': definition,
+                'score': 1.0,
+                'page': page,
+                'term': title,
+                'notes': notes,
+                'clause': clause,
+                'standard': f"ECSS-{document['designation']}" if document['designation'] else None,
+                'metadata': {**document['metadata'], 'page_number': page}
+            })
+        return results
+
+    def stats(self) -> Dict:
+        return {'definitions': len(self.entries), 'terms': len(self.by_term)}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build the term/definition index over the ECSS PDFs")
+    parser.add_argument('--output', default=settings.GLOSSARY_INDEX_PATH, help="Index file to write")
+    parser.add_argument('--workers', type=int, default=None, help="Extraction processes (default: all cores)")
+    args = parser.parse_args()
+
+    print(f"Building glossary index from: {settings.STANDARDS_DIR}")
+    build_glossary_index([settings.ACTIVE_STANDARDS_DIR, settings.SUPERSEDED_STANDARDS_DIR],
+                         args.output, args.workers)
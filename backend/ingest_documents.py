@@ -1,9 +1,23 @@
 from morphik import Morphik
+import argparse
+import httpx
 import os
-from typing import List, Dict
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import List, Dict, Optional, Tuple
 import re
 from dotenv import load_dotenv
 
+import settings
+from document_catalog import forget_documents, record_documents
+from ingest_journal import IngestJournal, print_journal
+from ingest_manifest import (IngestManifest, find_orphans, join_external_ids, manifest_key,
+                             plan_ingestion, split_external_ids)
+from pdf_split import part_metadata, remove_parts, split_pdf
+from rate_limit import TokenBucket
+from status_tracker import StatusTracker, TERMINAL_STATES
+from search_cache import invalidate_search_cache
+
 # Load environment variables from .env file
 load_dotenv()
 
@@ -44,11 +58,409 @@ def extract_metadata_from_filename(filename: str) -> Dict:
         'source': 'ECSS_Published_Standards'
     }
 
+# Full ECSS designation as written in filenames and in the standards' text:
+# branch, optional document type (ST, HB, TM, AS), number, optional "Part N"
+# and issue letter, e.g. ECSS-E-ST-20-08C or ECSS-E-40Part1B
+STANDARD_ID_PATTERN = re.compile(
+    r'ECSS[-\s]([A-Z])[-\s](?:([A-Z]{2})[-\s])?(\d+(?:-\d+)*)(?:\s?part\s?(\d+(?:\.\d+)?))?([A-Z](?!(?!rev)[A-Z]))?',
+    re.IGNORECASE)
+
+# PDF text uses typographic hyphens (U+2010 and friends) inside designations
+DASHES = str.maketrans({'‐': '-', '‑': '-', '‒': '-', '–': '-', '−': '-'})
+
+def standard_id_from_match(match: re.Match) -> Tuple[str, str]:
+    """(designation, designation without issue letter) of a STANDARD_ID_PATTERN match."""
+    branch, doc_type, number, part, issue = match.groups()
+    base = '-'.join(p.upper() for p in (branch, doc_type, number) if p)
+    if part:
+        base += f" Part {part}"
+    return base + (issue or '').upper(), base
+
+def parse_standard_id(text: str) -> Optional[Tuple[str, str]]:
+    """
+    Normalized designation of the first ECSS standard ID in a filename or text.
+
+    Returns:
+        (designation, designation without issue letter), e.g.
+        ('E-ST-40C', 'E-ST-40'), or None when there is no ECSS ID
+    """
+    match = STANDARD_ID_PATTERN.search(text.translate(DASHES))
+    return standard_id_from_match(match) if match else None
+
+MONTHS = {name: number for number, name in enumerate(
+    ('jan', 'feb', 'mar', 'apr', 'may', 'jun', 'jul', 'aug', 'sep', 'oct', 'nov', 'dec'), start=1)}
+
+def extract_publication_date(filename: str) -> Optional[str]:
+    """Extract the ISO publication date from the '(15June2020)' part of an ECSS filename."""
+    match = re.search(r'\((\d{1,2})\s*([A-Za-z]+)(\d{4})\)', filename)
+    if not match:
+        return None
+    day, month_name, year = match.groups()
+    month = MONTHS.get(month_name[:3].lower())
+    if not month:
+        return None
+    return f"{year}-{month:02d}-{int(day):02d}"
+
+def extract_metadata_from_path(full_path: str) -> Dict:
+    """
+    Extract metadata from an ECSS PDF path.
+    
+    Adds the publication date and the Active/Superseded status (from the
+    standards tree the file lives in) to the filename metadata.
+    """
+    filename = os.path.basename(full_path)
+    metadata = extract_metadata_from_filename(filename)
+    
+    publication_date = extract_publication_date(filename)
+    if publication_date:
+        metadata['publication_date'] = publication_date
+    
+    full_path = os.path.abspath(full_path)
+    for status, directory in (('Active', settings.ACTIVE_STANDARDS_DIR),
+                              ('Superseded', settings.SUPERSEDED_STANDARDS_DIR)):
+        directory = os.path.abspath(directory)
+        if os.path.commonpath([full_path, directory]) == directory:
+            metadata['standard_status'] = status
+    
+    return metadata
+
+def list_standard_pdfs(directories: List[str]) -> List[str]:
+    """List every PDF under the given standards directories (relative to STANDARDS_DIR)."""
+    document_paths = []
+    for directory in directories:
+        for root, _, files in os.walk(directory):
+            for name in sorted(files):
+                if name.lower().endswith('.pdf'):
+                    full_path = os.path.join(root, name)
+                    document_paths.append(os.path.relpath(full_path, settings.STANDARDS_DIR))
+    return document_paths
+
+def ingest_file(
+    db: Morphik,
+    pdf_directory: str,
+    doc_path: str,
+    rate_limiter: TokenBucket = None,
+    extra_metadata: Optional[Dict] = None
+) -> Dict:
+    """
+    Upload a single PDF to Morphik.
+    
+    PDFs above SPLIT_MAX_BYTES or SPLIT_MAX_PAGES are uploaded as page-range
+    parts (see pdf_split.py), in parallel and retried independently.
+    
+    Returns a per-file result with the outcome, document ID(s), size and timings
+    (total upload seconds plus per-stage seconds under 'stages'). 'documents'
+    lists every Morphik document created, one per part for split PDFs, and
+    'external_id' joins their IDs as stored in the manifest.
+    """
+    full_path = os.path.join(pdf_directory, doc_path)
+    filename = os.path.basename(doc_path)
+    result = {
+        'filename': filename,
+        'path': full_path,
+        'status': 'failed',
+        'external_id': None,
+        'documents': [],
+        'parts': 0,
+        'bytes': 0,
+        'seconds': 0.0,
+        'stages': {},
+        'error': None,
+        'error_kind': None
+    }
+    
+    # Check if file exists
+    if not os.path.exists(full_path):
+        result['status'] = 'missing'
+        result['error'] = 'File not found'
+        return result
+    
+    result['bytes'] = os.path.getsize(full_path)
+    
+    # Extract metadata from filename and location
+    stage_started = time.monotonic()
+    metadata = extract_metadata_from_path(full_path)
+    if extra_metadata:
+        metadata.update(extra_metadata)
+    result['metadata'] = metadata
+    result['stages']['metadata'] = time.monotonic() - stage_started
+    
+    # Oversized PDFs go up as page-range parts, each retried on its own
+    stage_started = time.monotonic()
+    try:
+        parts = split_pdf(full_path)
+    except Exception as e:
+        print(f"⚠ Could not split {filename}, uploading it whole: {e}")
+        parts = []
+    if parts:
+        result['stages']['split'] = time.monotonic() - stage_started
+    
+    started = time.monotonic()
+    try:
+        if parts:
+            uploads = upload_parts(db, parts, metadata, rate_limiter)
+        else:
+            uploads = [upload_with_retry(db, full_path, filename, metadata, rate_limiter)]
+        result['status'] = 'ingested'
+        result['documents'] = uploads
+        result['external_id'] = join_external_ids(u['external_id'] for u in uploads)
+        result['document_status'] = uploads[0]['document_status']
+        result['stages']['rate_limit'] = sum(u['rate_limit'] for u in uploads)
+    except Exception as e:
+        result['error'] = error_summary(e)
+        result['error_kind'] = error_kind(e)
+    finally:
+        remove_parts(parts)
+    result['parts'] = len(parts)
+    result['seconds'] = time.monotonic() - started
+    result['stages']['upload'] = max(0.0, result['seconds'] - result['stages'].get('rate_limit', 0.0))
+    return result
+
+def error_summary(error: Exception) -> str:
+    """First line of an error message (httpx appends a documentation link)."""
+    message = str(error)
+    return message.splitlines()[0] if message else type(error).__name__
+
+class UploadError(Exception):
+    """Failed upload of a split PDF, with the error kind of its failed parts."""
+    
+    def __init__(self, message: str, kind: str):
+        super().__init__(message)
+        self.kind = kind
+
+def is_transient_error(error: Exception) -> bool:
+    """Whether a failed upload is worth retrying (network errors, 429 and 5xx responses)."""
+    if isinstance(error, UploadError):
+        return error.kind == 'transient'
+    if isinstance(error, httpx.HTTPStatusError):
+        return error.response.status_code == 429 or error.response.status_code >= 500
+    return isinstance(error, (httpx.TransportError, ConnectionError, TimeoutError))
+
+def is_quota_error(error: Exception) -> bool:
+    """Whether Morphik refused an upload because an account limit (e.g. the free-tier file count) was hit."""
+    if isinstance(error, UploadError):
+        return error.kind == 'quota'
+    if isinstance(error, httpx.HTTPStatusError) and error.response.status_code in (402, 403):
+        text = error.response.text.lower()
+        return 'quota' in text or 'limit' in text
+    return False
+
+def error_kind(error: Exception) -> str:
+    """
+    Classify a failed upload for the ingestion journal.
+    
+    'transient' failures (network, 429, 5xx) and 'quota' failures are
+    retried by a later run; 'permanent' ones (the file was rejected) are
+    not retried until the file changes.
+    """
+    if is_quota_error(error):
+        return 'quota'
+    return 'transient' if is_transient_error(error) else 'permanent'
+
+def upload_with_retry(
+    db: Morphik,
+    full_path: str,
+    filename: str,
+    metadata: Dict,
+    rate_limiter: TokenBucket = None,
+    attempts: int = settings.INGEST_UPLOAD_ATTEMPTS,
+    backoff: float = settings.INGEST_RETRY_BACKOFF
+) -> Dict:
+    """
+    Upload one file, retrying transient failures with exponential backoff.
+    
+    Returns:
+        Dict with the Morphik external_id, filename, metadata, initial
+        document_status and seconds spent waiting on the rate limit
+    """
+    waited = 0.0
+    for attempt in range(1, max(1, attempts) + 1):
+        if rate_limiter is not None:
+            waited += rate_limiter.acquire()
+        try:
+            doc = db.ingest_file(
+                file=full_path,
+                filename=filename,
+                metadata=metadata,
+                use_colpali=True  # Better retrieval accuracy
+            )
+            return {
+                'external_id': getattr(doc, 'external_id', None),
+                'filename': metadata.get('filename', filename),
+                'metadata': metadata,
+                'document_status': getattr(doc, 'system_metadata', {}).get('status', 'N/A'),
+                'rate_limit': waited
+            }
+        except Exception as e:
+            if attempt >= attempts or not is_transient_error(e):
+                raise
+            delay = backoff * 2 ** (attempt - 1)
+            print(f"⚠ Upload of {filename} failed ({error_summary(e)}), retry {attempt}/{attempts - 1} in {delay:g}s")
+            time.sleep(delay)
+
+def upload_parts(
+    db: Morphik,
+    parts: List[Dict],
+    metadata: Dict,
+    rate_limiter: TokenBucket = None,
+    workers: int = settings.SPLIT_UPLOAD_WORKERS
+) -> List[Dict]:
+    """
+    Upload the parts of a split PDF concurrently, each with its own retries.
+    
+    The document is only ingested if every part is: when a part still fails
+    after its retries, the parts already uploaded are deleted again and the
+    error is raised.
+    
+    Returns:
+        The upload_with_retry() result of every part, in page order
+    """
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+        futures = [
+            executor.submit(upload_with_retry, db, part['path'], os.path.basename(part['path']),
+                            part_metadata(metadata, part), rate_limiter)
+            for part in parts
+        ]
+        uploads, errors, kinds = [], [], set()
+        for part, future in zip(parts, futures):
+            try:
+                uploads.append(future.result())
+            except Exception as e:
+                kinds.add(error_kind(e))
+                errors.append(f"part {part['part']}/{part['parts']} "
+                              f"(pages {part['first_page']}-{part['last_page']}): {error_summary(e)}")
+    
+    if errors:
+        for upload in uploads:
+            if upload['external_id']:
+                delete_remote_document(db, upload['external_id'], upload['filename'])
+        kind = next(k for k in ('permanent', 'quota', 'transient') if k in kinds)
+        raise UploadError('; '.join(errors), kind)
+    return uploads
+
+def print_ingest_result(result: Dict) -> None:
+    """Print the outcome of a single upload as soon as it finishes."""
+    if result['status'] == 'missing':
+        print(f"✗ File not found: {result['path']}")
+    elif result['status'] == 'skipped':
+        print(f"⚠ Skipped {result['filename']}: {result['error']}")
+    elif result['status'] == 'ingested':
+        print(f"✓ Successfully ingested {result['filename']} "
+              f"({result['bytes'] / 1e6:.1f} MB in {result['seconds']:.1f}s)")
+        if result['parts']:
+            print(f"  Uploaded in {result['parts']} parts")
+        print(f"  Document ID: {result['external_id'] or 'N/A'}")
+        print(f"  Status: {result.get('document_status', 'N/A')}")
+    else:
+        print(f"✗ Error ingesting {result['filename']}: {result['error']}")
+
+def delete_remote_document(db: Morphik, external_id: str, filename: str) -> bool:
+    """Delete a document from Morphik, reporting (not raising) failures."""
+    try:
+        db.delete_document(external_id)
+        forget_documents([external_id])
+        print(f"  Deleted remote document {external_id} ({filename})")
+        return True
+    except Exception as e:
+        print(f"✗ Error deleting remote document {external_id} ({filename}): {e}")
+        return False
+
+def delete_orphaned_documents(db: Morphik, manifest: IngestManifest) -> bool:
+    """Delete remote documents whose source PDF no longer exists on disk."""
+    orphans = find_orphans(manifest)
+    print(f"Sync: {len(orphans)} remote document(s) without a source PDF")
+    deleted = False
+    for entry in orphans:
+        external_ids = split_external_ids(entry['external_id'])
+        if all([delete_remote_document(db, external_id, entry['filename']) for external_id in external_ids]):
+            manifest.remove(entry['path'])
+            deleted = True
+    return deleted
+
+def apply_duplicate_policy(
+    pdf_directory: str,
+    document_paths: List[str],
+    policy: str
+) -> Dict[str, Optional[Dict]]:
+    """
+    Decide how duplicate PDFs found by duplicate_detection.py are ingested.
+    
+    With 'skip', non-canonical members of a duplicate cluster are left out;
+    with 'link', they are uploaded with duplicate_of / duplicate_cluster
+    metadata pointing at the canonical PDF, so retrieval can filter them.
+    
+    Returns:
+        The document paths to ingest, each mapped to the extra metadata to
+        upload it with (None for none)
+    """
+    from duplicate_detection import duplicate_paths, load_duplicate_report
+    
+    report = load_duplicate_report()
+    if report is None:
+        print("⚠ No duplicate report found, run duplicate_detection.py first; ingesting every file")
+        return {doc_path: None for doc_path in document_paths}
+    
+    duplicates = duplicate_paths(report)
+    selected = {}
+    skipped = 0
+    for doc_path in document_paths:
+        duplicate = duplicates.get(manifest_key(os.path.join(pdf_directory, doc_path)))
+        if duplicate is None:
+            selected[doc_path] = None
+        elif policy == 'skip':
+            skipped += 1
+            print(f"  Skipping {os.path.basename(doc_path)}: {duplicate['match']} "
+                  f"({duplicate['similarity']:.2f}) of {duplicate['canonical']}")
+        else:
+            selected[doc_path] = {
+                'duplicate_of': duplicate['canonical'],
+                'duplicate_cluster': duplicate['cluster']
+            }
+    linked = sum(1 for extra in selected.values() if extra)
+    print(f"Duplicates: {skipped} skipped, {linked} linked to their canonical document "
+          f"(report from {report['generated_at']})")
+    return selected
+
+def record_processing_outcome(
+    db: Morphik,
+    key: str,
+    filename: str,
+    external_ids: List[str],
+    statuses: Dict[str, str],
+    journal: IngestJournal,
+    manifest: Optional[IngestManifest]
+) -> None:
+    """
+    Journal the Morphik processing outcome of an uploaded file.
+    
+    A file whose processing failed is deleted remotely and dropped from the
+    manifest, so a later run uploads it again (after the journal backoff).
+    """
+    file_statuses = [statuses.get(external_id) for external_id in external_ids]
+    if file_statuses and all(status == 'completed' for status in file_statuses):
+        journal.mark_processed(key)
+    elif 'failed' in file_statuses:
+        for external_id in external_ids:
+            delete_remote_document(db, external_id, filename)
+        if manifest is not None:
+            manifest.remove(key)
+        journal.mark_failed(key, "Morphik processing failed", transient=True)
+
 def ingest_ecss_documents(
     morphik_uri: str,
     pdf_directory: str,
-    document_paths: List[str]
-) -> None:
+    document_paths: List[str],
+    workers: int = 1,
+    rate_limit: float = 0.0,
+    rate_burst: int = 1,
+    manifest: IngestManifest = None,
+    sync: bool = False,
+    wait_for_processing: bool = False,
+    processing_timeout: float = settings.PROCESSING_TIMEOUT,
+    duplicates: Optional[str] = None,
+    journal: IngestJournal = None,
+    retry_failed: bool = False
+) -> List[Dict]:
     """
     Ingest ECSS documents into Morphik with proper metadata.
     
@@ -56,6 +468,28 @@ def ingest_ecss_documents(
         morphik_uri: The Morphik instance URI
         pdf_directory: Base directory containing ECSS PDFs
         document_paths: List of PDF paths to ingest (relative to pdf_directory)
+        workers: Number of concurrent uploads (1 uploads sequentially)
+        rate_limit: Maximum uploads started per second (0 disables limiting)
+        rate_burst: Uploads that may start back-to-back before the limit applies
+        manifest: Content-hash manifest; when given only new or changed files
+            are uploaded and each upload is recorded with its external_id
+        sync: Also delete remote documents whose source PDF disappeared
+            (requires a manifest)
+        wait_for_processing: Track Morphik processing status of each upload
+            in the background and wait for all of them before returning
+        processing_timeout: Maximum seconds to wait for processing after
+            the last upload
+        duplicates: 'skip' or 'link' duplicate PDFs listed in the
+            duplicate_detection.py report (None ingests every file)
+        journal: Ingestion journal; when given, files are journaled before
+            upload, claimed under a lease (so concurrent runs do not upload
+            the same file) and failed files are retried by later runs with
+            backoff. Ctrl-C or a quota error stops the run with the
+            remaining files left pending for the next one.
+        retry_failed: Retry files the journal has as failed right away
+    
+    Returns:
+        Per-file results in completion order
     """
     # Initialize Morphik client
     if morphik_uri:
@@ -65,57 +499,239 @@ def ingest_ecss_documents(
         db = Morphik()
         print("Using default Morphik instance")
     
-    successful_ingestions = 0
-    failed_ingestions = 0
+    corpus_changed = False
     
-    for doc_path in document_paths:
-        full_path = os.path.join(pdf_directory, doc_path)
-        filename = os.path.basename(doc_path)
+    extra_metadata = {doc_path: None for doc_path in document_paths}
+    if duplicates:
+        extra_metadata = apply_duplicate_policy(pdf_directory, document_paths, duplicates)
+        document_paths = list(extra_metadata)
+    
+    # Skip files Morphik already has, based on their content hash
+    uploads = {doc_path: None for doc_path in document_paths}
+    if manifest is not None:
+        plan = plan_ingestion(manifest, pdf_directory, document_paths)
+        uploads = {entry['doc_path']: entry for entry in plan['new'] + plan['changed']}
+        uploads.update({doc_path: None for doc_path in plan['missing']})
+        print(f"Manifest: {len(plan['new'])} new, {len(plan['changed'])} changed, "
+              f"{len(plan['unchanged'])} unchanged, {len(plan['missing'])} missing")
         
-        # Check if file exists
-        if not os.path.exists(full_path):
-            print(f"✗ File not found: {full_path}")
-            failed_ingestions += 1
-            continue
+        if sync:
+            corpus_changed |= delete_orphaned_documents(db, manifest)
+            if journal is not None:
+                for entry in journal.entries():
+                    if manifest.get(entry['path']) is None and entry['state'] in ('uploaded', 'processed'):
+                        journal.remove(entry['path'])
+    
+    # Write every file this run will upload to the journal before starting
+    journal_keys: Dict[str, str] = {}
+    skipped = []
+    if journal is not None:
+        for doc_path, entry in list(uploads.items()):
+            full_path = os.path.join(pdf_directory, doc_path)
+            if not os.path.exists(full_path):
+                continue
+            key = entry['key'] if entry else manifest_key(full_path)
+            reason = journal.enqueue(key, doc_path, entry['sha256'] if entry else None,
+                                     force=manifest is None, retry_failed=retry_failed)
+            if reason is None:
+                journal_keys[doc_path] = key
+            else:
+                del uploads[doc_path]
+                skipped.append((doc_path, reason))
+        counts = journal.counts()
+        print(f"Journal: {len(journal_keys)} queued, {len(skipped)} skipped, "
+              f"{counts['uploaded']} awaiting processing, {counts['failed']} failed")
+        for doc_path, reason in skipped:
+            print(f"  Skipping {os.path.basename(doc_path)}: {reason}")
+    
+    rate_limiter = TokenBucket(rate_limit, rate_burst) if rate_limit > 0 else None
+    workers = max(1, workers)
+    print(f"Uploading with {workers} worker(s)"
+          + (f", at most {rate_limit:g} uploads/s" if rate_limiter else ""))
+    
+    results = []
+    started = time.monotonic()
+    
+    # Polls processing status while the remaining uploads are still running
+    tracker = StatusTracker(db, show_progress=False) if wait_for_processing else None
+    
+    # Journal key -> (filename, external_ids) of uploads whose processing is tracked
+    awaiting: Dict[str, Tuple[str, List[str]]] = {}
+    if tracker is not None and journal is not None:
+        # Resume tracking files an earlier run uploaded but did not see processed
+        for entry in journal.entries('uploaded'):
+            awaiting[entry['path']] = (os.path.basename(entry['path']), split_external_ids(entry['external_id']))
+            for external_id in awaiting[entry['path']][1]:
+                tracker.add(external_id, os.path.basename(entry['path']))
+    
+    def upload(doc_path: str) -> Dict:
+        key = journal_keys.get(doc_path)
+        if key is not None and not journal.claim(key):
+            return {'filename': os.path.basename(doc_path), 'path': os.path.join(pdf_directory, doc_path),
+                    'status': 'skipped', 'error': 'claimed by another run', 'documents': [], 'bytes': 0}
+        return ingest_file(db, pdf_directory, doc_path, rate_limiter, extra_metadata.get(doc_path))
+    
+    def handle(doc_path: str, result: Dict) -> bool:
+        """Record one finished upload; returns False when the run should stop."""
+        results.append(result)
+        print(f"\n[{len(results)}/{len(uploads)}] ", end='')
+        print_ingest_result(result)
         
-        # Extract metadata from filename
-        metadata = extract_metadata_from_filename(filename)
+        if tracker is not None:
+            for document in result['documents']:
+                tracker.add(document['external_id'], document['filename'])
         
-        print(f"\nIngesting {filename}...")
-        print(f"  Path: {full_path}")
-        print(f"  Metadata: {metadata}")
+        entry = uploads[doc_path]
+        key = journal_keys.get(doc_path)
+        if result['status'] == 'ingested':
+            if manifest is not None and entry is not None:
+                manifest.record(entry['key'], entry['sha256'], entry['size'], entry['mtime'],
+                                result['external_id'])
+                # Replace, don't duplicate, the previous upload of a changed file
+                for previous_id in split_external_ids(entry.get('previous_external_id')):
+                    delete_remote_document(db, previous_id, result['filename'])
+            # Journaled after the manifest: a crash in between never loses the upload
+            if key is not None:
+                journal.mark_uploaded(key, result['external_id'])
+                awaiting[key] = (result['filename'], split_external_ids(result['external_id']))
+        elif result['status'] == 'failed' and key is not None:
+            journaled = journal.mark_failed(key, result['error'], transient=result['error_kind'] != 'permanent')
+            if journaled['error_kind'] == 'transient':
+                print(f"  Will be retried by a run after "
+                      f"{time.strftime('%H:%M:%S', time.localtime(journaled['next_attempt_at']))}")
         
-        try:
-            # Use the correct ingest_file method from Morphik SDK
-            doc = db.ingest_file(
-                file=full_path,
-                filename=filename,
-                metadata=metadata,
-                use_colpali=True  # Better retrieval accuracy
-            )
-            
-            print(f"✓ Successfully ingested {filename}")
-            print(f"  Document ID: {getattr(doc, 'external_id', 'N/A')}")
-            print(f"  Status: {getattr(doc, 'status', 'N/A')}")
-            successful_ingestions += 1
-            
-        except Exception as e:
-            print(f"✗ Error ingesting {filename}: {e}")
-            failed_ingestions += 1
+        return result.get('error_kind') != 'quota'
+    
+    # Results stream in as each upload finishes
+    stopped = False
+    try:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = {executor.submit(upload, doc_path): doc_path for doc_path in uploads}
+            remaining = set(futures)
+            while remaining:
+                try:
+                    for future in as_completed(remaining):
+                        remaining.discard(future)
+                        if future.cancelled():
+                            continue
+                        if not handle(futures[future], future.result()) and not stopped:
+                            stopped = True
+                            print("\n⚠ Morphik refused the upload because of an account limit, stopping; "
+                                  "the remaining files stay queued for the next run")
+                            for pending in remaining:
+                                pending.cancel()
+                except KeyboardInterrupt:
+                    if stopped:
+                        raise
+                    stopped = True
+                    cancelled = sum(1 for pending in remaining if pending.cancel())
+                    print(f"\n⚠ Interrupted: {cancelled} upload(s) cancelled, finishing the ones in progress "
+                          f"(Ctrl-C again to abort)")
+    finally:
+        if journal is not None:
+            # Uploads this run claimed but never finished (aborted by a second Ctrl-C)
+            # go back to pending now instead of waiting for their lease to expire
+            released = journal.release()
+            if released:
+                print(f"⚠ Returned {released} unfinished upload(s) to the journal queue")
+    
+    elapsed = time.monotonic() - started
+    successful_ingestions = sum(1 for r in results if r['status'] == 'ingested')
+    failed_ingestions = sum(1 for r in results if r['status'] in ('failed', 'missing'))
+    uploaded_bytes = sum(r['bytes'] for r in results if r['status'] == 'ingested')
     
     # Summary
     print(f"\n=== Ingestion Summary ===")
     print(f"Successful: {successful_ingestions}")
     print(f"Failed: {failed_ingestions}")
-    print(f"Total: {len(document_paths)}")
+    print(f"Total: {len(uploads)}")
+    if manifest is not None:
+        print(f"Skipped (unchanged): {len(document_paths) - len(uploads) - len(skipped)}")
+    if journal is not None:
+        claimed_elsewhere = sum(1 for r in results if r['status'] == 'skipped')
+        print(f"Skipped (journal): {len(skipped) + claimed_elsewhere}")
+        if stopped:
+            print(f"Left pending for the next run: {len(uploads) - len(results)}")
+    print(f"Elapsed: {elapsed:.1f}s")
+    if elapsed > 0:
+        print(f"Throughput: {successful_ingestions / elapsed:.2f} files/s, "
+              f"{uploaded_bytes / 1e6 / elapsed:.2f} MB/s")
+    if rate_limiter is not None:
+        print(f"Time spent waiting on rate limit: {rate_limiter.waited:.1f}s")
+    
+    if tracker is not None and tracker.statuses and not stopped:
+        print(f"\nWaiting for Morphik to process {len(tracker.statuses)} document(s)...")
+        tracker.show_progress = True
+        statuses = tracker.wait(processing_timeout)
+        for result in results:
+            for document in result['documents']:
+                document['document_status'] = statuses.get(document['external_id'], document['document_status'])
+            if result['documents']:
+                result['document_status'] = result['documents'][0]['document_status']
+        counts = tracker.counts()
+        print(f"Processed: {counts['completed']}, processing failed: {counts['failed']}, "
+              f"still processing: {counts['pending']}")
+        for doc_id, status in statuses.items():
+            if status not in TERMINAL_STATES or status == 'failed':
+                print(f"  {tracker.names[doc_id]} ({doc_id}): {status}")
+        if journal is not None:
+            for key, (filename, external_ids) in awaiting.items():
+                record_processing_outcome(db, key, filename, external_ids, statuses, journal, manifest)
+    elif tracker is not None:
+        tracker.stop()
+    
+    if successful_ingestions > 0:
+        # Let the API resolve the new documents without asking Morphik
+        record_documents(document for r in results if r['status'] == 'ingested'
+                         for document in r['documents'] if document['external_id'])
+    
+    if successful_ingestions > 0 or corpus_changed:
+        # The corpus changed: drop cached API search responses
+        invalidate_search_cache()
     
     if successful_ingestions > 0:
         print(f"\n✓ Successfully ingested {successful_ingestions} ECSS documents into Morphik!")
         print("You can now use these documents for searching and retrieval.")
+    elif not uploads:
+        print(f"\n✓ All documents are up to date, nothing to ingest.")
     else:
         print(f"\n✗ No documents were successfully ingested. Please check the errors above.")
+    
+    return results
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Ingest ECSS standards into Morphik")
+    parser.add_argument('--all', action='store_true',
+                        help="Ingest every PDF in the Active and Superseded trees")
+    parser.add_argument('--workers', type=int, default=settings.INGEST_WORKERS,
+                        help="Number of concurrent uploads")
+    parser.add_argument('--rate-limit', type=float, default=settings.INGEST_RATE_LIMIT,
+                        help="Maximum uploads started per second (0 disables)")
+    parser.add_argument('--rate-burst', type=int, default=settings.INGEST_RATE_BURST,
+                        help="Uploads allowed back-to-back before the rate limit applies")
+    parser.add_argument('--wait', action='store_true',
+                        help="Wait for Morphik to finish processing the uploaded documents")
+    parser.add_argument('--processing-timeout', type=float, default=settings.PROCESSING_TIMEOUT,
+                        help="Maximum seconds to wait for processing after the last upload")
+    parser.add_argument('--force', action='store_true',
+                        help="Upload every file, ignoring the ingestion manifest")
+    parser.add_argument('--sync', action='store_true',
+                        help="Also delete remote documents whose source PDF disappeared")
+    parser.add_argument('--retry-failed', action='store_true',
+                        help="Retry files the ingestion journal has as failed now, ignoring their backoff")
+    parser.add_argument('--no-journal', action='store_true',
+                        help="Do not record per-file progress in the ingestion journal")
+    parser.add_argument('--duplicates', choices=['skip', 'link'],
+                        help="Skip duplicate PDFs found by duplicate_detection.py, or upload them "
+                             "linked to their canonical document")
+    parser.add_argument('--benchmark', type=int, nargs='+', metavar='WORKERS',
+                        help="Benchmark ingestion against a local upload stand-in with these worker counts")
+    parser.add_argument('--upload-bandwidth', type=float, default=10.0,
+                        help="Benchmark: simulated upload speed in MB/s (0 = unlimited)")
+    parser.add_argument('--processing-rate', type=float, default=2.0,
+                        help="Benchmark: simulated server-side processing speed in MB/s")
+    args = parser.parse_args()
+    
     # The 5 initial documents with exact filenames
     INITIAL_DOCUMENTS = [
         "ECSS-S-ST-00C Rev.1(15June2020).pdf",           # System Description
@@ -133,12 +749,48 @@ if __name__ == "__main__":
         print("To use a specific instance, set MORPHIK_URI in your .env file:")
         print("MORPHIK_URI=your_morphik_uri_here")
     
-    # Base directory containing ECSS PDFs (corrected path)
-    pdf_directory = "ECSS Published Standards/1-Active Standards"
+    # Base directory containing ECSS PDFs
+    if args.all:
+        pdf_directory = settings.STANDARDS_DIR
+        document_paths = list_standard_pdfs([settings.ACTIVE_STANDARDS_DIR, settings.SUPERSEDED_STANDARDS_DIR])
+    else:
+        pdf_directory = settings.ACTIVE_STANDARDS_DIR
+        document_paths = INITIAL_DOCUMENTS
+    
+    if args.benchmark:
+        from bench_ingest import run_ingest_benchmark
+        run_ingest_benchmark(
+            pdf_directory,
+            document_paths,
+            args.benchmark,
+            upload_bandwidth=args.upload_bandwidth * 1e6,
+            processing_rate=args.processing_rate * 1e6,
+            rate_limit=args.rate_limit,
+            rate_burst=args.rate_burst
+        )
+        raise SystemExit(0)
     
     print(f"Starting ECSS document ingestion...")
     print(f"PDF directory: {pdf_directory}")
-    print(f"Documents to ingest: {len(INITIAL_DOCUMENTS)}")
+    print(f"Documents to ingest: {len(document_paths)}")
     
     # Ingest documents
-    ingest_ecss_documents(morphik_uri, pdf_directory, INITIAL_DOCUMENTS) 
\ No newline at end of file
+    journal = None if args.no_journal else IngestJournal()
+    ingest_ecss_documents(
+        morphik_uri,
+        pdf_directory,
+        document_paths,
+        workers=args.workers,
+        rate_limit=args.rate_limit,
+        rate_burst=args.rate_burst,
+        manifest=None if args.force else IngestManifest(),
+        sync=args.sync,
+        wait_for_processing=args.wait,
+        processing_timeout=args.processing_timeout,
+        duplicates=args.duplicates,
+        journal=journal,
+        retry_failed=args.retry_failed
+    )
+    if journal is not None:
+        print()
+        print_journal(journal)
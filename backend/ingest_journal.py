@@ -0,0 +1,291 @@
+import argparse
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Dict, List, Optional
+
+import settings
+
+# Per-file states, in pipeline order
+STATES = ('pending', 'uploading', 'uploaded', 'processed', 'failed')
+
+
+def _owner_alive(owner: str) -> bool:
+    """Whether the run holding a lease may still be running (only checkable on this host)."""
+    host, _, rest = owner.partition(':')
+    pid = rest.partition(':')[0]
+    if host != socket.gethostname() or not pid.isdigit():
+        return True
+    try:
+        os.kill(int(pid), 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+class IngestJournal:
+    """
+    Write-ahead journal of per-file ingestion state, shared by all runs.
+
+    Every file a run intends to upload is written as 'pending' before any
+    upload starts, moves to 'uploading' under a lease when a worker picks it
+    up, then to 'uploaded' (and 'processed' once Morphik finishes) or
+    'failed'. A run that dies leaves its files pending or with an expiring
+    lease, so the next run resumes them; a live lease held by another run
+    keeps two concurrent runs from uploading the same file. Leases of runs
+    that died on this host are taken over right away.
+
+    Failures are either transient (network errors, 429/5xx, quota limits),
+    retried by later runs after an exponential backoff, or permanent
+    (rejected files), retried only when the file changes or on request.
+    """
+
+    def __init__(
+        self,
+        path: str = settings.INGEST_JOURNAL_PATH,
+        lease_seconds: float = settings.INGEST_LEASE_SECONDS,
+        backoff: float = settings.INGEST_JOURNAL_BACKOFF,
+        max_backoff: float = settings.INGEST_JOURNAL_MAX_BACKOFF,
+        max_attempts: int = settings.INGEST_JOURNAL_MAX_ATTEMPTS
+    ):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.path = path
+        self.lease_seconds = lease_seconds
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.max_attempts = max_attempts
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        # Upload workers share the connection; sqlite waits up to 30s for other runs' writes
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=30.0, check_same_thread=False, isolation_level=None)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS files (
+                path TEXT PRIMARY KEY,
+                doc_path TEXT NOT NULL,
+                sha256 TEXT,
+                state TEXT NOT NULL,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                error TEXT,
+                error_kind TEXT,
+                next_attempt_at REAL,
+                external_id TEXT,
+                owner TEXT,
+                lease_expires REAL,
+                updated_at REAL NOT NULL
+            )
+        """)
+
+    def _execute(self, statement: str, parameters: tuple = ()) -> sqlite3.Cursor:
+        with self._lock:
+            return self._conn.execute(statement, parameters)
+
+    def get(self, key: str) -> Optional[Dict]:
+        row = self._execute("SELECT * FROM files WHERE path = ?", (key,)).fetchone()
+        return dict(row) if row else None
+
+    def entries(self, state: Optional[str] = None) -> List[Dict]:
+        if state is None:
+            rows = self._execute("SELECT * FROM files ORDER BY path")
+        else:
+            rows = self._execute("SELECT * FROM files WHERE state = ? ORDER BY path", (state,))
+        return [dict(row) for row in rows]
+
+    def enqueue(
+        self,
+        key: str,
+        doc_path: str,
+        sha256: Optional[str],
+        force: bool = False,
+        retry_failed: bool = False
+    ) -> Optional[str]:
+        """
+        Record that this run wants to upload a file.
+
+        Args:
+            key: Manifest key of the file
+            doc_path: Path relative to the run's PDF directory
+            sha256: Content hash (None when unknown, e.g. with --force)
+            force: Upload even if the journal has it as uploaded or failed
+            retry_failed: Retry failed files now, ignoring backoff and
+                permanent failures
+
+        Returns:
+            None when the file should be uploaded (it is now 'pending'),
+            otherwise why it is skipped
+        """
+        now = time.time()
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._conn.execute("SELECT * FROM files WHERE path = ?", (key,)).fetchone()
+                reason = None
+                if row is not None and (sha256 is None or row['sha256'] == sha256):
+                    reason = self._skip_reason(row, now, force, retry_failed)
+                if reason is None:
+                    interrupted = row is not None and row['state'] == 'uploading'
+                    attempts = row['attempts'] if row is not None and row['sha256'] == sha256 else 0
+                    self._conn.execute(
+                        """
+                        INSERT OR REPLACE INTO files
+                            (path, doc_path, sha256, state, attempts, error, error_kind,
+                             next_attempt_at, external_id, owner, lease_expires, updated_at)
+                        VALUES (?, ?, ?, 'pending', ?, NULL, NULL, NULL, NULL, NULL, NULL, ?)
+                        """,
+                        (key, doc_path, sha256, attempts, now)
+                    )
+                    if interrupted:
+                        print(f"⚠ {os.path.basename(key)} was interrupted during upload by "
+                              f"{row['owner']}; a partial remote copy may exist")
+                self._conn.execute("COMMIT")
+                return reason
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def _skip_reason(self, row: sqlite3.Row, now: float, force: bool, retry_failed: bool) -> Optional[str]:
+        if (row['state'] == 'uploading' and row['owner'] != self.owner
+                and (row['lease_expires'] or 0) > now and _owner_alive(row['owner'])):
+            return f"being uploaded by another run ({row['owner']})"
+        if force:
+            return None
+        if row['state'] in ('uploaded', 'processed'):
+            return f"already {row['state']} ({row['external_id']})"
+        if row['state'] == 'failed' and not retry_failed:
+            if row['error_kind'] == 'permanent':
+                return f"failed permanently after {row['attempts']} attempt(s): {row['error']}"
+            if (row['next_attempt_at'] or 0) > now:
+                wait = row['next_attempt_at'] - now
+                return f"backing off {wait:.0f}s after {row['attempts']} failed attempt(s): {row['error']}"
+        return None
+
+    def claim(self, key: str) -> bool:
+        """
+        Take the upload lease on a pending file (or one whose lease expired).
+
+        Returns:
+            False when another run claimed or finished the file in the meantime
+        """
+        now = time.time()
+        cursor = self._execute(
+            """
+            UPDATE files SET state = 'uploading', owner = ?, lease_expires = ?, updated_at = ?
+            WHERE path = ? AND (state = 'pending' OR (state = 'uploading' AND lease_expires < ?))
+            """,
+            (self.owner, now + self.lease_seconds, now, key, now)
+        )
+        return cursor.rowcount == 1
+
+    def mark_uploaded(self, key: str, external_id: Optional[str]) -> None:
+        self._execute(
+            """
+            UPDATE files SET state = 'uploaded', external_id = ?, error = NULL, error_kind = NULL,
+                next_attempt_at = NULL, owner = NULL, lease_expires = NULL, updated_at = ?
+            WHERE path = ?
+            """,
+            (external_id, time.time(), key)
+        )
+
+    def mark_processed(self, key: str) -> None:
+        self._execute("UPDATE files SET state = 'processed', updated_at = ? WHERE path = ?",
+                          (time.time(), key))
+
+    def mark_failed(self, key: str, error: str, transient: bool) -> Dict:
+        """
+        Record a failed attempt and schedule the next one.
+
+        Transient failures back off exponentially (backoff, 2x backoff, ...
+        up to max_backoff) and turn permanent after max_attempts attempts.
+
+        Returns:
+            The updated journal entry
+        """
+        now = time.time()
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._conn.execute("SELECT attempts FROM files WHERE path = ?", (key,)).fetchone()
+                attempts = (row['attempts'] if row else 0) + 1
+                if transient and attempts >= self.max_attempts:
+                    transient = False
+                    error = f"{error} (gave up after {attempts} attempts)"
+                next_attempt_at = None
+                if transient:
+                    next_attempt_at = now + min(self.max_backoff, self.backoff * 2 ** (attempts - 1))
+                self._conn.execute(
+                    """
+                    UPDATE files SET state = 'failed', attempts = ?, error = ?, error_kind = ?,
+                        next_attempt_at = ?, owner = NULL, lease_expires = NULL, updated_at = ?
+                    WHERE path = ?
+                    """,
+                    (attempts, error, 'transient' if transient else 'permanent', next_attempt_at, now, key)
+                )
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+        return self.get(key)
+
+    def release(self) -> int:
+        """
+        Return this run's unfinished uploads to 'pending'; returns how many.
+
+        Called by ingest_ecss_documents() when its upload loop exits, so
+        files abandoned by an aborted run (second Ctrl-C) can be claimed by
+        the next run at once instead of after their lease expires.
+        """
+        cursor = self._execute(
+            """
+            UPDATE files SET state = 'pending', owner = NULL, lease_expires = NULL, updated_at = ?
+            WHERE state = 'uploading' AND owner = ?
+            """,
+            (time.time(), self.owner)
+        )
+        return cursor.rowcount
+
+    def remove(self, key: str) -> None:
+        self._execute("DELETE FROM files WHERE path = ?", (key,))
+
+    def counts(self) -> Dict[str, int]:
+        counts = dict.fromkeys(STATES, 0)
+        for row in self._execute("SELECT state, COUNT(*) AS n FROM files GROUP BY state"):
+            counts[row['state']] = row['n']
+        return counts
+
+    def close(self) -> None:
+        self._conn.close()
+
+
+def print_journal(journal: IngestJournal) -> None:
+    counts = journal.counts()
+    print("Ingestion journal: " + ", ".join(f"{counts[state]} {state}" for state in STATES))
+    now = time.time()
+    for entry in journal.entries('failed'):
+        if entry['error_kind'] == 'transient':
+            retry = f"retry in {max(0.0, entry['next_attempt_at'] - now):.0f}s"
+        else:
+            retry = "permanent"
+        print(f"  ✗ {entry['path']} ({entry['attempts']} attempt(s), {retry}): {entry['error']}")
+    for entry in journal.entries('uploading'):
+        print(f"  … {entry['path']} leased by {entry['owner']} "
+              f"for {max(0.0, entry['lease_expires'] - now):.0f}s")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Show the ingestion journal of ingest_documents.py")
+    parser.add_argument('--clear-failed', action='store_true',
+                        help="Forget failed files so the next run uploads them without backoff")
+    args = parser.parse_args()
+
+    journal = IngestJournal()
+    if args.clear_failed:
+        for entry in journal.entries('failed'):
+            journal.remove(entry['path'])
+    print_journal(journal)
+    journal.close()
@@ -0,0 +1,159 @@
+import hashlib
+import os
+import sqlite3
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, List, Optional
+
+import settings
+
+HASH_CHUNK_SIZE = 1024 * 1024
+
+
+def hash_file(path: str) -> str:
+    """SHA-256 of a file, streamed in 1 MB chunks."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def manifest_key(full_path: str) -> str:
+    """Stable manifest key: path relative to the standards tree when inside it."""
+    full_path = os.path.abspath(full_path)
+    standards_dir = os.path.abspath(settings.STANDARDS_DIR)
+    if os.path.commonpath([full_path, standards_dir]) == standards_dir:
+        return os.path.relpath(full_path, standards_dir)
+    return full_path
+
+
+def join_external_ids(external_ids: Iterable[Optional[str]]) -> Optional[str]:
+    """Manifest form of the Morphik documents of one PDF (several for a PDF uploaded in parts)."""
+    return ','.join(external_id for external_id in external_ids if external_id) or None
+
+
+def split_external_ids(external_id: Optional[str]) -> List[str]:
+    """Morphik document IDs stored in a manifest external_id column."""
+    return [part for part in (external_id or '').split(',') if part]
+
+
+class IngestManifest:
+    """
+    Local SQLite record of every PDF uploaded to Morphik.
+
+    Each row stores the file's content hash, size and mtime together with the
+    external_id Morphik returned (comma-separated, one per part, for PDFs
+    uploaded in page-range parts), so re-runs can skip unchanged files and a
+    sync can delete remote documents whose source PDF disappeared.
+    """
+
+    def __init__(self, path: str = settings.INGEST_MANIFEST_PATH):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.path = path
+        self._conn = sqlite3.connect(path)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS documents (
+                path TEXT PRIMARY KEY,
+                filename TEXT NOT NULL,
+                sha256 TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                mtime REAL NOT NULL,
+                external_id TEXT,
+                ingested_at REAL NOT NULL
+            )
+        """)
+        self._conn.commit()
+
+    def get(self, key: str) -> Optional[Dict]:
+        row = self._conn.execute("SELECT * FROM documents WHERE path = ?", (key,)).fetchone()
+        return dict(row) if row else None
+
+    def entries(self) -> List[Dict]:
+        return [dict(row) for row in self._conn.execute("SELECT * FROM documents ORDER BY path")]
+
+    def record(self, key: str, sha256: str, size: int, mtime: float, external_id: Optional[str]) -> None:
+        self._conn.execute(
+            """
+            INSERT OR REPLACE INTO documents (path, filename, sha256, size, mtime, external_id, ingested_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+            """,
+            (key, os.path.basename(key), sha256, size, mtime, external_id, time.time())
+        )
+        self._conn.commit()
+
+    def remove(self, key: str) -> None:
+        self._conn.execute("DELETE FROM documents WHERE path = ?", (key,))
+        self._conn.commit()
+
+    def close(self) -> None:
+        self._conn.close()
+
+
+def _fingerprint(full_path: str, known: Optional[Dict]) -> Dict:
+    stat = os.stat(full_path)
+    # Size and mtime unchanged: trust the stored hash instead of re-reading the file
+    if known and known['size'] == stat.st_size and known['mtime'] == stat.st_mtime:
+        sha256 = known['sha256']
+    else:
+        sha256 = hash_file(full_path)
+    return {'sha256': sha256, 'size': stat.st_size, 'mtime': stat.st_mtime}
+
+
+def plan_ingestion(
+    manifest: IngestManifest,
+    pdf_directory: str,
+    document_paths: List[str],
+    workers: int = os.cpu_count() or 4
+) -> Dict[str, List[Dict]]:
+    """
+    Compare the PDFs on disk against the manifest.
+
+    Hashing runs in a thread pool (hashlib releases the GIL on large reads).
+
+    Returns:
+        'new', 'changed' and 'unchanged' lists of dicts with doc_path, key,
+        sha256, size, mtime and (for changed files) the previous external_id,
+        plus 'missing' doc_paths that do not exist on disk.
+    """
+    plan = {'new': [], 'changed': [], 'unchanged': [], 'missing': []}
+    candidates = []
+    for doc_path in document_paths:
+        full_path = os.path.join(pdf_directory, doc_path)
+        if not os.path.exists(full_path):
+            plan['missing'].append(doc_path)
+            continue
+        key = manifest_key(full_path)
+        candidates.append((doc_path, full_path, key, manifest.get(key)))
+
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+        fingerprints = executor.map(lambda c: _fingerprint(c[1], c[3]), candidates)
+        for (doc_path, _, key, known), fingerprint in zip(candidates, fingerprints):
+            entry = {'doc_path': doc_path, 'key': key, **fingerprint}
+            if known is None:
+                plan['new'].append(entry)
+            elif known['sha256'] != fingerprint['sha256'] or not known['external_id']:
+                entry['previous_external_id'] = known['external_id']
+                plan['changed'].append(entry)
+            else:
+                entry['external_id'] = known['external_id']
+                if known['mtime'] != fingerprint['mtime']:
+                    # Touched but identical content: refresh mtime for the fast path
+                    manifest.record(key, fingerprint['sha256'], fingerprint['size'],
+                                    fingerprint['mtime'], known['external_id'])
+                plan['unchanged'].append(entry)
+
+    return plan
+
+
+def find_orphans(manifest: IngestManifest) -> List[Dict]:
+    """Manifest entries whose source PDF no longer exists on disk."""
+    orphans = []
+    for entry in manifest.entries():
+        full_path = entry['path']
+        if not os.path.isabs(full_path):
+            full_path = os.path.join(settings.STANDARDS_DIR, full_path)
+        if not os.path.exists(full_path):
+            orphans.append(entry)
+    return orphans
@@ -1,47 +1,17 @@
 from morphik import Morphik
+import argparse
 import os
-import re
 from dotenv import load_dotenv
 
+import settings
+from document_catalog import record_documents
+from ingest_documents import extract_metadata_from_path
+from search_cache import invalidate_search_cache
+from status_tracker import wait_for_documents
+
 # Load environment variables from .env file
 load_dotenv()
 
-def extract_metadata_from_filename(filename: str):
-    """Extract metadata from ECSS filename."""
-    pattern = r'ECSS-([A-Z])-([A-Z]{2})-(\d+[A-Z]?)(?:[_-]Rev\.?(\d+))?'
-    match = re.match(pattern, filename)
-    
-    if not match:
-        return {"filename": filename}
-
-    branch, discipline, doc_number, revision = match.groups()
-    
-    branch_map = {
-        'E': 'Engineering',
-        'M': 'Management',
-        'Q': 'Quality Assurance',
-        'S': 'Space Product Assurance',
-        'U': 'Space Sustainability'
-    }
-
-    discipline_map = {
-        'ST': 'Space Systems',
-        'HB': 'Handbooks',
-        'TM': 'Technical Memoranda'
-    }
-
-    return {
-        'branch': branch,
-        'branch_name': branch_map.get(branch, 'Unknown'),
-        'discipline': discipline,
-        'discipline_name': discipline_map.get(discipline, 'Unknown'),
-        'document_number': doc_number,
-        'revision': revision or '1',
-        'filename': filename,
-        'document_type': 'ECSS_Standard',
-        'source': 'ECSS_Published_Standards'
-    }
-
 def ingest_single_document():
     """Ingest a single ECSS document for testing."""
     
@@ -57,16 +27,15 @@ def ingest_single_document():
     
     # Choose one document to ingest
     filename = "ECSS-S-ST-00C Rev.1(15June2020).pdf"  # System Description
-    pdf_directory = "ECSS Published Standards/1-Active Standards"
-    full_path = os.path.join(pdf_directory, filename)
+    full_path = os.path.join(settings.ACTIVE_STANDARDS_DIR, filename)
     
     # Check if file exists
     if not os.path.exists(full_path):
         print(f"✗ File not found: {full_path}")
         return
     
-    # Extract metadata from filename
-    metadata = extract_metadata_from_filename(filename)
+    # Same metadata schema as ingest_documents.py (status and publication date included)
+    metadata = extract_metadata_from_path(full_path)
     
     print(f"\n=== Ingesting single document ===")
     print(f"Document: {filename}")
@@ -84,12 +53,18 @@ def ingest_single_document():
         print(f"\n✓ Successfully ingested {filename}")
         print(f"Document ID: {getattr(doc, 'external_id', 'N/A')}")
         print(f"Status: {getattr(doc, 'status', 'N/A')}")
+        if getattr(doc, 'external_id', None):
+            record_documents([{'external_id': doc.external_id, 'filename': filename, 'metadata': metadata}])
+        invalidate_search_cache()
         
-        # Wait a moment and test search
-        print(f"\n=== Testing search after ingestion ===")
-        import time
-        time.sleep(10)  # Wait 10 seconds for processing
+        # Wait until Morphik has finished processing, then test search
+        print(f"\n=== Waiting for processing ===")
+        doc_id = getattr(doc, 'external_id', None)
+        if doc_id:
+            statuses = wait_for_documents(db, [(doc_id, filename)], timeout=settings.PROCESSING_TIMEOUT)
+            print(f"Processing status: {statuses.get(doc_id, 'unknown')}")
         
+        print(f"\n=== Testing search after ingestion ===")
         try:
             results = db.query("ECSS standards")
             if results and hasattr(results, 'results') and len(results.results) > 0:
@@ -105,4 +80,13 @@ def ingest_single_document():
         print(f"✗ Error ingesting {filename}: {e}")
 
 if __name__ == "__main__":
-    ingest_single_document() 
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Ingest a single ECSS document for testing")
+    parser.add_argument('--benchmark', action='store_true',
+                        help="Time hashing, metadata, upload and processing against a local upload stand-in")
+    args = parser.parse_args()
+    
+    if args.benchmark:
+        from bench_ingest import run_ingest_benchmark
+        run_ingest_benchmark(settings.ACTIVE_STANDARDS_DIR, ["ECSS-S-ST-00C Rev.1(15June2020).pdf"], [1])
+    else:
+        ingest_single_document() 
\ No newline at end of file
@@ -0,0 +1,177 @@
+import argparse
+import gzip
+import json
+import math
+import os
+import re
+import time
+from collections import Counter
+from typing import Dict, List, Optional
+
+import settings
+from ingest_documents import extract_metadata_from_path
+from pdf_extract import iter_corpus_pages
+from search_filters import metadata_matches
+
+# BM25 parameters
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+# Characters of page text kept as the result snippet
+SNIPPET_LENGTH = 500
+
+INDEX_VERSION = 2
+
+# Compound tokens such as "ecss-e-st-40c" or "5.4.2.1a" are kept whole (and
+# also split into their parts) so standard and clause numbers match exactly.
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+(?:[.\-_][a-z0-9]+)*")
+PART_PATTERN = re.compile(r"[a-z0-9]+")
+
+STOPWORDS = frozenset("""
+a an and are as at be by for from has have in is it its of on or that the
+this to was were which will with shall may can not no such these those
+""".split())
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase word tokens plus the parts of compound (dotted/dashed) tokens."""
+    tokens = []
+    for token in TOKEN_PATTERN.findall(text.lower()):
+        if token not in STOPWORDS and len(token) > 1:
+            tokens.append(token)
+        if not token.isalnum():
+            tokens.extend(part for part in PART_PATTERN.findall(token)
+                          if part not in STOPWORDS and len(part) > 1)
+    return tokens
+
+
+def build_index(
+    directories: List[str],
+    output_path: str = settings.LOCAL_INDEX_PATH,
+    workers: Optional[int] = None
+) -> Dict:
+    """
+    Build a BM25 inverted index from the page-level text of every PDF.
+
+    Text comes from the pdf_extract cache (extracted in a process pool when
+    missing). The index is a gzipped JSON file holding the document table
+    (with the metadata from extract_metadata_from_path), one row per page
+    and a postings list per term stored as flat [page_id, tf, page_id, tf, ...].
+    """
+    documents = []
+    pages = []
+    postings: Dict[str, List[int]] = {}
+    started = time.monotonic()
+
+    for chunk in iter_corpus_pages(directories, workers):
+        if not documents or documents[-1]['path'] != chunk['path']:
+            documents.append({
+                'path': chunk['path'],
+                'filename': chunk['filename'],
+                'metadata': extract_metadata_from_path(os.path.join(settings.STANDARDS_DIR, chunk['path']))
+            })
+
+        terms = Counter(tokenize(chunk['text']))
+        if not terms:
+            continue
+        page_id = len(pages)
+        snippet = " ".join(chunk['text'].split())[:SNIPPET_LENGTH]
+        pages.append([len(documents) - 1, chunk['page'], sum(terms.values()), snippet])
+        for term, tf in terms.items():
+            postings.setdefault(term, []).extend((page_id, tf))
+
+    index = {
+        'version': INDEX_VERSION,
+        'documents': documents,
+        'pages': pages,
+        'postings': postings
+    }
+    os.makedirs(os.path.dirname(output_path), exist_ok=True)
+    with gzip.open(output_path, 'wt', encoding='utf-8') as f:
+        json.dump(index, f, separators=(',', ':'))
+
+    stats = {
+        'documents': len(documents),
+        'pages': len(pages),
+        'terms': len(postings),
+        'seconds': round(time.monotonic() - started, 1),
+        'bytes': os.path.getsize(output_path)
+    }
+    print(f"\n=== Index Summary ===")
+    print(f"Documents: {stats['documents']}")
+    print(f"Pages: {stats['pages']}")
+    print(f"Terms: {stats['terms']}")
+    print(f"Index size: {stats['bytes'] / 1e6:.1f} MB")
+    print(f"Elapsed: {stats['seconds']}s")
+    return stats
+
+
+class LocalIndex:
+    """In-memory BM25 index over page-level text of the ECSS PDFs."""
+
+    def __init__(self, index: Dict):
+        self.documents = index['documents']
+        self.pages = index['pages']
+        self.postings = index['postings']
+
+        page_count = len(self.pages)
+        avgdl = sum(page[2] for page in self.pages) / page_count if page_count else 1.0
+        # Per-page length normalisation, precomputed once
+        self.norms = [BM25_K1 * (1 - BM25_B + BM25_B * page[2] / avgdl) for page in self.pages]
+        self.idf = {
+            term: math.log(1 + (page_count - len(plist) / 2 + 0.5) / (len(plist) / 2 + 0.5))
+            for term, plist in self.postings.items()
+        }
+
+    @classmethod
+    def load(cls, path: str = settings.LOCAL_INDEX_PATH) -> Optional["LocalIndex"]:
+        """Load an index written by build_index(), or None if there is none."""
+        if not os.path.exists(path):
+            return None
+        with gzip.open(path, 'rt', encoding='utf-8') as f:
+            index = json.load(f)
+        if index.get('version') != INDEX_VERSION:
+            print(f"⚠ Local index {path} has an unsupported version, rebuild it")
+            return None
+        return cls(index)
+
+    def search(self, query: str, limit: int = 10, filters: Optional[Dict[str, str]] = None) -> List[Dict]:
+        """Return the top pages for a query, formatted like /api/search results."""
+        scores: Dict[int, float] = {}
+        for term in set(tokenize(query)):
+            plist = self.postings.get(term)
+            if not plist:
+                continue
+            idf = self.idf[term]
+            for i in range(0, len(plist), 2):
+                page_id, tf = plist[i], plist[i + 1]
+                scores[page_id] = scores.get(page_id, 0.0) + idf * tf * (BM25_K1 + 1) / (tf + self.norms[page_id])
+
+        ranked = sorted(scores.items(), key=lambda item: item[1], reverse=True)
+        results = []
+        for page_id, score in ranked:
+            doc_id, page_number, _, snippet = self.pages[page_id]
+            document = self.documents[doc_id]
+            if filters and not metadata_matches(document['metadata'], filters):
+                continue
+            results.append({
+                'id': f"{document['filename']}#page={page_number}",
+                'title': document['filename'],
+                'content': snippet,
+                'score': round(score, 4),
+                'page': page_number,
+                'metadata': {**document['metadata'], 'page_number': page_number}
+            })
+            if len(results) >= limit:
+                break
+        return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build the local BM25 index over the ECSS PDFs")
+    parser.add_argument('--output', default=settings.LOCAL_INDEX_PATH, help="Index file to write")
+    parser.add_argument('--workers', type=int, default=None, help="Extraction processes (default: all cores)")
+    args = parser.parse_args()
+
+    print(f"Building local index from: {settings.STANDARDS_DIR}")
+    build_index([settings.ACTIVE_STANDARDS_DIR, settings.SUPERSEDED_STANDARDS_DIR], args.output, args.workers)
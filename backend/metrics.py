@@ -0,0 +1,302 @@
+import contextvars
+import json
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+# Upper bounds (seconds) of the latency histogram buckets
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+PROMETHEUS_CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+def _label_key(label_names: Tuple[str, ...], labels: Dict[str, str]) -> Tuple[str, ...]:
+    if set(labels) != set(label_names):
+        raise ValueError(f"Expected labels {label_names}, got {tuple(labels)}")
+    return tuple(str(labels[name]) for name in label_names)
+
+
+def _format_labels(label_names: Tuple[str, ...], values: Tuple[str, ...], extra: str = '') -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(label_names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _escape(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_value(value: float) -> str:
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+
+class Metric:
+    """Base class: a named metric with a fixed set of label names."""
+
+    type_name = 'untyped'
+
+    def __init__(self, name: str, documentation: str, label_names: Tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(label_names)
+        self._lock = threading.Lock()
+
+    def samples(self) -> List[str]:
+        raise NotImplementedError
+
+    def render(self) -> str:
+        """Prometheus text exposition of this metric."""
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type_name}"]
+        lines.extend(self.samples())
+        return '\n'.join(lines)
+
+
+class Counter(Metric):
+    """Monotonically increasing count, e.g. requests or errors."""
+
+    type_name = 'counter'
+
+    def __init__(self, name: str, documentation: str, label_names: Tuple[str, ...] = ()):
+        super().__init__(name, documentation, label_names)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1.0, **labels) -> None:
+        key = _label_key(self.label_names, labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels) -> float:
+        return self._values.get(_label_key(self.label_names, labels), 0.0)
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        return [f"{self.name}{_format_labels(self.label_names, key)} {_format_value(value)}"
+                for key, value in items]
+
+
+class Gauge(Counter):
+    """Value that goes up and down, e.g. in-flight requests or a hit ratio."""
+
+    type_name = 'gauge'
+
+    def dec(self, amount: float = 1.0, **labels) -> None:
+        self.inc(-amount, **labels)
+
+    def set(self, value: float, **labels) -> None:
+        key = _label_key(self.label_names, labels)
+        with self._lock:
+            self._values[key] = value
+
+
+class Histogram(Metric):
+    """Distribution of observed values (latencies) in cumulative buckets."""
+
+    type_name = 'histogram'
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        label_names: Tuple[str, ...] = (),
+        buckets: Tuple[float, ...] = LATENCY_BUCKETS
+    ):
+        super().__init__(name, documentation, label_names)
+        self.buckets = tuple(sorted(buckets))
+        # label values -> [per-bucket counts..., +Inf count, sum]
+        self._values: Dict[Tuple[str, ...], List[float]] = {}
+
+    def observe(self, value: float, **labels) -> None:
+        key = _label_key(self.label_names, labels)
+        with self._lock:
+            series = self._values.get(key)
+            if series is None:
+                series = self._values[key] = [0] * (len(self.buckets) + 1) + [0.0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[i] += 1
+                    break
+            else:
+                series[len(self.buckets)] += 1
+            series[-1] += value
+
+    @contextmanager
+    def time(self, **labels) -> Iterator[None]:
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            items = sorted((key, list(series)) for key, series in self._values.items())
+        lines = []
+        for key, series in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float('inf'),), series):
+                cumulative += count
+                le = '+Inf' if bound == float('inf') else _format_value(bound)
+                labels = _format_labels(self.label_names, key, 'le="' + le + '"')
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.label_names, key)} {round(series[-1], 6)}")
+            lines.append(f"{self.name}_count{_format_labels(self.label_names, key)} {cumulative}")
+        return lines
+
+
+class MetricsRegistry:
+    """The metrics exposed by one worker process."""
+
+    def __init__(self):
+        self._metrics: Dict[str, Metric] = {}
+        self._collectors: List[Callable[[], None]] = []
+
+    def register(self, metric: Metric) -> Metric:
+        self._metrics[metric.name] = metric
+        return metric
+
+    def add_collector(self, collector: Callable[[], None]) -> None:
+        """Run a callback before every scrape, e.g. to copy cache stats into gauges."""
+        self._collectors.append(collector)
+
+    def render(self) -> str:
+        """All metrics in the Prometheus text exposition format."""
+        for collector in self._collectors:
+            try:
+                collector()
+            except Exception as e:
+                print(f"⚠ Metrics collector failed: {e}")
+        return '\n'.join(metric.render() for metric in self._metrics.values()) + '\n'
+
+
+REGISTRY = MetricsRegistry()
+
+HTTP_REQUESTS = REGISTRY.register(Counter(
+    'ecss_http_requests_total', 'HTTP requests by endpoint, method and status code.',
+    ('endpoint', 'method', 'status')))
+HTTP_REQUEST_DURATION = REGISTRY.register(Histogram(
+    'ecss_http_request_duration_seconds', 'HTTP request latency by endpoint.', ('endpoint',)))
+HTTP_IN_FLIGHT = REGISTRY.register(Gauge(
+    'ecss_http_requests_in_flight', 'Requests currently being handled by endpoint.', ('endpoint',)))
+STAGE_DURATION = REGISTRY.register(Histogram(
+    'ecss_stage_duration_seconds', 'Latency of request stages (client, upstream calls, serialization).',
+    ('stage',)))
+UPSTREAM_ERRORS = REGISTRY.register(Counter(
+    'ecss_upstream_errors_total', 'Failed Morphik calls by operation and exception type.',
+    ('operation', 'error')))
+SEARCHES = REGISTRY.register(Counter(
+    'ecss_search_requests_total', 'Searches by engine and outcome (ok, cached, fallback, error).',
+    ('engine', 'outcome')))
+CACHE_REQUESTS = REGISTRY.register(Gauge(
+    'ecss_cache_requests', 'Lookups per cache and result since worker start.', ('cache', 'result')))
+CACHE_HIT_RATIO = REGISTRY.register(Gauge(
+    'ecss_cache_hit_ratio', 'Hit ratio per cache since worker start.', ('cache',)))
+CACHE_ENTRIES = REGISTRY.register(Gauge(
+    'ecss_cache_entries', 'Entries currently held per in-process cache.', ('cache',)))
+
+
+# Per-request stage timings, isolated per thread (Flask) or task (ASGI)
+_request_timings: contextvars.ContextVar[Optional[Dict]] = contextvars.ContextVar('request_timings', default=None)
+
+
+def new_request_id(incoming: Optional[str] = None) -> str:
+    """Use the caller's X-Request-ID when it looks sane, otherwise generate one."""
+    if incoming and len(incoming) <= 128 and incoming.isprintable():
+        return incoming
+    return uuid.uuid4().hex
+
+
+def start_request(request_id: str, endpoint: str) -> None:
+    """Begin collecting stage timings for the current request."""
+    _request_timings.set({'request_id': request_id, 'endpoint': endpoint,
+                          'started': time.perf_counter(), 'stages': {}})
+    HTTP_IN_FLIGHT.inc(endpoint=endpoint)
+
+
+def record_stage(stage: str, seconds: float) -> None:
+    """Add a stage duration to its histogram and to the current request's timings."""
+    STAGE_DURATION.observe(seconds, stage=stage)
+    timings = _request_timings.get()
+    if timings is not None:
+        stages = timings['stages']
+        stages[stage] = stages.get(stage, 0.0) + seconds
+
+
+@contextmanager
+def timed_stage(stage: str) -> Iterator[None]:
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_stage(stage, time.perf_counter() - started)
+
+
+def upstream_call(operation: str, function: Callable, *args, **kwargs):
+    """Call a Morphik client method, timing it and counting failures by type."""
+    started = time.perf_counter()
+    try:
+        return function(*args, **kwargs)
+    except Exception as e:
+        UPSTREAM_ERRORS.inc(operation=operation, error=type(e).__name__)
+        raise
+    finally:
+        record_stage(f"morphik.{operation}", time.perf_counter() - started)
+
+
+async def async_upstream_call(operation: str, function: Callable, *args, **kwargs):
+    """upstream_call() for AsyncMorphik coroutine methods."""
+    started = time.perf_counter()
+    try:
+        return await function(*args, **kwargs)
+    except Exception as e:
+        UPSTREAM_ERRORS.inc(operation=operation, error=type(e).__name__)
+        raise
+    finally:
+        record_stage(f"morphik.{operation}", time.perf_counter() - started)
+
+
+def finish_request(method: str, path: str, status: int, **fields) -> Optional[Dict]:
+    """
+    Close the current request: update the HTTP metrics and print one JSON timing line.
+
+    Returns:
+        The structured log entry, or None outside a started request
+    """
+    timings = _request_timings.get()
+    if timings is None:
+        return None
+    _request_timings.set(None)
+
+    duration = time.perf_counter() - timings['started']
+    endpoint = timings['endpoint']
+    HTTP_IN_FLIGHT.dec(endpoint=endpoint)
+    HTTP_REQUESTS.inc(endpoint=endpoint, method=method, status=str(status))
+    HTTP_REQUEST_DURATION.observe(duration, endpoint=endpoint)
+
+    entry = {
+        'event': 'request',
+        'request_id': timings['request_id'],
+        'method': method,
+        'path': path,
+        'status': status,
+        'duration_ms': round(duration * 1000, 2),
+        'stages_ms': {stage: round(seconds * 1000, 2) for stage, seconds in timings['stages'].items()},
+        **fields
+    }
+    print(json.dumps(entry))
+    return entry
+
+
+def record_cache_stats(cache: str, stats: Dict) -> None:
+    """Copy hit/miss counters reported by a cache's stats() into the cache gauges."""
+    hits = stats.get('hits', 0)
+    misses = stats.get('misses', 0)
+    CACHE_REQUESTS.set(hits, cache=cache, result='hit')
+    CACHE_REQUESTS.set(misses, cache=cache, result='miss')
+    CACHE_HIT_RATIO.set(round(hits / (hits + misses), 4) if hits + misses else 0.0, cache=cache)
+    entries = stats.get('entries', stats.get('documents'))
+    if entries is not None:
+        CACHE_ENTRIES.set(entries, cache=cache)
@@ -0,0 +1,274 @@
+import asyncio
+import os
+import threading
+import time
+from typing import Optional
+
+import httpx
+from morphik import AsyncMorphik, Morphik
+
+import settings
+
+
+class PooledMorphik(Morphik):
+    """Morphik client whose HTTP transport keeps a bounded keep-alive pool."""
+
+    def __init__(self, uri: str, timeout: float, pool_size: int, idle_timeout: float):
+        self._pool_limits = httpx.Limits(
+            max_connections=pool_size,
+            max_keepalive_connections=pool_size,
+            keepalive_expiry=idle_timeout
+        )
+        super().__init__(uri=uri, timeout=timeout)
+
+    def _create_http_client(self, http2_enabled: bool) -> httpx.Client:
+        return httpx.Client(
+            timeout=self._logic._timeout,
+            verify=not self._logic._is_local,
+            http2=http2_enabled,
+            limits=self._pool_limits
+        )
+
+
+class PooledAsyncMorphik(AsyncMorphik):
+    """Async Morphik client with the same bounded keep-alive pool as PooledMorphik."""
+
+    def __init__(self, uri: str, timeout: float, pool_size: int, idle_timeout: float):
+        self._pool_limits = httpx.Limits(
+            max_connections=pool_size,
+            max_keepalive_connections=pool_size,
+            keepalive_expiry=idle_timeout
+        )
+        super().__init__(uri=uri, timeout=timeout)
+
+    def _create_http_client(self, http2_enabled: bool) -> httpx.AsyncClient:
+        return httpx.AsyncClient(
+            timeout=self._logic._timeout,
+            verify=not self._logic._is_local,
+            http2=http2_enabled,
+            limits=self._pool_limits
+        )
+
+
+class MorphikClientManager:
+    """
+    Process-wide owner of a single long-lived Morphik client.
+
+    The client is created lazily on first use and shared by every thread of
+    the process (the underlying httpx pool is thread-safe). A client created
+    before a fork (e.g. gunicorn --preload) is never reused by the child: the
+    owning PID is checked on every access. After a connection failure the
+    client is discarded and rebuilt, at most once per reconnect backoff.
+    """
+
+    def __init__(
+        self,
+        uri: Optional[str] = None,
+        timeout: float = settings.MORPHIK_TIMEOUT,
+        pool_size: int = settings.MORPHIK_POOL_SIZE,
+        idle_timeout: float = settings.MORPHIK_POOL_IDLE_TIMEOUT,
+        reconnect_backoff: float = settings.MORPHIK_RECONNECT_BACKOFF
+    ):
+        self.uri = uri
+        self.timeout = timeout
+        self.pool_size = pool_size
+        self.idle_timeout = idle_timeout
+        self.reconnect_backoff = reconnect_backoff
+
+        self._lock = threading.Lock()
+        self._client: Optional[Morphik] = None
+        self._pid: Optional[int] = None
+        self._last_failure = 0.0
+        self.connects = 0
+        self.failures = 0
+
+    def get_client(self) -> Optional[Morphik]:
+        """Return the shared client, creating or recreating it if needed."""
+        client = self._client
+        if client is not None and self._pid == os.getpid():
+            return client
+
+        with self._lock:
+            if self._pid != os.getpid():
+                # Inherited from the parent process: drop it without closing
+                # the sockets, which still belong to the parent.
+                self._client = None
+                self._pid = os.getpid()
+
+            if self._client is not None:
+                return self._client
+
+            if not self.uri:
+                print("⚠ MORPHIK_URI not set in .env file")
+                return None
+
+            if time.monotonic() - self._last_failure < self.reconnect_backoff:
+                return None
+
+            try:
+                self._client = PooledMorphik(
+                    uri=self.uri,
+                    timeout=self.timeout,
+                    pool_size=self.pool_size,
+                    idle_timeout=self.idle_timeout
+                )
+                self.connects += 1
+            except Exception as e:
+                print(f"✗ Failed to connect to Morphik: {e}")
+                self._last_failure = time.monotonic()
+                self.failures += 1
+                return None
+
+            return self._client
+
+    def report_failure(self, error: Exception) -> None:
+        """
+        Record a failed upstream call.
+
+        Transport-level errors (connection refused, reset, TLS) discard the
+        pooled client so the next request reconnects; HTTP error responses
+        leave the connection pool intact.
+        """
+        if not isinstance(error, httpx.TransportError):
+            return
+
+        with self._lock:
+            self.failures += 1
+            self._last_failure = time.monotonic()
+            client, self._client = self._client, None
+
+        if client is not None and self._pid == os.getpid():
+            try:
+                client.close()
+            except Exception:
+                pass
+
+    def is_connected(self) -> bool:
+        """Whether a live client currently exists in this process."""
+        return self._client is not None and self._pid == os.getpid()
+
+    def close(self) -> None:
+        """Close the shared client (e.g. on worker shutdown)."""
+        with self._lock:
+            client, self._client = self._client, None
+        if client is not None and self._pid == os.getpid():
+            client.close()
+
+    def stats(self) -> dict:
+        """Connection pool settings and counters for this process."""
+        return {
+            'pid': os.getpid(),
+            'connected': self.is_connected(),
+            'pool_size': self.pool_size,
+            'idle_timeout': self.idle_timeout,
+            'connects': self.connects,
+            'failures': self.failures
+        }
+
+
+class AsyncMorphikClientManager:
+    """
+    Owner of the AsyncMorphik client used by the ASGI server.
+
+    Same contract as MorphikClientManager, but the client is bound to the
+    event loop that created it: one client per worker process and loop, so
+    all concurrent requests of a worker share its connection pool.
+    """
+
+    def __init__(
+        self,
+        uri: Optional[str] = None,
+        timeout: float = settings.MORPHIK_TIMEOUT,
+        pool_size: int = settings.MORPHIK_POOL_SIZE,
+        idle_timeout: float = settings.MORPHIK_POOL_IDLE_TIMEOUT,
+        reconnect_backoff: float = settings.MORPHIK_RECONNECT_BACKOFF
+    ):
+        self.uri = uri
+        self.timeout = timeout
+        self.pool_size = pool_size
+        self.idle_timeout = idle_timeout
+        self.reconnect_backoff = reconnect_backoff
+
+        self._client: Optional[AsyncMorphik] = None
+        self._owner = None
+        self._last_failure = 0.0
+        self.connects = 0
+        self.failures = 0
+
+    def _current_owner(self):
+        return os.getpid(), id(asyncio.get_running_loop())
+
+    def get_client(self) -> Optional[AsyncMorphik]:
+        """Return the shared client, creating it if needed (call from the event loop)."""
+        owner = self._current_owner()
+        if self._client is not None and self._owner == owner:
+            return self._client
+
+        # Created in another process or loop: its connections are unusable here
+        self._client = None
+        self._owner = owner
+
+        if not self.uri:
+            print("⚠ MORPHIK_URI not set in .env file")
+            return None
+
+        if time.monotonic() - self._last_failure < self.reconnect_backoff:
+            return None
+
+        try:
+            self._client = PooledAsyncMorphik(
+                uri=self.uri,
+                timeout=self.timeout,
+                pool_size=self.pool_size,
+                idle_timeout=self.idle_timeout
+            )
+            self.connects += 1
+        except Exception as e:
+            print(f"✗ Failed to connect to Morphik: {e}")
+            self._last_failure = time.monotonic()
+            self.failures += 1
+            return None
+
+        return self._client
+
+    async def report_failure(self, error: Exception) -> None:
+        """Discard the client after a transport-level error (see MorphikClientManager)."""
+        if not isinstance(error, httpx.TransportError):
+            return
+
+        self.failures += 1
+        self._last_failure = time.monotonic()
+        client, self._client = self._client, None
+        if client is not None:
+            try:
+                await client.close()
+            except Exception:
+                pass
+
+    def is_connected(self) -> bool:
+        """Whether a live client currently exists in this process."""
+        return self._client is not None and self._owner is not None and self._owner[0] == os.getpid()
+
+    async def close(self) -> None:
+        """Close the shared client (on server shutdown)."""
+        client, self._client = self._client, None
+        if client is not None:
+            await client.close()
+
+    def stats(self) -> dict:
+        """Connection pool settings and counters for this process."""
+        return {
+            'pid': os.getpid(),
+            'connected': self.is_connected(),
+            'pool_size': self.pool_size,
+            'idle_timeout': self.idle_timeout,
+            'connects': self.connects,
+            'failures': self.failures
+        }
+
+
+# Shared by every request handled in this process
+morphik_clients = MorphikClientManager(uri=settings.MORPHIK_URI)
+
+# Used by the ASGI server instead of morphik_clients
+async_morphik_clients = AsyncMorphikClientManager(uri=settings.MORPHIK_URI)
@@ -0,0 +1,196 @@
+import argparse
+import gzip
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from pypdf import PdfReader
+
+import settings
+from ingest_documents import list_standard_pdfs
+from ingest_manifest import hash_file
+
+STATS_FILENAME = "extraction_stats.json"
+
+
+def iter_pdf_pages(path: str) -> Iterator[Tuple[int, str]]:
+    """Yield (1-based page number, text) for every page of a PDF, one page at a time."""
+    reader = PdfReader(path)
+    for page_number, page in enumerate(reader.pages, start=1):
+        try:
+            text = page.extract_text() or ''
+        except Exception as e:
+            print(f"⚠ Could not extract page {page_number} of {os.path.basename(path)}: {e}")
+            text = ''
+        yield page_number, text
+
+
+def cache_path(sha256: str, cache_dir: str = settings.TEXT_CACHE_DIR) -> str:
+    """Location of the cached page text for a PDF with the given content hash."""
+    return os.path.join(cache_dir, f"{sha256}.jsonl.gz")
+
+
+def extract_to_cache(full_path: str, sha256: str, cache_dir: str = settings.TEXT_CACHE_DIR) -> Dict:
+    """
+    Extract a PDF into its JSONL cache file, one line per page.
+
+    Runs in a worker process. Pages are streamed straight to disk, so memory
+    use does not grow with document size; the file is renamed into place
+    only once extraction finished.
+    """
+    target = cache_path(sha256, cache_dir)
+    partial = f"{target}.{os.getpid()}.tmp"
+    stats = {
+        'filename': os.path.basename(full_path),
+        'sha256': sha256,
+        'bytes': os.path.getsize(full_path),
+        'pages': 0,
+        'chars': 0,
+        'seconds': 0.0,
+        'error': None
+    }
+
+    started = time.monotonic()
+    try:
+        with gzip.open(partial, 'wt', encoding='utf-8') as f:
+            for page_number, text in iter_pdf_pages(full_path):
+                f.write(json.dumps({'page': page_number, 'text': text}, ensure_ascii=False))
+                f.write('\n')
+                stats['pages'] += 1
+                stats['chars'] += len(text)
+        os.replace(partial, target)
+    except Exception as e:
+        stats['error'] = str(e)
+        if os.path.exists(partial):
+            os.remove(partial)
+    stats['seconds'] = round(time.monotonic() - started, 3)
+    stats['pages_per_second'] = round(stats['pages'] / stats['seconds'], 1) if stats['seconds'] else 0.0
+    return stats
+
+
+def load_extraction_stats(cache_dir: str = settings.TEXT_CACHE_DIR) -> Dict[str, Dict]:
+    """Per-document extraction stats recorded by previous runs, keyed by content hash."""
+    path = os.path.join(cache_dir, STATS_FILENAME)
+    if not os.path.exists(path):
+        return {}
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
+
+
+def extract_corpus(
+    directories: List[str],
+    workers: Optional[int] = None,
+    cache_dir: str = settings.TEXT_CACHE_DIR
+) -> List[Dict]:
+    """
+    Make sure every PDF under the directories has an up-to-date text cache.
+
+    Files are identified by content hash, so renamed or moved PDFs reuse
+    their cache and edited ones are extracted again. Missing caches are
+    built in a process pool across all cores.
+
+    Returns:
+        One dict per PDF with path, filename, sha256 and cache file
+    """
+    os.makedirs(cache_dir, exist_ok=True)
+    doc_paths = list_standard_pdfs(directories)
+    with ThreadPoolExecutor() as executor:
+        hashes = executor.map(lambda p: hash_file(os.path.join(settings.STANDARDS_DIR, p)), doc_paths)
+        documents = [
+            {
+                'path': doc_path,
+                'filename': os.path.basename(doc_path),
+                'sha256': sha256,
+                'cache': cache_path(sha256, cache_dir)
+            }
+            for doc_path, sha256 in zip(doc_paths, hashes)
+        ]
+
+    pending = {}
+    for document in documents:
+        if not os.path.exists(document['cache']):
+            pending.setdefault(document['sha256'], document)
+    if not pending:
+        return documents
+
+    print(f"Extracting text from {len(pending)} PDF(s) with {workers or os.cpu_count()} processes...")
+    all_stats = load_extraction_stats(cache_dir)
+    started = time.monotonic()
+    total_pages = 0
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [
+            executor.submit(extract_to_cache,
+                            os.path.join(settings.STANDARDS_DIR, document['path']),
+                            sha256, cache_dir)
+            for sha256, document in pending.items()
+        ]
+        for future in as_completed(futures):
+            stats = future.result()
+            all_stats[stats['sha256']] = stats
+            if stats['error']:
+                print(f"✗ Error extracting {stats['filename']}: {stats['error']}")
+            else:
+                total_pages += stats['pages']
+                print(f"✓ Extracted {stats['filename']} "
+                      f"({stats['pages']} pages in {stats['seconds']:.1f}s, {stats['pages_per_second']} pages/s)")
+
+    with open(os.path.join(cache_dir, STATS_FILENAME), 'w', encoding='utf-8') as f:
+        json.dump(all_stats, f, indent=2)
+
+    elapsed = time.monotonic() - started
+    print(f"Extracted {total_pages} pages in {elapsed:.1f}s"
+          + (f" ({total_pages / elapsed:.0f} pages/s)" if elapsed > 0 else ""))
+    return documents
+
+
+def iter_corpus_pages(
+    directories: List[str],
+    workers: Optional[int] = None,
+    cache_dir: str = settings.TEXT_CACHE_DIR
+) -> Iterator[Dict]:
+    """
+    Yield page-level chunks for every PDF under the directories.
+
+    Each chunk is a dict with path, filename, sha256, page and text. Chunks
+    are read lazily from the cache, so only one page is held in memory at a
+    time regardless of corpus or document size. PDFs that could not be
+    extracted are skipped.
+    """
+    for document in extract_corpus(directories, workers, cache_dir):
+        if not os.path.exists(document['cache']):
+            continue
+        with gzip.open(document['cache'], 'rt', encoding='utf-8') as f:
+            for line in f:
+                page = json.loads(line)
+                yield {
+                    'path': document['path'],
+                    'filename': document['filename'],
+                    'sha256': document['sha256'],
+                    'page': page['page'],
+                    'text': page['text']
+                }
+
+
+def print_slowest(stats: Dict[str, Dict], count: int = 10) -> None:
+    """Print the documents with the lowest extraction throughput."""
+    extracted = [s for s in stats.values() if not s['error'] and s['pages']]
+    failed = [s for s in stats.values() if s['error']]
+    print(f"\n=== Slowest documents (pages/s) ===")
+    for s in sorted(extracted, key=lambda s: s['pages_per_second'])[:count]:
+        print(f"  {s['pages_per_second']:>7} pages/s  {s['pages']:>4} pages  {s['seconds']:>6.1f}s  {s['filename']}")
+    if failed:
+        print(f"\n=== Failed documents ===")
+        for s in failed:
+            print(f"  {s['filename']}: {s['error']}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Extract page text from the ECSS PDFs into the local cache")
+    parser.add_argument('--workers', type=int, default=None, help="Extraction processes (default: all cores)")
+    args = parser.parse_args()
+
+    extract_corpus([settings.ACTIVE_STANDARDS_DIR, settings.SUPERSEDED_STANDARDS_DIR], args.workers)
+    print_slowest(load_extraction_stats())
@@ -0,0 +1,146 @@
+import argparse
+import math
+import os
+import shutil
+import tempfile
+from typing import Dict, List, Tuple
+
+from pypdf import PdfReader, PdfWriter
+
+import settings
+
+
+def plan_page_ranges(
+    page_count: int,
+    size: int,
+    max_pages: int = settings.SPLIT_MAX_PAGES,
+    max_bytes: int = settings.SPLIT_MAX_BYTES
+) -> List[Tuple[int, int]]:
+    """
+    Split a document into contiguous, equally sized page ranges.
+
+    The number of parts is the smallest that keeps every part under
+    max_pages and, assuming bytes are spread evenly over the pages, under
+    max_bytes. A limit of 0 is ignored.
+
+    Returns:
+        1-based inclusive (first_page, last_page) ranges; a single range
+        covering the whole document when no split is needed
+    """
+    if page_count <= 0:
+        return []
+    parts = 1
+    if max_pages > 0:
+        parts = max(parts, math.ceil(page_count / max_pages))
+    if max_bytes > 0:
+        parts = max(parts, math.ceil(size / max_bytes))
+    parts = min(parts, page_count)
+    pages_per_part = math.ceil(page_count / parts)
+    return [(first, min(first + pages_per_part - 1, page_count))
+            for first in range(1, page_count + 1, pages_per_part)]
+
+
+def needs_split(full_path: str, max_pages: int = settings.SPLIT_MAX_PAGES,
+                max_bytes: int = settings.SPLIT_MAX_BYTES) -> bool:
+    """Cheap pre-check: only files that may exceed a limit are opened and counted."""
+    if max_bytes > 0 and os.path.getsize(full_path) > max_bytes:
+        return True
+    if max_pages <= 0:
+        return False
+    return len(PdfReader(full_path).pages) > max_pages
+
+
+def split_pdf(
+    full_path: str,
+    max_pages: int = settings.SPLIT_MAX_PAGES,
+    max_bytes: int = settings.SPLIT_MAX_BYTES,
+    parts_dir: str = settings.SPLIT_PARTS_DIR
+) -> List[Dict]:
+    """
+    Write the page-range parts of an oversized PDF to a fresh directory.
+
+    Args:
+        full_path: PDF to split
+        max_pages: Maximum pages per part (0 = no page limit)
+        max_bytes: Approximate maximum bytes per part (0 = no size limit)
+        parts_dir: Parent of the per-document directory the parts go to
+
+    Returns:
+        One dict per part with path, part (1-based), parts, first_page and
+        last_page; an empty list when the PDF is within both limits. The
+        caller removes the parts with remove_parts() once uploaded.
+    """
+    if not needs_split(full_path, max_pages, max_bytes):
+        return []
+
+    reader = PdfReader(full_path)
+    if reader.is_encrypted:
+        reader.decrypt('')
+    ranges = plan_page_ranges(len(reader.pages), os.path.getsize(full_path), max_pages, max_bytes)
+    if len(ranges) < 2:
+        return []
+
+    os.makedirs(parts_dir, exist_ok=True)
+    output_dir = tempfile.mkdtemp(prefix='parts-', dir=parts_dir)
+    stem = os.path.splitext(os.path.basename(full_path))[0]
+    parts = []
+    try:
+        for number, (first_page, last_page) in enumerate(ranges, start=1):
+            writer = PdfWriter()
+            for index in range(first_page - 1, last_page):
+                writer.add_page(reader.pages[index])
+            path = os.path.join(output_dir, f"{stem} (pages {first_page}-{last_page}).pdf")
+            with open(path, 'wb') as f:
+                writer.write(f)
+            parts.append({
+                'path': path,
+                'part': number,
+                'parts': len(ranges),
+                'first_page': first_page,
+                'last_page': last_page
+            })
+    except Exception:
+        shutil.rmtree(output_dir, ignore_errors=True)
+        raise
+    return parts
+
+
+def remove_parts(parts: List[Dict]) -> None:
+    """Delete the directory split_pdf() wrote the parts to."""
+    if parts:
+        shutil.rmtree(os.path.dirname(parts[0]['path']), ignore_errors=True)
+
+
+def part_metadata(metadata: Dict, part: Dict) -> Dict:
+    """
+    Metadata of one uploaded part: the parent document's metadata plus its
+    position, so search results can be mapped back to the original PDF.
+
+    page_offset is added to a part-relative page number to get the page in
+    the original document.
+    """
+    return {
+        **metadata,
+        'parent_document': metadata.get('filename'),
+        'part': part['part'],
+        'parts': part['parts'],
+        'page_offset': part['first_page'] - 1,
+        'page_range': f"{part['first_page']}-{part['last_page']}"
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Show how oversized PDFs would be split for upload")
+    parser.add_argument('paths', nargs='+', help="PDF files to check")
+    parser.add_argument('--max-pages', type=int, default=settings.SPLIT_MAX_PAGES,
+                        help="Maximum pages per part (0 disables)")
+    parser.add_argument('--max-bytes', type=int, default=settings.SPLIT_MAX_BYTES,
+                        help="Approximate maximum bytes per part (0 disables)")
+    args = parser.parse_args()
+
+    for path in args.paths:
+        pages = len(PdfReader(path).pages)
+        size = os.path.getsize(path)
+        ranges = plan_page_ranges(pages, size, args.max_pages, args.max_bytes)
+        plan = ', '.join(f"{first}-{last}" for first, last in ranges) if len(ranges) > 1 else 'not split'
+        print(f"{os.path.basename(path)}: {pages} pages, {size / 1e6:.1f} MB -> {plan}")
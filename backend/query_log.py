@@ -0,0 +1,336 @@
+import argparse
+import fcntl
+import json
+import os
+import random
+import statistics
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Iterator, List, Mapping, Optional
+
+import settings
+from search_filters import FILTER_PARAMS
+
+# /api/search parameters written to the log: enough to replay the request
+LOGGED_PARAMS = ('q', 'engine', 'limit', 'offset', 'generate') + FILTER_PARAMS
+
+# Outcomes answered without computing the result
+HIT_OUTCOMES = ('cached', 'semantic', 'coalesced')
+
+# Engines answered from in-memory indexes, which gain nothing from warming
+IN_MEMORY_ENGINES = ('clause', 'glossary')
+
+# With a shared cache, a startup warm-up logged this recently by another worker is not repeated
+WARMUP_REUSE_SECONDS = 300
+
+# Requests carrying this header are warm-up replays and are not logged
+WARMUP_HEADER = 'X-Cache-Warmup'
+
+
+def read_entries(path: str = settings.QUERY_LOG_PATH, since: float = 0.0) -> Iterator[Dict]:
+    """Log entries (searches and warm-up events) newer than since, oldest first, rotated file included."""
+    for name in (f"{path}.1", path):
+        if not os.path.exists(name):
+            continue
+        with open(name, encoding='utf-8') as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    continue  # Torn write of a crashed worker
+                if entry.get('ts', 0) >= since:
+                    yield entry
+
+
+def last_warmup_event(path: str = settings.QUERY_LOG_PATH) -> Optional[Dict]:
+    """The most recent 'warmup' event of the log, or None."""
+    last = None
+    for entry in read_entries(path):
+        if entry.get('event') == 'warmup':
+            last = entry
+    return last
+
+
+def top_queries(
+    path: str = settings.QUERY_LOG_PATH,
+    count: int = settings.WARMUP_QUERIES,
+    window: float = settings.WARMUP_WINDOW
+) -> List[Dict]:
+    """
+    Most frequent logged searches of the last window seconds.
+
+    Returns:
+        Dicts with params (as last logged), cache_key and count, most
+        frequent first
+    """
+    counts: Counter = Counter()
+    params: Dict[str, Dict] = {}
+    for entry in read_entries(path, time.time() - window):
+        if 'cache_key' not in entry or entry.get('engine') in IN_MEMORY_ENGINES:
+            continue
+        counts[entry['cache_key']] += 1
+        params[entry['cache_key']] = entry['params']
+    return [{'params': params[key], 'cache_key': key, 'count': n} for key, n in counts.most_common(count)]
+
+
+class QueryLog:
+    """
+    Sampled, append-only log of /api/search requests and warm-up coverage.
+
+    A sample of searches is appended as JSON lines (parameters, cache key,
+    engine, outcome, hit and latency), which is what warm_up() replays.
+    Every search, sampled or not, is counted against the cache keys of the
+    last warm-up, so coverage is the share of live traffic the warmed set
+    answered. The file is shared by all workers and rotated to a single
+    .1 backup at max_bytes.
+    """
+
+    def __init__(
+        self,
+        path: str = settings.QUERY_LOG_PATH,
+        sample_rate: float = settings.QUERY_LOG_SAMPLE_RATE,
+        max_bytes: int = settings.QUERY_LOG_MAX_BYTES
+    ):
+        self.path = path
+        self.sample_rate = sample_rate
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self.sampled = 0
+        self.write_errors = 0
+        self.warmed: set = set()
+        self.live = 0
+        self.covered = 0
+        self.last_warmup: Optional[Dict] = None
+
+    def record(
+        self,
+        args: Mapping[str, str],
+        cache_key: str,
+        engine: str,
+        outcome: str,
+        latency_ms: float
+    ) -> None:
+        """Count a finished live search and append it to the log if sampled."""
+        with self._lock:
+            self.live += 1
+            if cache_key in self.warmed:
+                self.covered += 1
+        if random.random() >= self.sample_rate:
+            return
+        self.sampled += 1
+        self.append({
+            'ts': round(time.time(), 3),
+            'params': {name: args[name] for name in LOGGED_PARAMS if args.get(name)},
+            'cache_key': cache_key,
+            'engine': engine,
+            'outcome': outcome,
+            'hit': outcome in HIT_OUTCOMES,
+            'latency_ms': latency_ms
+        })
+
+    def append(self, entry: Dict) -> None:
+        line = json.dumps(entry, separators=(',', ':')) + '\n'
+        with self._lock:
+            try:
+                os.makedirs(os.path.dirname(self.path), exist_ok=True)
+                if os.path.exists(self.path) and os.path.getsize(self.path) > self.max_bytes:
+                    os.replace(self.path, f"{self.path}.1")
+                # One write per line in append mode, so workers do not interleave lines
+                with open(self.path, 'a', encoding='utf-8') as f:
+                    f.write(line)
+            except OSError as e:
+                self.write_errors += 1
+                print(f"⚠ Query log unavailable: {e}")
+
+    def start_coverage(self, keys: set, warmup: Dict) -> None:
+        """Measure coverage of live traffic against a new warmed set."""
+        with self._lock:
+            self.warmed = keys
+            self.live = 0
+            self.covered = 0
+            self.last_warmup = warmup
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                'sample_rate': self.sample_rate,
+                'sampled': self.sampled,
+                'write_errors': self.write_errors,
+                'warmed_queries': len(self.warmed),
+                'live_searches': self.live,
+                'covered_searches': self.covered,
+                'coverage': round(self.covered / self.live, 4) if self.live else 0.0,
+                'last_warmup': self.last_warmup
+            }
+
+
+def warm_up(
+    log: QueryLog,
+    replay: Callable[[Dict], bool],
+    is_cached: Callable[[str], bool],
+    count: int = settings.WARMUP_QUERIES,
+    concurrency: int = settings.WARMUP_CONCURRENCY
+) -> Dict:
+    """
+    Replay the most frequent logged searches so their results are cached.
+
+    Searches already in the cache are skipped; the rest are replayed by at
+    most concurrency threads, so live requests keep the other workers'
+    capacity. Coverage is then measured against the keys actually cached
+    (a replay that failed or found nothing is not), and the warm-up is
+    appended to the log as a 'warmup' event.
+
+    Args:
+        log: Query log to read and to measure coverage with
+        replay: Runs one search from its logged params; False on failure
+        is_cached: Whether a cache key already has a result
+        count: Number of top searches to warm
+        concurrency: Searches replayed at the same time
+
+    Returns:
+        Warm-up summary (queries, replayed, already_cached, failed, seconds)
+    """
+    started = time.monotonic()
+    queries = top_queries(log.path, count)
+    if not queries:
+        print("⚠ Cache warm-up: no searches logged yet")
+        return {'queries': 0, 'replayed': 0, 'already_cached': 0, 'failed': 0, 'seconds': 0.0}
+    pending = [query for query in queries if not is_cached(query['cache_key'])]
+
+    def run(query: Dict) -> bool:
+        try:
+            return replay(query['params'])
+        except Exception as e:
+            print(f"⚠ Warm-up of {query['params'].get('q')!r} failed: {e}")
+            return False
+
+    with ThreadPoolExecutor(max_workers=max(1, concurrency), thread_name_prefix='warmup') as pool:
+        succeeded = sum(pool.map(run, pending))
+
+    summary = {
+        'ts': round(time.time(), 3),
+        'queries': len(queries),
+        'replayed': succeeded,
+        'already_cached': len(queries) - len(pending),
+        'failed': len(pending) - succeeded,
+        'seconds': round(time.monotonic() - started, 2)
+    }
+    keys = {query['cache_key'] for query in queries if is_cached(query['cache_key'])}
+    log.start_coverage(keys, summary)
+    log.append({'event': 'warmup', **summary, 'keys': sorted(keys)})
+    print(f"✓ Cache warm-up: {summary['replayed']} replayed, {summary['already_cached']} already cached, "
+          f"{summary['failed']} failed ({summary['seconds']}s)")
+    return summary
+
+
+def start_warmup(
+    log: QueryLog,
+    replay: Callable[[Dict], bool],
+    is_cached: Callable[[str], bool],
+    shared: bool = False,
+    interval: float = settings.WARMUP_INTERVAL
+) -> None:
+    """
+    Warm the cache in a background thread now and, with an interval, every interval seconds.
+
+    With a private per-worker cache every worker replays into its own
+    cache. With a shared (Redis) cache, workers take turns on a file lock
+    next to the log: the first one replays the searches, the others find
+    its recent 'warmup' event and measure coverage against those of its
+    keys they now see cached, so N workers do not replay the top searches
+    against Morphik N times. An event is recent when it is younger than
+    half the interval, or WARMUP_REUSE_SECONDS for the startup-only warm-up.
+    """
+    if settings.WARMUP_QUERIES <= 0:
+        return
+    reuse_seconds = interval / 2 if interval > 0 else WARMUP_REUSE_SECONDS
+
+    def run_once() -> None:
+        if not shared:
+            warm_up(log, replay, is_cached)
+            return
+        os.makedirs(os.path.dirname(log.path), exist_ok=True)
+        with open(f"{log.path}.lock", 'a') as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                last = last_warmup_event(log.path)
+                if last is None or time.time() - last['ts'] >= reuse_seconds:
+                    warm_up(log, replay, is_cached)
+                    return
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+        keys = {key for key in last['keys'] if is_cached(key)}
+        log.start_coverage(keys, {k: v for k, v in last.items() if k not in ('event', 'keys')})
+        print(f"✓ Cache warm-up: done by another worker {time.time() - last['ts']:.0f}s ago")
+
+    def run() -> None:
+        while True:
+            try:
+                run_once()
+            except Exception as e:
+                print(f"⚠ Cache warm-up failed: {e}")
+            if interval <= 0:
+                return
+            time.sleep(interval)
+
+    threading.Thread(target=run, name='cache-warmup', daemon=True).start()
+
+
+def coverage_report(path: str = settings.QUERY_LOG_PATH) -> Dict:
+    """
+    Share of logged searches since the last warm-up that the warmed set covered.
+
+    Covered and uncovered searches are compared by cache hit ratio and
+    median latency.
+    """
+    warmup = None
+    searches = []
+    for entry in read_entries(path):
+        if entry.get('event') == 'warmup':
+            warmup, searches = entry, []
+        elif 'cache_key' in entry:
+            searches.append(entry)
+    keys = set(warmup['keys']) if warmup else set()
+
+    def summarize(entries: List[Dict]) -> Dict:
+        return {
+            'searches': len(entries),
+            'hit_ratio': round(sum(e['hit'] for e in entries) / len(entries), 4) if entries else 0.0,
+            'median_latency_ms': round(statistics.median(e['latency_ms'] for e in entries), 2) if entries else 0.0
+        }
+
+    covered = [e for e in searches if e['cache_key'] in keys]
+    return {
+        'last_warmup': {k: v for k, v in warmup.items() if k != 'keys'} if warmup else None,
+        'coverage': round(len(covered) / len(searches), 4) if searches else 0.0,
+        'covered': summarize(covered),
+        'uncovered': summarize([e for e in searches if e['cache_key'] not in keys])
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Report on the sampled /api/search query log")
+    parser.add_argument('--top', type=int, default=settings.WARMUP_QUERIES, help="Top searches to list")
+    args = parser.parse_args()
+
+    print(f"Query log: {settings.QUERY_LOG_PATH}")
+    print(f"\nTop searches (last {settings.WARMUP_WINDOW / 86400:g} days):")
+    for query in top_queries(count=args.top):
+        print(f"  {query['count']:6d}  {query['params'].get('q')!r} "
+              f"{ {k: v for k, v in query['params'].items() if k != 'q'} or ''}")
+
+    report = coverage_report()
+    print("\n=== Warm-up Coverage ===")
+    if report['last_warmup'] is None:
+        print("No warm-up recorded yet")
+    else:
+        print(f"Last warm-up: {time.ctime(report['last_warmup']['ts'])}, "
+              f"{report['last_warmup']['queries']} searches")
+        print(f"Logged searches since: {report['covered']['searches'] + report['uncovered']['searches']}")
+        print(f"Covered by the warmed set: {report['coverage']:.1%}")
+        for name in ('covered', 'uncovered'):
+            summary = report[name]
+            print(f"  {name}: {summary['searches']} searches, hit ratio {summary['hit_ratio']:.1%}, "
+                  f"median {summary['median_latency_ms']} ms")
@@ -0,0 +1,288 @@
+import asyncio
+import contextvars
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Callable, Dict, Optional
+
+import httpx
+
+import settings
+from metrics import REGISTRY, UPSTREAM_ERRORS, Counter, Gauge, async_upstream_call, upstream_call
+
+# Threads available per worker process for running Morphik calls under a deadline
+CALL_THREADS = 32
+
+CIRCUIT_STATES = {'closed': 0, 'half_open': 1, 'open': 2}
+
+HEDGED_CALLS = REGISTRY.register(Counter(
+    'ecss_upstream_hedged_total', 'Reads for which a second (hedged) request was sent.', ('operation',)))
+CIRCUIT_STATE = REGISTRY.register(Gauge(
+    'ecss_circuit_state', 'Circuit breaker state (0 closed, 1 half-open, 2 open).', ('circuit',)))
+CIRCUIT_REJECTIONS = REGISTRY.register(Counter(
+    'ecss_circuit_rejections_total', 'Calls failed fast because the circuit was open.', ('circuit',)))
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling an upstream that is currently considered down."""
+
+
+class DeadlineExceeded(Exception):
+    """Raised when an upstream call did not answer within its deadline."""
+
+
+def is_upstream_failure(error: Exception) -> bool:
+    """Whether an error says something about upstream health (4xx responses do not)."""
+    if isinstance(error, httpx.HTTPStatusError):
+        return error.response.status_code >= 500 or error.response.status_code == 429
+    return True
+
+
+class CircuitBreaker:
+    """
+    Closed / open / half-open circuit breaker over a sliding time window.
+
+    While closed, outcomes of the last `window` seconds are kept; once at
+    least `min_calls` were made and the failure rate reaches `failure_rate`
+    the circuit opens and every call fails fast with CircuitOpenError. After
+    `open_seconds` a single trial call is let through (half-open): success
+    closes the circuit, failure opens it again.
+    """
+
+    def __init__(
+        self,
+        name: str = 'morphik',
+        failure_rate: float = settings.CIRCUIT_FAILURE_RATE,
+        min_calls: int = settings.CIRCUIT_MIN_CALLS,
+        window: float = settings.CIRCUIT_WINDOW,
+        open_seconds: float = settings.CIRCUIT_OPEN_SECONDS
+    ):
+        self.name = name
+        self.failure_rate = failure_rate
+        self.min_calls = min_calls
+        self.window = window
+        self.open_seconds = open_seconds
+
+        self.state = 'closed'
+        self._outcomes: deque = deque()
+        self._opened_at = 0.0
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+        self.opens = 0
+        self.rejections = 0
+        CIRCUIT_STATE.set(0, circuit=name)
+
+    def _set_state(self, state: str) -> None:
+        self.state = state
+        CIRCUIT_STATE.set(CIRCUIT_STATES[state], circuit=self.name)
+        if state == 'open':
+            self._opened_at = time.monotonic()
+            self.opens += 1
+            print(f"⚠ Circuit '{self.name}' opened, failing fast for {self.open_seconds:g}s")
+        elif state == 'closed':
+            self._outcomes.clear()
+            print(f"✓ Circuit '{self.name}' closed")
+
+    def before_call(self) -> None:
+        """Raise CircuitOpenError unless a call may be made now."""
+        with self._lock:
+            if self.state == 'open' and time.monotonic() - self._opened_at >= self.open_seconds:
+                self._set_state('half_open')
+                self._trial_in_flight = False
+            if self.state == 'closed' or (self.state == 'half_open' and not self._trial_in_flight):
+                if self.state == 'half_open':
+                    self._trial_in_flight = True
+                return
+            self.rejections += 1
+        CIRCUIT_REJECTIONS.inc(circuit=self.name)
+        raise CircuitOpenError(f"Circuit '{self.name}' is open")
+
+    def is_open(self) -> bool:
+        """Whether calls are currently being failed fast (without consuming the trial call)."""
+        with self._lock:
+            return self.state == 'open' and time.monotonic() - self._opened_at < self.open_seconds
+
+    def rejects_calls(self) -> bool:
+        """
+        Fast-path check for callers that can skip Morphik entirely.
+
+        Like is_open(), but a positive answer is counted as a rejection.
+        """
+        if not self.is_open():
+            return False
+        with self._lock:
+            self.rejections += 1
+        CIRCUIT_REJECTIONS.inc(circuit=self.name)
+        return True
+
+    def record(self, success: bool) -> None:
+        """Record the outcome of a call that before_call() allowed."""
+        with self._lock:
+            if self.state == 'half_open':
+                self._trial_in_flight = False
+                self._set_state('closed' if success else 'open')
+                return
+            if self.state == 'open':
+                return
+
+            now = time.monotonic()
+            self._outcomes.append((now, success))
+            while self._outcomes and self._outcomes[0][0] < now - self.window:
+                self._outcomes.popleft()
+            calls = len(self._outcomes)
+            failures = sum(1 for _, ok in self._outcomes if not ok)
+            if calls >= self.min_calls and failures / calls >= self.failure_rate:
+                self._set_state('open')
+
+    def stats(self) -> Dict:
+        with self._lock:
+            calls = len(self._outcomes)
+            failures = sum(1 for _, ok in self._outcomes if not ok)
+        return {
+            'state': self.state,
+            'window_calls': calls,
+            'window_failure_rate': round(failures / calls, 3) if calls else 0.0,
+            'opens': self.opens,
+            'rejections': self.rejections
+        }
+
+
+class ResilientCaller:
+    """
+    Runs upstream calls with a deadline, a circuit breaker and optional hedging.
+
+    Synchronous calls run on a small per-process thread pool so the request
+    thread can stop waiting at the deadline (the abandoned call is still
+    bounded by the client timeout). Idempotent reads may be hedged: when the
+    first attempt has not answered after `hedge_delay` seconds an identical
+    second request is sent and the first successful answer wins.
+    """
+
+    def __init__(self, breaker: CircuitBreaker, hedge_delay: float = settings.MORPHIK_HEDGE_DELAY):
+        self.breaker = breaker
+        self.hedge_delay = hedge_delay
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._executor_pid: Optional[int] = None
+        self._lock = threading.Lock()
+        self.deadline_misses = 0
+        self.hedges = 0
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        # Pools do not survive a fork: build one per worker process
+        if self._executor_pid != os.getpid():
+            with self._lock:
+                if self._executor_pid != os.getpid():
+                    self._executor = ThreadPoolExecutor(max_workers=CALL_THREADS, thread_name_prefix="upstream")
+                    self._executor_pid = os.getpid()
+        return self._executor
+
+    def _should_hedge(self, hedge: bool, deadline: float) -> bool:
+        return hedge and 0 < self.hedge_delay < deadline
+
+    def _deadline_exceeded(self, operation: str, deadline: float) -> DeadlineExceeded:
+        self.deadline_misses += 1
+        self.breaker.record(False)
+        UPSTREAM_ERRORS.inc(operation=operation, error='DeadlineExceeded')
+        return DeadlineExceeded(f"Morphik {operation} did not answer within {deadline:g}s")
+
+    def _hedged(self, operation: str) -> None:
+        self.hedges += 1
+        HEDGED_CALLS.inc(operation=operation)
+
+    def call(self, operation: str, function: Callable, *args, deadline: float, hedge: bool = False, **kwargs):
+        """
+        Call a synchronous client method under the resilience policy.
+
+        Raises:
+            CircuitOpenError: The circuit is open, no call was made
+            DeadlineExceeded: No attempt answered within the deadline
+        """
+        self.breaker.before_call()
+        executor = self._get_executor()
+        started = time.monotonic()
+
+        def submit():
+            # Each attempt gets its own copy of the request context (stage timings)
+            return executor.submit(contextvars.copy_context().run, upstream_call, operation, function,
+                                   *args, **kwargs)
+
+        pending = {submit()}
+        hedge_pending = self._should_hedge(hedge, deadline)
+        error: Optional[Exception] = None
+        while pending:
+            elapsed = time.monotonic() - started
+            if elapsed >= deadline:
+                break
+            timeout = deadline - elapsed
+            if hedge_pending:
+                timeout = min(timeout, max(0.0, self.hedge_delay - elapsed))
+            done, pending = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    self.breaker.record(True)
+                    return future.result()
+                error = future.exception()
+            if hedge_pending and time.monotonic() - started >= self.hedge_delay and pending:
+                hedge_pending = False
+                self._hedged(operation)
+                pending.add(submit())
+
+        if pending or error is None:
+            raise self._deadline_exceeded(operation, deadline)
+        self.breaker.record(not is_upstream_failure(error))
+        raise error
+
+    async def async_call(self, operation: str, function: Callable, *args, deadline: float,
+                         hedge: bool = False, **kwargs):
+        """call() for AsyncMorphik coroutine methods; losing attempts are cancelled."""
+        self.breaker.before_call()
+        started = time.monotonic()
+
+        def submit():
+            return asyncio.ensure_future(async_upstream_call(operation, function, *args, **kwargs))
+
+        pending = {submit()}
+        hedge_pending = self._should_hedge(hedge, deadline)
+        error: Optional[BaseException] = None
+        try:
+            while pending:
+                elapsed = time.monotonic() - started
+                if elapsed >= deadline:
+                    break
+                timeout = deadline - elapsed
+                if hedge_pending:
+                    timeout = min(timeout, max(0.0, self.hedge_delay - elapsed))
+                done, pending = await asyncio.wait(pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        self.breaker.record(True)
+                        return task.result()
+                    error = task.exception()
+                if hedge_pending and time.monotonic() - started >= self.hedge_delay and pending:
+                    hedge_pending = False
+                    self._hedged(operation)
+                    pending.add(submit())
+        finally:
+            for task in pending:
+                task.cancel()
+
+        if pending or error is None:
+            raise self._deadline_exceeded(operation, deadline)
+        self.breaker.record(not is_upstream_failure(error))
+        raise error
+
+    def stats(self) -> Dict:
+        return {
+            'circuit': self.breaker.stats(),
+            'deadline_misses': self.deadline_misses,
+            'hedges': self.hedges,
+            'hedge_delay': self.hedge_delay,
+            'read_deadline': settings.MORPHIK_READ_DEADLINE,
+            'query_deadline': settings.MORPHIK_QUERY_DEADLINE
+        }
+
+
+# Shared by every request handled in this process
+morphik_calls = ResilientCaller(CircuitBreaker('morphik'))
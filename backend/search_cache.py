@@ -0,0 +1,286 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional
+
+import settings
+from search_filters import FILTER_PARAMS
+
+# Request filters that change the result set and therefore the cache key
+CACHE_KEY_FILTERS = FILTER_PARAMS
+
+# How often (seconds) a worker checks the corpus stamp for invalidations
+STAMP_CHECK_INTERVAL = 1.0
+
+REDIS_GENERATION_KEY = "ecss:search:generation"
+
+
+def normalize_query(query: str) -> str:
+    """Fold case and whitespace so equivalent queries share a cache entry."""
+    return " ".join(query.casefold().split())
+
+
+def make_cache_key(
+    query: str,
+    filters: Optional[Dict[str, str]] = None,
+    engine: str = 'morphik',
+    options: Optional[Dict] = None
+) -> str:
+    """Build the cache key for a query, its corpus filters, the engine and paging options."""
+    filters = filters or {}
+    key_data = {
+        'q': normalize_query(query),
+        'engine': engine,
+        'options': options or {},
+        'filters': {
+            name: str(filters.get(name) or '').strip().upper()
+            for name in CACHE_KEY_FILTERS
+        }
+    }
+    digest = hashlib.sha1(json.dumps(key_data, sort_keys=True).encode('utf-8')).hexdigest()
+    return f"search:{digest}"
+
+
+class LRUTTLCache:
+    """
+    Thread-safe in-process cache with LRU eviction and per-entry TTL.
+
+    Expired entries are not served by get() but stay in place until LRU
+    eviction, so get_stale() can still return them while upstream is down.
+    """
+
+    def __init__(self, max_entries: int, ttl: float):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key: str):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                self.expirations += 1
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def get_stale(self, key: str):
+        """Return an entry even if its TTL has passed (None if evicted or never set)."""
+        with self._lock:
+            entry = self._entries.get(key)
+            return entry[1] if entry is not None else None
+
+    def set(self, key: str, value, ttl: Optional[float] = None) -> None:
+        if self.max_entries <= 0:
+            return
+        expires_at = time.monotonic() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._entries[key] = (expires_at, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class RedisCacheBackend:
+    """
+    Shared cache stored in Redis so every gunicorn worker sees the same entries.
+
+    Keys are namespaced by a corpus generation counter; invalidation bumps the
+    counter instead of scanning for keys, and stale generations expire by TTL.
+    """
+
+    def __init__(self, url: str, ttl: float):
+        import redis  # Optional dependency, only needed for the shared backend
+
+        self.ttl = ttl
+        self._redis = redis.Redis.from_url(url, socket_timeout=0.5, socket_connect_timeout=0.5)
+        self._generation = None
+        self._generation_checked = 0.0
+
+    def _namespaced(self, key: str) -> str:
+        now = time.monotonic()
+        if self._generation is None or now - self._generation_checked > STAMP_CHECK_INTERVAL:
+            self._generation = int(self._redis.get(REDIS_GENERATION_KEY) or 0)
+            self._generation_checked = now
+        return f"ecss:{self._generation}:{key}"
+
+    def get(self, key: str):
+        raw = self._redis.get(self._namespaced(key))
+        return json.loads(raw) if raw is not None else None
+
+    def set(self, key: str, value) -> None:
+        self._redis.set(self._namespaced(key), json.dumps(value), ex=max(1, int(self.ttl)))
+
+    def invalidate(self) -> None:
+        self._generation = int(self._redis.incr(REDIS_GENERATION_KEY))
+        self._generation_checked = time.monotonic()
+
+
+def read_corpus_stamp() -> float:
+    """Modification time of the corpus stamp file (0 if ingestion never ran)."""
+    try:
+        return os.path.getmtime(settings.CORPUS_STAMP_PATH)
+    except OSError:
+        return 0.0
+
+
+class SearchCache:
+    """
+    Two-level /api/search result cache.
+
+    Entries are served from the per-process LRU first, then from the optional
+    shared Redis backend. Whenever the corpus stamp file changes (ingestion
+    finished) the local level is dropped, so all workers stop serving results
+    computed against the old corpus.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = settings.SEARCH_CACHE_SIZE,
+        ttl: float = settings.SEARCH_CACHE_TTL,
+        redis_url: Optional[str] = settings.SEARCH_CACHE_REDIS_URL
+    ):
+        self.local = LRUTTLCache(max_entries, ttl)
+        self.shared = None
+        if redis_url:
+            try:
+                self.shared = RedisCacheBackend(redis_url, ttl)
+            except ImportError:
+                print("⚠ SEARCH_CACHE_REDIS_URL is set but the 'redis' package is not installed")
+
+        self.hits = 0
+        self.shared_hits = 0
+        self.misses = 0
+        self.stale_hits = 0
+        self.invalidations = 0
+        self._stamp = read_corpus_stamp()
+        self._stamp_checked = time.monotonic()
+
+    def _check_stamp(self) -> None:
+        now = time.monotonic()
+        if now - self._stamp_checked < STAMP_CHECK_INTERVAL:
+            return
+        self._stamp_checked = now
+        stamp = read_corpus_stamp()
+        if stamp != self._stamp:
+            self._stamp = stamp
+            self.local.clear()
+            self.invalidations += 1
+
+    def get(self, key: str):
+        self._check_stamp()
+
+        value = self.local.get(key)
+        if value is not None:
+            self.hits += 1
+            return value
+
+        if self.shared is not None:
+            try:
+                value = self.shared.get(key)
+            except Exception as e:
+                print(f"⚠ Shared search cache unavailable: {e}")
+                value = None
+            if value is not None:
+                self.local.set(key, value)
+                self.hits += 1
+                self.shared_hits += 1
+                return value
+
+        self.misses += 1
+        return None
+
+    def set(self, key: str, value) -> None:
+        self.local.set(key, value)
+        if self.shared is not None:
+            try:
+                self.shared.set(key, value)
+            except Exception as e:
+                print(f"⚠ Shared search cache unavailable: {e}")
+
+    def peek(self, key: str):
+        """get() without touching the hit/miss counters (for polling another worker's result)."""
+        self._check_stamp()
+
+        value = self.local.get(key)
+        if value is None and self.shared is not None:
+            try:
+                value = self.shared.get(key)
+            except Exception:
+                value = None
+        return value
+
+    def get_stale(self, key: str):
+        """
+        Last result stored in this process for a key, ignoring its TTL.
+
+        Used to degrade gracefully when Morphik is down; results dropped by a
+        corpus invalidation are never returned.
+        """
+        value = self.local.get_stale(key)
+        if value is not None:
+            self.stale_hits += 1
+        return value
+
+    def invalidate(self) -> None:
+        """Drop every cached result in this process and in the shared backend."""
+        self.local.clear()
+        self.invalidations += 1
+        if self.shared is not None:
+            try:
+                self.shared.invalidate()
+            except Exception as e:
+                print(f"⚠ Shared search cache unavailable: {e}")
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            'entries': len(self.local),
+            'max_entries': self.local.max_entries,
+            'ttl': self.local.ttl,
+            'shared_backend': self.shared is not None,
+            'hits': self.hits,
+            'shared_hits': self.shared_hits,
+            'misses': self.misses,
+            'stale_hits': self.stale_hits,
+            'hit_ratio': round(self.hits / lookups, 4) if lookups else 0.0,
+            'evictions': self.local.evictions,
+            'expirations': self.local.expirations,
+            'invalidations': self.invalidations
+        }
+
+
+def invalidate_search_cache() -> None:
+    """
+    Signal every API worker that the corpus changed.
+
+    Called by the ingestion scripts: touches the corpus stamp file watched by
+    the workers and bumps the shared Redis generation when one is configured.
+    """
+    os.makedirs(os.path.dirname(settings.CORPUS_STAMP_PATH), exist_ok=True)
+    with open(settings.CORPUS_STAMP_PATH, 'a'):
+        pass
+    now = time.time()
+    os.utime(settings.CORPUS_STAMP_PATH, (now, now))
+
+    if settings.SEARCH_CACHE_REDIS_URL:
+        try:
+            RedisCacheBackend(settings.SEARCH_CACHE_REDIS_URL, settings.SEARCH_CACHE_TTL).invalidate()
+        except Exception as e:
+            print(f"⚠ Could not invalidate shared search cache: {e}")
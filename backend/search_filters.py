@@ -0,0 +1,93 @@
+import re
+from typing import Dict, Mapping, Optional, Tuple
+
+# Exact-match metadata filters: request parameter -> document metadata key
+METADATA_FILTERS = {
+    'branch': 'branch',
+    'discipline': 'discipline',
+    'revision': 'revision',
+    'status': 'standard_status'
+}
+
+# Every request parameter that narrows the searched corpus
+FILTER_PARAMS = tuple(METADATA_FILTERS) + ('date_from', 'date_to')
+
+STATUS_VALUES = {'active': 'Active', 'superseded': 'Superseded'}
+
+DATE_PATTERN = re.compile(r'^\d{4}(?:-\d{2}(?:-\d{2})?)?$')
+
+
+def _normalize_date(value: str, end: bool) -> Optional[str]:
+    """Expand YYYY or YYYY-MM to a full ISO date at the start or end of the period."""
+    if not DATE_PATTERN.match(value):
+        return None
+    parts = value.split('-')
+    if len(parts) == 1:
+        parts.append('12' if end else '01')
+    if len(parts) == 2:
+        parts.append('31' if end else '01')
+    return '-'.join(parts)
+
+
+def parse_search_filters(args: Mapping[str, str]) -> Tuple[Dict[str, str], Optional[str]]:
+    """
+    Read the corpus filters from request parameters.
+
+    Returns the normalized filters (only those that were given) and an error
+    message for invalid values.
+    """
+    filters = {}
+    for name in METADATA_FILTERS:
+        value = (args.get(name) or '').strip()
+        if value:
+            filters[name] = value.upper() if name in ('branch', 'discipline') else value
+
+    if 'status' in filters:
+        status = STATUS_VALUES.get(filters['status'].lower())
+        if status is None:
+            return {}, "Invalid status, expected 'Active' or 'Superseded'"
+        filters['status'] = status
+
+    for name, end in (('date_from', False), ('date_to', True)):
+        value = (args.get(name) or '').strip()
+        if value:
+            date = _normalize_date(value, end)
+            if date is None:
+                return {}, f"Invalid {name}, expected YYYY, YYYY-MM or YYYY-MM-DD"
+            filters[name] = date
+
+    return filters, None
+
+
+def to_morphik_filters(filters: Dict[str, str]) -> Optional[Dict]:
+    """Translate parsed filters into a Morphik metadata filter (None when unfiltered)."""
+    morphik_filters = {
+        METADATA_FILTERS[name]: value
+        for name, value in filters.items()
+        if name in METADATA_FILTERS
+    }
+
+    date_range = {}
+    if 'date_from' in filters:
+        date_range['$gte'] = filters['date_from']
+    if 'date_to' in filters:
+        date_range['$lte'] = filters['date_to']
+    if date_range:
+        morphik_filters['publication_date'] = date_range
+
+    return morphik_filters or None
+
+
+def metadata_matches(metadata: Dict, filters: Dict[str, str]) -> bool:
+    """Whether document metadata satisfies parsed filters (used by local engines)."""
+    for name, key in METADATA_FILTERS.items():
+        if name in filters and metadata.get(key) != filters[name]:
+            return False
+
+    publication_date = metadata.get('publication_date')
+    if 'date_from' in filters and (not publication_date or publication_date < filters['date_from']):
+        return False
+    if 'date_to' in filters and (not publication_date or publication_date > filters['date_to']):
+        return False
+
+    return True
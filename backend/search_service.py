@@ -0,0 +1,418 @@
+import re
+import threading
+from typing import Dict, List, Mapping, Optional, Tuple
+
+import settings
+from citation_graph import DIRECTIONS, CitationGraph
+from clause_index import ClauseIndex, parse_clause_reference
+from glossary_index import BARE_TERM_WORDS, GlossaryIndex, normalize_term, parse_definition_query
+from local_index import LocalIndex
+from search_cache import make_cache_key
+from search_filters import parse_search_filters
+from suggest_index import MAX_SUGGESTIONS, SuggestIndex
+
+SEARCH_ENGINES = ('morphik', 'local', 'auto')
+
+# Pagination of ranked results
+DEFAULT_RESULT_LIMIT = 10
+MAX_RESULT_LIMIT = 50
+MAX_RESULT_OFFSET = 200
+
+# Typeahead suggestions per /api/suggest request
+DEFAULT_SUGGEST_LIMIT = 8
+
+# Standard numbers (ECSS-E-ST-40C), clause numbers (5.4.2.1a) and quoted phrases
+KEYWORD_QUERY_PATTERN = re.compile(r'ECSS-|\b\d+(?:\.\d+)+[a-z]?\b|"', re.IGNORECASE)
+
+# Used when the source document of an answer is unknown
+DEFAULT_DOCUMENT_METADATA = {
+    'branch': 'S',
+    'branch_name': 'Space Product Assurance',
+    'discipline': 'ST',
+    'discipline_name': 'Space Systems',
+    'document_number': '00C',
+    'revision': '1',
+    'filename': 'Unknown',
+    'document_type': 'ECSS_Standard',
+    'source': 'ECSS_Published_Standards'
+}
+
+# Local BM25 index, loaded on first use
+_local_index = None
+_local_index_lock = threading.Lock()
+
+# Clause/requirement index, loaded on first use
+_clause_index = None
+_clause_index_lock = threading.Lock()
+
+# Citation graph between standards, loaded on first use
+_citation_graph = None
+_citation_graph_lock = threading.Lock()
+
+# Term -> definitions index, loaded on first use
+_glossary_index = None
+_glossary_index_lock = threading.Lock()
+
+# Typeahead index, built once per worker
+_suggest_index = None
+_suggest_index_lock = threading.Lock()
+
+
+def get_local_index() -> Optional[LocalIndex]:
+    """Get the local BM25 index, or None if it has not been built."""
+    global _local_index
+    if _local_index is None:
+        with _local_index_lock:
+            if _local_index is None:
+                _local_index = LocalIndex.load(settings.LOCAL_INDEX_PATH)
+    return _local_index
+
+
+def get_clause_index() -> Optional[ClauseIndex]:
+    """Get the clause index, or None if it has not been built."""
+    global _clause_index
+    if _clause_index is None:
+        with _clause_index_lock:
+            if _clause_index is None:
+                _clause_index = ClauseIndex.load(settings.CLAUSE_INDEX_PATH)
+    return _clause_index
+
+
+def get_citation_graph() -> Optional[CitationGraph]:
+    """Get the citation graph, or None if it has not been built."""
+    global _citation_graph
+    if _citation_graph is None:
+        with _citation_graph_lock:
+            if _citation_graph is None:
+                _citation_graph = CitationGraph.load(settings.CITATION_GRAPH_PATH)
+    return _citation_graph
+
+
+def get_glossary_index() -> Optional[GlossaryIndex]:
+    """Get the glossary index, or None if it has not been built."""
+    global _glossary_index
+    if _glossary_index is None:
+        with _glossary_index_lock:
+            if _glossary_index is None:
+                _glossary_index = GlossaryIndex.load(settings.GLOSSARY_INDEX_PATH)
+    return _glossary_index
+
+
+def get_suggest_index() -> SuggestIndex:
+    """Get the typeahead index, building it on first use (without terms if there is no local index)."""
+    global _suggest_index
+    if _suggest_index is None:
+        with _suggest_index_lock:
+            if _suggest_index is None:
+                _suggest_index = SuggestIndex.build(
+                    [settings.ACTIVE_STANDARDS_DIR, settings.SUPERSEDED_STANDARDS_DIR], get_local_index())
+    return _suggest_index
+
+
+def start_suggest_index_build() -> None:
+    """Build the typeahead index in the background, so the first keystrokes need not wait for it."""
+    threading.Thread(target=get_suggest_index, name='suggest-index', daemon=True).start()
+
+
+def _parse_int(args: Mapping[str, str], name: str, default: int, minimum: int, maximum: int) -> int:
+    """Read an integer parameter, clamped to [minimum, maximum]."""
+    try:
+        value = int(args.get(name, default))
+    except ValueError:
+        value = default
+    return max(minimum, min(maximum, value))
+
+
+def parse_search_request(args: Mapping[str, str]) -> Tuple[Dict, Optional[str]]:
+    """
+    Validate /api/search parameters.
+
+    Returns the parsed request (query, engine, engine_explicit, filters,
+    limit, offset, generate, cache_key and context_key, the cache key
+    without the query text) and an error message for invalid parameters.
+    """
+    query = args.get('q', '')
+
+    engine = args.get('engine', settings.SEARCH_ENGINE).lower()
+    if engine not in SEARCH_ENGINES:
+        return {}, f"Unknown engine '{engine}', expected one of: {', '.join(SEARCH_ENGINES)}"
+
+    filters, filter_error = parse_search_filters(args)
+    if filter_error:
+        return {}, filter_error
+
+    limit = _parse_int(args, 'limit', DEFAULT_RESULT_LIMIT, 1, MAX_RESULT_LIMIT)
+    offset = _parse_int(args, 'offset', 0, 0, MAX_RESULT_OFFSET)
+    generate = args.get('generate', '').lower() in ('1', 'true', 'yes')
+    options = {'limit': limit, 'offset': offset, 'generate': generate}
+
+    return {
+        'query': query,
+        'engine': engine,
+        'engine_explicit': bool(args.get('engine')) and engine != 'auto',
+        'filters': filters,
+        'limit': limit,
+        'offset': offset,
+        'generate': generate,
+        'cache_key': make_cache_key(query, filters, engine, options),
+        'context_key': make_cache_key('', filters, engine, options)
+    }, None
+
+
+def is_keyword_query(query: str) -> bool:
+    """Whether a query is better answered lexically (standard/clause numbers, exact terms)."""
+    return bool(KEYWORD_QUERY_PATTERN.search(query)) or len(query.split()) <= 2
+
+
+def choose_engine(params: Dict, index: Optional[LocalIndex]) -> str:
+    """Resolve engine=auto: keyword-style queries go to the local index when it exists."""
+    if params['engine'] != 'auto':
+        return params['engine']
+    if index is not None and is_keyword_query(params['query']) and not params['generate']:
+        return 'local'
+    return 'morphik'
+
+
+def local_search_response(index: LocalIndex, params: Dict) -> Dict:
+    """Answer a search from the local BM25 index."""
+    limit, offset = params['limit'], params['offset']
+    results = index.search(params['query'], limit=offset + limit, filters=params['filters'])[offset:]
+    return {
+        'results': results,
+        'total': len(results),
+        'query': params['query'],
+        'engine': 'local',
+        'offset': offset,
+        'limit': limit
+    }
+
+
+def parse_clause_request(args: Mapping[str, str]) -> Tuple[Dict, Optional[str]]:
+    """
+    Validate /api/clause parameters.
+
+    Accepts either standard and clause ("E-ST-40C", "5.4.2.1a") or a single
+    q reference ("ECSS-E-ST-40C 5.4.2.1a"). Returns the parsed request
+    (standard, clause, filters) and an error message for invalid parameters.
+    """
+    clause = args.get('clause', '').strip()
+    if clause:
+        reference = {'standard': args.get('standard', '').strip() or None, 'clause': clause}
+    else:
+        reference = parse_clause_reference(args.get('q', ''))
+        if reference is None:
+            return {}, "Expected clause (and optionally standard), or q with a clause reference"
+
+    filters, filter_error = parse_search_filters(args)
+    if filter_error:
+        return {}, filter_error
+    return {**reference, 'filters': filters}, None
+
+
+def parse_suggest_request(args: Mapping[str, str]) -> Tuple[str, int]:
+    """The /api/suggest prefix and limit (clamped to [1, MAX_SUGGESTIONS])."""
+    return args.get('q', ''), _parse_int(args, 'limit', DEFAULT_SUGGEST_LIMIT, 1, MAX_SUGGESTIONS)
+
+
+def parse_definition_request(args: Mapping[str, str]) -> Tuple[Dict, Optional[str]]:
+    """
+    Validate /api/define parameters.
+
+    Accepts term ("critical item") or q, either a question ("what is a
+    critical item?") or the term itself. Returns the parsed request (term,
+    filters) and an error message for invalid parameters.
+    """
+    term = args.get('term', '').strip()
+    if not term:
+        query = args.get('q', '').strip()
+        term = parse_definition_query(query) or query
+    if not term:
+        return {}, "Missing term, e.g. term=critical item"
+
+    filters, filter_error = parse_search_filters(args)
+    if filter_error:
+        return {}, filter_error
+    return {'term': term, 'filters': filters}, None
+
+
+def parse_related_request(args: Mapping[str, str]) -> Tuple[Dict, Optional[str]]:
+    """
+    Validate /api/related parameters.
+
+    Returns the parsed request (standard, depth clamped to
+    [1, CITATION_MAX_DEPTH], direction) and an error message for invalid
+    parameters.
+    """
+    standard = args.get('standard', '').strip()
+    if not standard:
+        return {}, "Missing standard, e.g. standard=ECSS-E-ST-40C"
+    direction = args.get('direction', 'out').lower()
+    if direction not in DIRECTIONS:
+        return {}, f"Unknown direction '{direction}', expected one of: {', '.join(DIRECTIONS)}"
+    depth = _parse_int(args, 'depth', 1, 1, settings.CITATION_MAX_DEPTH)
+    return {'standard': standard, 'depth': depth, 'direction': direction}, None
+
+
+def clause_lookup_response(index: ClauseIndex, params: Dict) -> Optional[Dict]:
+    """
+    Answer a search for a clause reference from the clause index.
+
+    Returns:
+        The /api/search response, or None when the query is not a clause
+        reference or the clause is not in the index
+    """
+    reference = parse_clause_reference(params['query'])
+    if reference is None:
+        return None
+    results = index.lookup(reference['clause'], reference['standard'], params['filters'])
+    if not results:
+        return None
+    limit, offset = params['limit'], params['offset']
+    return {
+        'results': results[offset:offset + limit],
+        'total': len(results),
+        'query': params['query'],
+        'engine': 'clause',
+        'clause': reference['clause'],
+        'standard': reference['standard'],
+        'offset': offset,
+        'limit': limit
+    }
+
+
+def definition_search_response(index: GlossaryIndex, params: Dict) -> Optional[Dict]:
+    """
+    Answer a definitional question ("what is a critical item") or a query
+    that is exactly a defined term ("critical item") from the glossary index.
+
+    Bare terms are only answered when no engine was chosen (or engine=auto):
+    many are everyday words ("software", "verification"), and an explicit
+    engine=local or engine=morphik must still return ranked documents.
+
+    Returns:
+        The /api/search response, or None when the query is neither or the
+        term is not defined
+    """
+    term = parse_definition_query(params['query'])
+    if term is None:
+        if params.get('engine_explicit'):
+            return None
+        term = normalize_term(params['query'])
+        if len(term.split()) > BARE_TERM_WORDS or term not in index.by_term:
+            return None
+    results = index.lookup(term, params['filters'])
+    if not results:
+        return None
+    limit, offset = params['limit'], params['offset']
+    return {
+        'results': results[offset:offset + limit],
+        'total': len(results),
+        'query': params['query'],
+        'engine': 'glossary',
+        'term': results[0]['term'],
+        'offset': offset,
+        'limit': limit
+    }
+
+
+def chunk_page(chunk) -> Optional[int]:
+    """1-based page number of a retrieved chunk, or None when unknown."""
+    metadata = getattr(chunk, 'metadata', None) or {}
+    page = metadata.get('page_number') or metadata.get('page')
+    if page:
+        return int(page)
+    # ColPali chunks are whole pages numbered from 0
+    if getattr(chunk, 'content_type', '').startswith('image'):
+        return chunk.chunk_number + 1
+    return None
+
+
+def absolute_page(page: Optional[int], metadata: Dict) -> Optional[int]:
+    """Page in the original PDF of a page numbered within an uploaded part (see pdf_split.py)."""
+    if page is None:
+        return None
+    return page + int(metadata.get('page_offset') or 0)
+
+
+def document_title(filename: str, metadata: Dict) -> str:
+    """Display name of a document: the original PDF for the parts of a split upload."""
+    return metadata.get('parent_document') or filename
+
+
+def chunks_missing_documents(chunks: List) -> List[str]:
+    """Document IDs of chunks that came back without filename or metadata."""
+    return [chunk.document_id for chunk in chunks if not chunk.filename or not chunk.metadata]
+
+
+def format_chunk_results(chunks: List, documents: Dict[str, Dict]) -> List[Dict]:
+    """Convert retrieved chunks into ranked /api/search results."""
+    results = []
+    for chunk in chunks:
+        document_info = documents.get(chunk.document_id, {})
+        filename = chunk.filename or document_info.get('filename', 'Unknown')
+        metadata = chunk.metadata or document_info.get('metadata', {})
+        page = absolute_page(chunk_page(chunk), metadata)
+        results.append({
+            'id': f"{chunk.document_id}:{chunk.chunk_number}",
+            'title': document_title(filename, metadata),
+            # Image chunks (ColPali) have no text to show
+            'content': chunk.content if isinstance(chunk.content, str) and chunk.content_type.startswith('text') else '',
+            'score': round(chunk.score, 4),
+            'page': page,
+            'document_id': chunk.document_id,
+            'metadata': {**metadata, 'page_number': page}
+        })
+    return results
+
+
+def completion_source_ids(morphik_response) -> List[str]:
+    """Document IDs cited by a completion, in source order."""
+    sources = getattr(morphik_response, 'sources', None) or []
+    return [source.document_id for source in sources if getattr(source, 'document_id', None)]
+
+
+def format_completion_results(morphik_response, documents: Dict[str, Dict]) -> List[Dict]:
+    """Convert a Morphik completion into a single /api/search result."""
+    if not morphik_response or not hasattr(morphik_response, 'completion'):
+        return []
+
+    sources = getattr(morphik_response, 'sources', None) or []
+    first_source = sources[0] if sources else None
+    # Use the first source document
+    document_info = documents.get(getattr(first_source, 'document_id', None))
+    title = document_title(document_info['filename'], document_info['metadata']) if document_info else None
+
+    return [{
+        'id': getattr(first_source, 'document_id', '1') if first_source else '1',
+        'title': title or 'ECSS Document',
+        'content': morphik_response.completion,
+        'score': 0.95,  # Default score
+        'relevance': getattr(first_source, 'score', 0) if first_source else 0,
+        'metadata': document_info['metadata'] if document_info else DEFAULT_DOCUMENT_METADATA
+    }]
+
+
+def format_document_list(documents) -> List[Dict]:
+    """Convert Morphik documents into /api/documents entries."""
+    return [
+        {
+            'id': getattr(doc, 'external_id', 'Unknown'),
+            'filename': getattr(doc, 'filename', 'Unknown'),
+            'status': (getattr(doc, 'system_metadata', None) or {}).get('status', 'Unknown'),
+            'metadata': getattr(doc, 'metadata', {})
+        }
+        for doc in documents
+    ]
+
+
+def format_catalog_documents(entries: Dict[str, Dict]) -> List[Dict]:
+    """/api/documents entries from the document catalog, used while Morphik is unavailable."""
+    return [
+        {
+            'id': external_id,
+            'filename': entry.get('filename', 'Unknown'),
+            'status': 'Unknown',
+            'metadata': entry.get('metadata', {})
+        }
+        for external_id, entry in entries.items()
+    ]
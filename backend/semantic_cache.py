@@ -0,0 +1,260 @@
+import threading
+import time
+import zlib
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+import settings
+from local_index import PART_PATTERN, STOPWORDS, TOKEN_PATTERN
+from search_cache import STAMP_CHECK_INTERVAL, read_corpus_stamp
+
+# Dimensions of the hashed query vectors
+VECTOR_DIMENSIONS = 2048
+
+# Candidates checked per lookup, best similarity first
+TOP_K = 5
+
+# Weight of character trigrams relative to whole words (tolerates typos and inflections)
+TRIGRAM_WEIGHT = 0.3
+
+# Domain abbreviations expanded before vectorizing, so "TVAC" matches "thermal vacuum"
+ABBREVIATIONS = {
+    'tvac': 'thermal vacuum',
+    'tv': 'thermal vacuum',
+    'pa': 'product assurance',
+    'qa': 'quality assurance',
+    'sw': 'software',
+    'hw': 'hardware',
+    'eee': 'electrical electronic electromechanical',
+    'emc': 'electromagnetic compatibility',
+    'esd': 'electrostatic discharge',
+    'fmea': 'failure modes effects analysis',
+    'fmeca': 'failure modes effects criticality analysis',
+    'rams': 'reliability availability maintainability safety',
+    'ncr': 'nonconformance report',
+    'aiv': 'assembly integration verification',
+    'v&v': 'verification validation',
+    'cots': 'commercial off the shelf',
+    'req': 'requirement',
+    'reqs': 'requirements'
+}
+
+# Question words that do not change what is being asked for
+QUESTION_WORDS = frozenset("what how when where why who does do please tell me about".split())
+
+# Words that change what is asked: dropped by the local index, kept here
+KEPT_WORDS = frozenset("not no never without except shall should must may can will".split())
+QUERY_STOPWORDS = STOPWORDS - KEPT_WORDS
+
+# Negations make a query mean the opposite, so they must match exactly
+NEGATIONS = frozenset("not no never without except".split())
+
+# Inflection endings folded away so "testing", "tests" and "test" share a feature
+SUFFIXES = ('ments', 'ment', 'ings', 'ing', 'ies', 'ed', 'es', 's')
+
+
+def _stem(word: str) -> str:
+    for suffix in SUFFIXES:
+        if word.endswith(suffix) and len(word) - len(suffix) >= 3:
+            return word[:-len(suffix)]
+    return word
+
+
+def _bucket(feature: str) -> Tuple[int, float]:
+    """Hashed dimension and sign of a feature (the sign keeps collisions from adding up)."""
+    digest = zlib.crc32(feature.encode('utf-8'))
+    return digest % VECTOR_DIMENSIONS, 1.0 if digest & 0x80000000 else -1.0
+
+
+def _tokens(query: str) -> List[str]:
+    """Whole tokens of a query (compound ones like "5.4.2" kept intact), abbreviations expanded."""
+    words = query.casefold().replace("n't", " not").split()
+    expanded = ' '.join(ABBREVIATIONS.get(word.strip('?!.,;:()'), word) for word in words)
+    return TOKEN_PATTERN.findall(expanded)
+
+
+def query_features(query: str) -> List[str]:
+    """Stemmed words of a query and the parts of compound tokens, keeping negations and modal verbs."""
+    features = []
+    for token in _tokens(query):
+        parts = [token] if token.isalnum() else [token, *PART_PATTERN.findall(token)]
+        features.extend(_stem(part) for part in parts
+                        if len(part) > 1 and part not in QUERY_STOPWORDS and part not in QUESTION_WORDS)
+    return features
+
+
+def exact_terms(query: str) -> str:
+    """
+    Parts of a query that must be identical for two queries to share an answer.
+
+    Standard designations, clause numbers and any other token with a digit
+    ("ecss-e-st-40c", "5.4.2", "class-b") plus a negation marker; they are
+    folded into the cache context, so "clause 5.4.2" never matches "clause
+    5.4.3" however close their vectors are.
+    """
+    tokens = _tokens(query)
+    terms = sorted({token for token in tokens if any(c.isdigit() for c in token)})
+    if any(token in NEGATIONS for token in tokens):
+        terms.append('!not')
+    return ' '.join(terms)
+
+
+def vectorize_query(query: str) -> np.ndarray:
+    """
+    L2-normalized hashed bag-of-words vector of a query (CPU only, no model).
+
+    Words count fully, their character trigrams with TRIGRAM_WEIGHT, so
+    paraphrases that reorder or inflect the same terms score close to 1.
+    """
+    vector = np.zeros(VECTOR_DIMENSIONS, dtype=np.float32)
+    for word in query_features(query):
+        index, sign = _bucket(word)
+        vector[index] += sign
+        padded = f"#{word}#"
+        for start in range(len(padded) - 2):
+            index, sign = _bucket(padded[start:start + 3])
+            vector[index] += sign * TRIGRAM_WEIGHT
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
+
+
+class SemanticCache:
+    """
+    Cache of generated answers matched by query similarity instead of exact text.
+
+    Query vectors live in a fixed (max_entries x VECTOR_DIMENSIONS) matrix;
+    a lookup is one matrix-vector product followed by a top-k selection
+    restricted to entries with the same context (filters, engine, options
+    and the query's exact_terms()) that have not expired. The least recently used entry is
+    replaced when the matrix is full, and everything is dropped when the
+    corpus stamp changes.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = settings.SEMANTIC_CACHE_SIZE,
+        threshold: float = settings.SEMANTIC_CACHE_THRESHOLD,
+        ttl: float = settings.SEARCH_CACHE_TTL
+    ):
+        self.max_entries = max(0, max_entries)
+        self.threshold = threshold
+        self.ttl = ttl
+
+        self._vectors = np.zeros((self.max_entries, VECTOR_DIMENSIONS), dtype=np.float32)
+        self._contexts = np.zeros(self.max_entries, dtype=np.int64)
+        self._expires = np.zeros(self.max_entries, dtype=np.float64)
+        self._last_used = np.zeros(self.max_entries, dtype=np.float64)
+        self._queries: List[Optional[str]] = [None] * self.max_entries
+        self._values: List[Optional[Dict]] = [None] * self.max_entries
+        self._size = 0
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+        self._stamp = read_corpus_stamp()
+        self._stamp_checked = time.monotonic()
+
+    @staticmethod
+    def _context_id(context: str, query: str) -> int:
+        return zlib.crc32(f"{context}\x00{exact_terms(query)}".encode('utf-8'))
+
+    def _check_stamp(self) -> None:
+        now = time.monotonic()
+        if now - self._stamp_checked < STAMP_CHECK_INTERVAL:
+            return
+        self._stamp_checked = now
+        stamp = read_corpus_stamp()
+        if stamp != self._stamp:
+            self._stamp = stamp
+            self.clear()
+            self.invalidations += 1
+
+    def _best_matches(
+        self,
+        vector: np.ndarray,
+        context_id: int,
+        now: float
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """Slots of the top-k live entries in this context and their similarities, best first."""
+        similarities = self._vectors[:self._size] @ vector
+        live = (self._contexts[:self._size] == context_id) & (self._expires[:self._size] > now)
+        similarities = np.where(live, similarities, -1.0)
+        k = min(TOP_K, self._size)
+        slots = np.argpartition(-similarities, k - 1)[:k]
+        slots = slots[np.argsort(-similarities[slots])]
+        return slots, similarities[slots]
+
+    def get(self, query: str, context: str) -> Optional[Tuple[Dict, str, float]]:
+        """
+        Find a cached answer for a similar query in the same context, with
+        the same identifiers and negation (exact_terms()).
+
+        Returns:
+            (cached value, the query it was stored for, cosine similarity),
+            or None when nothing reaches the threshold
+        """
+        if self.max_entries == 0:
+            return None
+        self._check_stamp()
+        vector = vectorize_query(query)
+        now = time.monotonic()
+        with self._lock:
+            if self._size:
+                slots, similarities = self._best_matches(vector, self._context_id(context, query), now)
+                if len(slots) and similarities[0] >= self.threshold:
+                    slot = int(slots[0])
+                    self._last_used[slot] = now
+                    self.hits += 1
+                    return self._values[slot], self._queries[slot], float(similarities[0])
+            self.misses += 1
+            return None
+
+    def set(self, query: str, context: str, value: Dict) -> None:
+        """Store an answer; replaces a near-identical entry, else the least recently used one when full."""
+        if self.max_entries == 0:
+            return
+        vector = vectorize_query(query)
+        context_id = self._context_id(context, query)
+        now = time.monotonic()
+        with self._lock:
+            slot = None
+            if self._size:
+                slots, similarities = self._best_matches(vector, context_id, now)
+                if len(slots) and similarities[0] >= 0.999:
+                    slot = int(slots[0])
+            if slot is None:
+                if self._size < self.max_entries:
+                    slot = self._size
+                    self._size += 1
+                else:
+                    # Expired entries go first, then the least recently used
+                    slot = int(np.argmin(np.where(self._expires > now, self._last_used, -1.0)))
+                    self.evictions += 1
+            self._vectors[slot] = vector
+            self._contexts[slot] = context_id
+            self._expires[slot] = now + self.ttl
+            self._last_used[slot] = now
+            self._queries[slot] = query
+            self._values[slot] = value
+
+    def clear(self) -> None:
+        with self._lock:
+            self._size = 0
+            self._queries = [None] * self.max_entries
+            self._values = [None] * self.max_entries
+
+    def stats(self) -> Dict:
+        lookups = self.hits + self.misses
+        return {
+            'entries': self._size,
+            'max_entries': self.max_entries,
+            'threshold': self.threshold,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_ratio': round(self.hits / lookups, 4) if lookups else 0.0,
+            'evictions': self.evictions,
+            'invalidations': self.invalidations
+        }
@@ -0,0 +1,184 @@
+import os
+from dotenv import load_dotenv
+
+# Load environment variables from .env file
+load_dotenv()
+
+
+def _int_env(name: str, default: int) -> int:
+    """Read an integer setting from the environment."""
+    value = os.getenv(name)
+    if value is None or not value.strip():
+        return default
+    try:
+        return int(value)
+    except ValueError:
+        print(f"⚠ Invalid value for {name}: {value!r}, using {default}")
+        return default
+
+
+def _float_env(name: str, default: float) -> float:
+    """Read a float setting from the environment."""
+    value = os.getenv(name)
+    if value is None or not value.strip():
+        return default
+    try:
+        return float(value)
+    except ValueError:
+        print(f"⚠ Invalid value for {name}: {value!r}, using {default}")
+        return default
+
+
+# Morphik connection
+MORPHIK_URI = os.getenv("MORPHIK_URI")
+
+# Request timeout (seconds) for every call made through the shared client
+MORPHIK_TIMEOUT = _float_env("MORPHIK_TIMEOUT", 30.0)
+
+# Maximum number of pooled keep-alive connections per worker process
+MORPHIK_POOL_SIZE = _int_env("MORPHIK_POOL_SIZE", 10)
+
+# Seconds an idle pooled connection is kept open before being closed
+MORPHIK_POOL_IDLE_TIMEOUT = _float_env("MORPHIK_POOL_IDLE_TIMEOUT", 60.0)
+
+# Minimum delay (seconds) between reconnect attempts after a failure
+MORPHIK_RECONNECT_BACKOFF = _float_env("MORPHIK_RECONNECT_BACKOFF", 5.0)
+
+# Local data (caches, indexes, manifests) written by the backend scripts
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+DATA_DIR = os.getenv("ECSS_DATA_DIR", os.path.join(BACKEND_DIR, "data"))
+
+# Touched whenever ingestion changes the corpus; watched by API workers
+CORPUS_STAMP_PATH = os.path.join(DATA_DIR, "corpus.stamp")
+
+# /api/search result cache
+SEARCH_CACHE_SIZE = _int_env("SEARCH_CACHE_SIZE", 512)
+SEARCH_CACHE_TTL = _float_env("SEARCH_CACHE_TTL", 3600.0)
+
+# Optional Redis URL shared by all workers, e.g. redis://localhost:6379/0
+SEARCH_CACHE_REDIS_URL = os.getenv("SEARCH_CACHE_REDIS_URL")
+
+# ECSS PDF trees
+REPO_ROOT = os.path.dirname(BACKEND_DIR)
+STANDARDS_DIR = os.getenv("ECSS_STANDARDS_DIR", os.path.join(REPO_ROOT, "ECSS Published Standards"))
+ACTIVE_STANDARDS_DIR = os.path.join(STANDARDS_DIR, "1-Active Standards")
+SUPERSEDED_STANDARDS_DIR = os.path.join(STANDARDS_DIR, "2-Superseded Standards")
+
+# Parallel ingestion: concurrent uploads and Morphik quota (uploads per second)
+INGEST_WORKERS = _int_env("INGEST_WORKERS", 4)
+INGEST_RATE_LIMIT = _float_env("INGEST_RATE_LIMIT", 2.0)
+INGEST_RATE_BURST = _int_env("INGEST_RATE_BURST", 4)
+
+# Content-hash manifest of uploaded PDFs (skips unchanged files on re-runs)
+INGEST_MANIFEST_PATH = os.path.join(DATA_DIR, "ingest_manifest.sqlite3")
+
+# Write-ahead journal of per-file ingestion state, so interrupted runs resume
+# and concurrent runs never upload the same file twice. A run holds a file for
+# INGEST_LEASE_SECONDS while uploading it; transiently failed files are retried
+# by later runs after INGEST_JOURNAL_BACKOFF seconds, doubling up to
+# INGEST_JOURNAL_MAX_BACKOFF, and count as permanently failed after
+# INGEST_JOURNAL_MAX_ATTEMPTS attempts
+INGEST_JOURNAL_PATH = os.path.join(DATA_DIR, "ingest_journal.sqlite3")
+INGEST_LEASE_SECONDS = _float_env("INGEST_LEASE_SECONDS", 900.0)
+INGEST_JOURNAL_BACKOFF = _float_env("INGEST_JOURNAL_BACKOFF", 60.0)
+INGEST_JOURNAL_MAX_BACKOFF = _float_env("INGEST_JOURNAL_MAX_BACKOFF", 3600.0)
+INGEST_JOURNAL_MAX_ATTEMPTS = _int_env("INGEST_JOURNAL_MAX_ATTEMPTS", 8)
+
+# Maximum seconds to wait for Morphik to finish processing uploaded documents
+PROCESSING_TIMEOUT = _float_env("PROCESSING_TIMEOUT", 1800.0)
+
+# PDFs above either limit are uploaded as page-range parts (0 disables a limit);
+# parts are written under SPLIT_PARTS_DIR and removed once uploaded
+SPLIT_MAX_BYTES = _int_env("SPLIT_MAX_BYTES", 3_000_000)
+SPLIT_MAX_PAGES = _int_env("SPLIT_MAX_PAGES", 100)
+SPLIT_PARTS_DIR = os.path.join(DATA_DIR, "split_parts")
+
+# Concurrent part uploads per split PDF, and attempts per upload (transient
+# errors are retried with exponential backoff starting at INGEST_RETRY_BACKOFF seconds)
+SPLIT_UPLOAD_WORKERS = _int_env("SPLIT_UPLOAD_WORKERS", 4)
+INGEST_UPLOAD_ATTEMPTS = _int_env("INGEST_UPLOAD_ATTEMPTS", 3)
+INGEST_RETRY_BACKOFF = _float_env("INGEST_RETRY_BACKOFF", 2.0)
+
+# Local BM25 index over extracted PDF text (built by local_index.py)
+LOCAL_INDEX_PATH = os.path.join(DATA_DIR, "local_index.json.gz")
+
+# (standard, clause/requirement ID) index built by clause_index.py; searches
+# that are only a clause reference ("ECSS-E-ST-40C 5.4.2.1a") are answered from it
+CLAUSE_INDEX_PATH = os.path.join(DATA_DIR, "clause_index.json.gz")
+
+# Citations between standards found in their text (built by citation_graph.py),
+# and the deepest transitive closure /api/related computes
+CITATION_GRAPH_PATH = os.path.join(DATA_DIR, "citation_graph.json.gz")
+CITATION_MAX_DEPTH = _int_env("CITATION_MAX_DEPTH", 5)
+
+# Term -> definitions index built by glossary_index.py from the ECSS glossary
+# and every standard's "Terms, definitions and abbreviated terms" clause
+GLOSSARY_INDEX_PATH = os.path.join(DATA_DIR, "glossary_index.json.gz")
+
+# /api/suggest typeahead: besides standard numbers and metadata, offer the
+# SUGGEST_TERMS terms of the local index that occur on the most pages
+SUGGEST_TERMS = _int_env("SUGGEST_TERMS", 20000)
+
+# Sampled, append-only log of /api/search requests (query, filters, latency,
+# cache hit); QUERY_LOG_SAMPLE_RATE of searches are written, and the file is
+# rotated to a single .1 backup past QUERY_LOG_MAX_BYTES
+QUERY_LOG_PATH = os.path.join(DATA_DIR, "query_log.jsonl")
+QUERY_LOG_SAMPLE_RATE = _float_env("QUERY_LOG_SAMPLE_RATE", 0.1)
+QUERY_LOG_MAX_BYTES = _int_env("QUERY_LOG_MAX_BYTES", 20_000_000)
+
+# Cache warm-up: at startup (and every WARMUP_INTERVAL seconds, 0 = startup
+# only) the WARMUP_QUERIES most frequent searches logged in the last
+# WARMUP_WINDOW seconds are replayed, WARMUP_CONCURRENCY at a time (0 queries = off)
+WARMUP_QUERIES = _int_env("WARMUP_QUERIES", 50)
+WARMUP_CONCURRENCY = _int_env("WARMUP_CONCURRENCY", 2)
+WARMUP_INTERVAL = _float_env("WARMUP_INTERVAL", 0.0)
+WARMUP_WINDOW = _float_env("WARMUP_WINDOW", 7 * 86400.0)
+
+# Default /api/search engine: morphik, local or auto
+SEARCH_ENGINE = os.getenv("SEARCH_ENGINE", "morphik")
+
+# Page-level text extracted from the PDFs, one JSONL file per content hash
+TEXT_CACHE_DIR = os.path.join(DATA_DIR, "text_cache")
+
+# Duplicate clusters found by duplicate_detection.py, and the estimated text
+# similarity (Jaccard of word shingles) above which two PDFs count as near-duplicates
+DUPLICATE_REPORT_PATH = os.path.join(DATA_DIR, "duplicates.json")
+DUPLICATE_SIMILARITY = _float_env("DUPLICATE_SIMILARITY", 0.8)
+
+# external_id -> filename/metadata snapshot shared by ingestion and the API
+DOCUMENT_CATALOG_PATH = os.path.join(DATA_DIR, "document_catalog.json")
+DOCUMENT_CATALOG_REFRESH = _float_env("DOCUMENT_CATALOG_REFRESH", 600.0)
+
+# Use ColPali (page image) embeddings for retrieval-only search; text chunks
+# are returned otherwise, which is what the result list can display
+RETRIEVAL_USE_COLPALI = os.getenv("RETRIEVAL_USE_COLPALI", "false").lower() in ("1", "true", "yes")
+
+# Per-call deadlines (seconds) for Morphik reads (retrieval, document lookups)
+# and for LLM completions; the request is answered from the degraded path
+# (stale cache or local index) when a deadline passes
+MORPHIK_READ_DEADLINE = _float_env("MORPHIK_READ_DEADLINE", 5.0)
+MORPHIK_QUERY_DEADLINE = _float_env("MORPHIK_QUERY_DEADLINE", 20.0)
+
+# Send a second, identical read when the first has not answered after this
+# many seconds and use whichever finishes first (0 disables hedging)
+MORPHIK_HEDGE_DELAY = _float_env("MORPHIK_HEDGE_DELAY", 0.0)
+
+# Circuit breaker: open when at least CIRCUIT_MIN_CALLS calls in the last
+# CIRCUIT_WINDOW seconds failed at CIRCUIT_FAILURE_RATE or more, then fail
+# fast for CIRCUIT_OPEN_SECONDS before letting a trial call through
+CIRCUIT_FAILURE_RATE = _float_env("CIRCUIT_FAILURE_RATE", 0.5)
+CIRCUIT_MIN_CALLS = _int_env("CIRCUIT_MIN_CALLS", 10)
+CIRCUIT_WINDOW = _float_env("CIRCUIT_WINDOW", 30.0)
+CIRCUIT_OPEN_SECONDS = _float_env("CIRCUIT_OPEN_SECONDS", 15.0)
+
+# Coalesce identical concurrent searches into one Morphik call per worker;
+# with SINGLE_FLIGHT_SHARED (requires SEARCH_CACHE_REDIS_URL) also across
+# workers, waiting at most SINGLE_FLIGHT_WAIT seconds for another worker
+SINGLE_FLIGHT_SHARED = os.getenv("SINGLE_FLIGHT_SHARED", "false").lower() in ("1", "true", "yes")
+SINGLE_FLIGHT_WAIT = _float_env("SINGLE_FLIGHT_WAIT", 10.0)
+
+# Semantic cache for generated answers: a paraphrased query whose local
+# query vector has at least SEMANTIC_CACHE_THRESHOLD cosine similarity to a
+# cached one (same filters) reuses its answer (0 entries disables it)
+SEMANTIC_CACHE_SIZE = _int_env("SEMANTIC_CACHE_SIZE", 1024)
+SEMANTIC_CACHE_THRESHOLD = _float_env("SEMANTIC_CACHE_THRESHOLD", 0.9)
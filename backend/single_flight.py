@@ -0,0 +1,252 @@
+import asyncio
+import threading
+import time
+import uuid
+from typing import Awaitable, Callable, Dict, Optional, Tuple
+
+import settings
+
+# Seconds between checks for a result computed by another worker
+SHARED_POLL_INTERVAL = 0.05
+
+REDIS_LOCK_PREFIX = "ecss:flight:"
+
+# Delete the lock only if this worker still owns it
+_RELEASE_SCRIPT = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('del', KEYS[1])
+end
+return 0
+"""
+
+
+class RedisFlightLock:
+    """
+    Cross-worker "one caller computes" lock stored in Redis.
+
+    The lock expires on its own after `ttl` seconds, so a worker that dies
+    mid-call never blocks the others for longer than that.
+    """
+
+    def __init__(self, url: str, ttl: float):
+        import redis  # Optional dependency, only needed across workers
+
+        self.ttl = ttl
+        self._redis = redis.Redis.from_url(url, socket_timeout=0.5, socket_connect_timeout=0.5)
+        self._release = self._redis.register_script(_RELEASE_SCRIPT)
+
+    def acquire(self, key: str) -> Optional[str]:
+        """Return an ownership token, or None when another worker holds the lock."""
+        token = uuid.uuid4().hex
+        if self._redis.set(REDIS_LOCK_PREFIX + key, token, nx=True, px=max(1, int(self.ttl * 1000))):
+            return token
+        return None
+
+    def held(self, key: str) -> bool:
+        return bool(self._redis.exists(REDIS_LOCK_PREFIX + key))
+
+    def release(self, key: str, token: str) -> None:
+        self._release(keys=[REDIS_LOCK_PREFIX + key], args=[token])
+
+
+def _make_shared_lock(shared: bool, redis_url: Optional[str], wait: float) -> Optional[RedisFlightLock]:
+    if not shared:
+        return None
+    if not redis_url:
+        print("⚠ SINGLE_FLIGHT_SHARED needs SEARCH_CACHE_REDIS_URL, coalescing within each worker only")
+        return None
+    try:
+        return RedisFlightLock(redis_url, wait)
+    except ImportError:
+        print("⚠ SINGLE_FLIGHT_SHARED is set but the 'redis' package is not installed")
+        return None
+
+
+class _Flight:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error: Optional[BaseException] = None
+
+
+class SingleFlight:
+    """
+    Coalesce concurrent calls for the same key into one.
+
+    The first caller for a key (the leader) runs the function; callers
+    arriving while it is in flight wait for it and receive the same result
+    or exception. With a shared lock, a leader that finds another worker
+    computing the same key polls `lookup` (e.g. the shared search cache)
+    for that worker's result instead of calling upstream itself, and only
+    computes on its own once the other worker has finished without one.
+    """
+
+    def __init__(
+        self,
+        shared: bool = settings.SINGLE_FLIGHT_SHARED,
+        redis_url: Optional[str] = settings.SEARCH_CACHE_REDIS_URL,
+        wait: float = settings.SINGLE_FLIGHT_WAIT
+    ):
+        self.wait = wait
+        self.shared = _make_shared_lock(shared, redis_url, wait)
+        self._flights: Dict[str, _Flight] = {}
+        self._lock = threading.Lock()
+        self.leaders = 0
+        self.followers = 0
+        self.shared_hits = 0
+
+    def do(
+        self,
+        key: str,
+        function: Callable,
+        lookup: Optional[Callable[[str], object]] = None
+    ) -> Tuple[object, bool]:
+        """
+        Run function() once for all concurrent callers with this key.
+
+        Returns:
+            (result, shared) where shared is True when the result was
+            computed by another request
+        """
+        with self._lock:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+                self.leaders += 1
+            else:
+                self.followers += 1
+
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.result, True
+
+        try:
+            result, shared = self._run_shared(key, function, lookup)
+            flight.result = result
+            return result, shared
+        except BaseException as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._flights[key]
+            flight.done.set()
+
+    def _run_shared(self, key: str, function: Callable, lookup: Optional[Callable]) -> Tuple[object, bool]:
+        if self.shared is None or lookup is None:
+            return function(), False
+
+        try:
+            token = self.shared.acquire(key)
+            if token is None:
+                deadline = time.monotonic() + self.wait
+                while time.monotonic() < deadline:
+                    value = lookup(key)
+                    if value is not None:
+                        self.shared_hits += 1
+                        return value, True
+                    if not self.shared.held(key):
+                        break
+                    time.sleep(SHARED_POLL_INTERVAL)
+        except Exception as e:
+            print(f"⚠ Shared single-flight lock unavailable: {e}")
+            token = None
+
+        try:
+            return function(), False
+        finally:
+            if token is not None:
+                try:
+                    self.shared.release(key, token)
+                except Exception as e:
+                    print(f"⚠ Shared single-flight lock unavailable: {e}")
+
+    def stats(self) -> Dict:
+        return {
+            'in_flight': len(self._flights),
+            'leaders': self.leaders,
+            'followers': self.followers,
+            'shared_hits': self.shared_hits,
+            'shared': self.shared is not None
+        }
+
+
+class AsyncSingleFlight(SingleFlight):
+    """
+    SingleFlight for coroutines; Redis calls run in threads to keep the event loop free.
+
+    The shared call runs in a task owned by the flight rather than in the
+    leader's request task, so a leader whose client disconnects (and whose
+    task is cancelled) only stops waiting: the call goes on for the
+    followers, and its result still reaches the cache.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._tasks: Dict[str, asyncio.Task] = {}
+
+    async def do_async(
+        self,
+        key: str,
+        function: Callable[[], Awaitable],
+        lookup: Optional[Callable[[str], object]] = None
+    ) -> Tuple[object, bool]:
+        """do() for a coroutine function; see SingleFlight.do()."""
+        task = self._tasks.get(key)
+        if task is not None:
+            self.followers += 1
+            # shield(): a caller that is cancelled must not cancel the shared call
+            result, _ = await asyncio.shield(task)
+            return result, True
+
+        task = self._tasks[key] = asyncio.ensure_future(self._run_shared_async(key, function, lookup))
+        task.add_done_callback(lambda done: self._finish(key, done))
+        self.leaders += 1
+        return await asyncio.shield(task)
+
+    def _finish(self, key: str, task: asyncio.Task) -> None:
+        if self._tasks.get(key) is task:
+            del self._tasks[key]
+        if not task.cancelled():
+            # Mark the exception retrieved when every caller has gone
+            task.exception()
+
+    async def _run_shared_async(
+        self,
+        key: str,
+        function: Callable,
+        lookup: Optional[Callable]
+    ) -> Tuple[object, bool]:
+        if self.shared is None or lookup is None:
+            return await function(), False
+
+        try:
+            token = await asyncio.to_thread(self.shared.acquire, key)
+            if token is None:
+                deadline = time.monotonic() + self.wait
+                while time.monotonic() < deadline:
+                    value = await asyncio.to_thread(lookup, key)
+                    if value is not None:
+                        self.shared_hits += 1
+                        return value, True
+                    if not await asyncio.to_thread(self.shared.held, key):
+                        break
+                    await asyncio.sleep(SHARED_POLL_INTERVAL)
+        except Exception as e:
+            print(f"⚠ Shared single-flight lock unavailable: {e}")
+            token = None
+
+        try:
+            return await function(), False
+        finally:
+            if token is not None:
+                try:
+                    await asyncio.to_thread(self.shared.release, key, token)
+                except Exception as e:
+                    print(f"⚠ Shared single-flight lock unavailable: {e}")
+
+    def stats(self) -> Dict:
+        return {**super().stats(), 'in_flight': len(self._tasks)}
@@ -0,0 +1,187 @@
+import random
+import sys
+import threading
+import time
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from morphik import Morphik
+
+# Morphik system_metadata['status'] values that will not change any more
+TERMINAL_STATES = {'completed', 'failed'}
+
+# Maximum document IDs fetched per batch_get_documents call
+STATUS_BATCH_SIZE = 100
+
+
+def fetch_statuses(db: Morphik, document_ids: List[str]) -> Dict[str, str]:
+    """Fetch system_metadata['status'] for many documents in as few calls as possible."""
+    statuses = {}
+    for i in range(0, len(document_ids), STATUS_BATCH_SIZE):
+        batch = document_ids[i:i + STATUS_BATCH_SIZE]
+        try:
+            for doc in db.batch_get_documents(batch):
+                system_metadata = getattr(doc, 'system_metadata', None) or {}
+                statuses[doc.external_id] = system_metadata.get('status', 'unknown')
+        except Exception as e:
+            print(f"\n⚠ Batch status lookup failed ({e}), polling individually")
+            for doc_id in batch:
+                try:
+                    statuses[doc_id] = db.get_document_status(doc_id).get('status', 'unknown')
+                except Exception as e:
+                    print(f"\n⚠ Status lookup failed for {doc_id}: {e}")
+    return statuses
+
+
+def backoff_delays(
+    initial: float = 1.0,
+    maximum: float = 30.0,
+    factor: float = 2.0
+) -> Iterator[float]:
+    """Exponentially growing poll intervals with jitter (half to full interval)."""
+    interval = initial
+    while True:
+        yield random.uniform(interval / 2, interval)
+        interval = min(maximum, interval * factor)
+
+
+class StatusTracker:
+    """
+    Background poller for the processing status of uploaded documents.
+
+    Documents can be added while uploads are still running. A single thread
+    polls every pending document in one batched request per round, backing
+    off exponentially (with jitter) while nothing changes and starting over
+    at the initial interval when new documents are added. Each document is
+    reported as soon as it reaches a terminal state, so callers never wait
+    on the slowest document to learn about the others.
+    """
+
+    def __init__(
+        self,
+        db: Morphik,
+        initial_interval: float = 1.0,
+        max_interval: float = 30.0,
+        on_complete: Optional[Callable[[str, str], None]] = None,
+        show_progress: bool = True
+    ):
+        self.db = db
+        self.initial_interval = initial_interval
+        self.max_interval = max_interval
+        self.on_complete = on_complete
+        self.show_progress = show_progress
+
+        self.names: Dict[str, str] = {}
+        self.statuses: Dict[str, str] = {}
+        self.polls = 0
+        self._pending: List[str] = []
+        self._lock = threading.Lock()
+        self._changed = threading.Event()
+        self._stopped = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._started = time.monotonic()
+
+    def add(self, document_id: str, name: Optional[str] = None) -> None:
+        """Start tracking a document."""
+        with self._lock:
+            if document_id in self.statuses:
+                return
+            self.names[document_id] = name or document_id
+            self.statuses[document_id] = 'processing'
+            self._pending.append(document_id)
+        self._changed.set()
+        if self._thread is None:
+            self.start()
+
+    def start(self) -> None:
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="status-tracker", daemon=True)
+            self._thread.start()
+
+    def stop(self) -> None:
+        self._stopped.set()
+        self._changed.set()
+
+    def pending(self) -> List[str]:
+        with self._lock:
+            return list(self._pending)
+
+    def _run(self) -> None:
+        delays = backoff_delays(self.initial_interval, self.max_interval)
+        while not self._stopped.is_set():
+            pending = self.pending()
+            if not pending:
+                self._changed.wait()
+                self._changed.clear()
+                delays = backoff_delays(self.initial_interval, self.max_interval)
+                continue
+
+            for doc_id, status in fetch_statuses(self.db, pending).items():
+                self._update(doc_id, status)
+            self.polls += 1
+            self._print_progress()
+
+            if self._changed.wait(next(delays)):
+                self._changed.clear()
+                delays = backoff_delays(self.initial_interval, self.max_interval)
+
+    def _update(self, doc_id: str, status: str) -> None:
+        with self._lock:
+            if doc_id not in self._pending:
+                return
+            self.statuses[doc_id] = status
+            if status not in TERMINAL_STATES:
+                return
+            self._pending.remove(doc_id)
+        if self.on_complete is not None:
+            self.on_complete(doc_id, status)
+
+    def counts(self) -> Dict[str, int]:
+        with self._lock:
+            statuses = list(self.statuses.values())
+        return {
+            'completed': statuses.count('completed'),
+            'failed': statuses.count('failed'),
+            'pending': sum(1 for s in statuses if s not in TERMINAL_STATES)
+        }
+
+    def _print_progress(self) -> None:
+        if not self.show_progress:
+            return
+        counts = self.counts()
+        elapsed = time.monotonic() - self._started
+        sys.stdout.write(
+            f"\r  Processing: {counts['completed']} completed, {counts['failed']} failed, "
+            f"{counts['pending']} pending ({elapsed:.0f}s, {self.polls} polls)"
+        )
+        sys.stdout.flush()
+
+    def wait(self, timeout: Optional[float] = None) -> Dict[str, str]:
+        """
+        Block until every tracked document is in a terminal state or the timeout expires.
+
+        Returns the last known status of every tracked document; documents
+        still processing at the timeout keep their non-terminal status.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while self.pending():
+            if deadline is not None and time.monotonic() >= deadline:
+                break
+            time.sleep(0.1)
+        self.stop()
+        if self.show_progress:
+            print()
+        with self._lock:
+            return dict(self.statuses)
+
+
+def wait_for_documents(
+    db: Morphik,
+    documents: Iterable[Tuple[str, str]],
+    timeout: Optional[float] = None,
+    on_complete: Optional[Callable[[str, str], None]] = None
+) -> Dict[str, str]:
+    """Track (document_id, name) pairs until all finish processing or the timeout expires."""
+    tracker = StatusTracker(db, on_complete=on_complete)
+    for document_id, name in documents:
+        tracker.add(document_id, name)
+    return tracker.wait(timeout)
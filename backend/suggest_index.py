@@ -0,0 +1,154 @@
+import argparse
+import heapq
+import os
+import time
+from bisect import bisect_left
+from typing import Dict, List, Optional
+
+import settings
+from clause_index import document_preference
+from ingest_documents import DASHES, extract_metadata_from_path, parse_standard_id
+from local_index import LocalIndex
+
+# Suggestion weights: standards rank above metadata values, which rank above
+# indexed terms (weighted by the number of pages they occur on)
+STANDARD_WEIGHT = 1_000_000
+METADATA_WEIGHT = 500_000
+
+# Prefixes up to this length match large ranges; their top suggestions are precomputed
+PRECOMPUTED_PREFIX_LENGTH = 2
+
+# Largest limit a lookup may ask for (and the size of precomputed lists)
+MAX_SUGGESTIONS = 25
+
+
+def normalize_prefix(text: str) -> str:
+    """Lowercase, plain hyphens and single spaces, as suggestion keys are stored."""
+    return ' '.join(text.translate(DASHES).lower().split())
+
+
+class SuggestIndex:
+    """
+    Prefix index for typeahead over standard numbers, metadata and terms.
+
+    Keys are kept in one sorted array; the suggestions for a prefix are the
+    contiguous range found by binary search, ranked by weight. Standards
+    are reachable with and without the "ECSS-" prefix.
+    """
+
+    def __init__(self, suggestions: List[Dict]):
+        self.suggestions = suggestions
+        pairs = []
+        for suggestion_id, suggestion in enumerate(suggestions):
+            key = normalize_prefix(suggestion['text'])
+            pairs.append((key, suggestion_id))
+            if key.startswith('ecss-'):
+                pairs.append((key[len('ecss-'):], suggestion_id))
+        pairs.sort()
+        self.keys = [key for key, _ in pairs]
+        self.ids = [suggestion_id for _, suggestion_id in pairs]
+        self.weights = [suggestion['weight'] for suggestion in suggestions]
+
+        self.top: Dict[str, List[int]] = {}
+        for length in range(1, PRECOMPUTED_PREFIX_LENGTH + 1):
+            for prefix in {key[:length] for key in self.keys if len(key) >= length}:
+                self.top[prefix] = self._rank(prefix, MAX_SUGGESTIONS)
+
+    @classmethod
+    def build(
+        cls,
+        directories: List[str],
+        local_index: Optional[LocalIndex] = None,
+        term_count: int = settings.SUGGEST_TERMS
+    ) -> "SuggestIndex":
+        """
+        Collect suggestions from the PDF trees and the local index.
+
+        Args:
+            directories: Standards directories to list
+            local_index: Local BM25 index supplying frequent terms (optional)
+            term_count: Most frequent indexed terms to include
+
+        Returns:
+            SuggestIndex over one suggestion per standard designation (its
+            preferred issue), per branch/discipline name and per term
+        """
+        documents = []
+        for directory in directories:
+            for root, _, files in os.walk(directory):
+                for filename in files:
+                    if filename.lower().endswith('.pdf'):
+                        documents.append({'filename': filename,
+                                          'metadata': extract_metadata_from_path(os.path.join(root, filename))})
+        documents.sort(key=document_preference)
+
+        suggestions = []
+        seen = set()
+        metadata_counts: Dict[tuple, int] = {}
+        for document in documents:
+            metadata = document['metadata']
+            for field in ('branch', 'discipline'):
+                name = metadata.get(f"{field}_name")
+                if name and name != 'Unknown':
+                    key = (field, metadata.get(field), name)
+                    metadata_counts[key] = metadata_counts.get(key, 0) + 1
+            standard = parse_standard_id(document['filename'])
+            if standard is None or standard[0] in seen:
+                continue
+            seen.add(standard[0])
+            suggestions.append({
+                'text': f"ECSS-{standard[0]}",
+                'kind': 'standard',
+                'filename': document['filename'],
+                'status': metadata.get('standard_status'),
+                'weight': STANDARD_WEIGHT + (1 if metadata.get('standard_status') == 'Active' else 0)
+            })
+
+        for (field, value, name), count in metadata_counts.items():
+            suggestions.append({'text': name, 'kind': field, 'value': value, 'weight': METADATA_WEIGHT + count})
+
+        if local_index is not None:
+            terms = ((len(postings) // 2, term) for term, postings in local_index.postings.items()
+                     if term.isalpha() and len(term) > 2 and term != 'ecss')
+            for pages, term in heapq.nlargest(term_count, terms):
+                suggestions.append({'text': term, 'kind': 'term', 'weight': pages})
+        return cls(suggestions)
+
+    def _rank(self, prefix: str, limit: int) -> List[int]:
+        lo = bisect_left(self.keys, prefix)
+        hi = bisect_left(self.keys, prefix + '\uffff', lo)
+        # A suggestion can match through two keys, so take enough to fill the limit after dedup
+        candidates = heapq.nlargest(2 * limit, self.ids[lo:hi], key=self.weights.__getitem__)
+        return list(dict.fromkeys(candidates))[:limit]
+
+    def suggest(self, prefix: str, limit: int = 10) -> List[Dict]:
+        """Highest-weighted suggestions whose text (or standard number without "ECSS-") starts with prefix."""
+        prefix = normalize_prefix(prefix)
+        if not prefix:
+            return []
+        limit = min(limit, MAX_SUGGESTIONS)
+        ranked = self.top.get(prefix)
+        ranked = ranked[:limit] if ranked is not None else self._rank(prefix, limit)
+        return [{k: v for k, v in self.suggestions[i].items() if k != 'weight'} for i in ranked]
+
+    def stats(self) -> Dict:
+        return {'suggestions': len(self.suggestions), 'keys': len(self.keys)}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Try the /api/suggest typeahead index")
+    parser.add_argument('prefixes', nargs='+', help="Prefixes to complete")
+    parser.add_argument('--limit', type=int, default=10, help="Suggestions per prefix")
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    index = SuggestIndex.build([settings.ACTIVE_STANDARDS_DIR, settings.SUPERSEDED_STANDARDS_DIR],
+                               LocalIndex.load(settings.LOCAL_INDEX_PATH))
+    print(f"Built {index.stats()['suggestions']} suggestions in {time.perf_counter() - started:.2f}s")
+    for prefix in args.prefixes:
+        started = time.perf_counter()
+        suggestions = index.suggest(prefix, args.limit)
+        elapsed = (time.perf_counter() - started) * 1e6
+        print(f"\n{prefix!r} ({elapsed:.0f} µs):")
+        for suggestion in suggestions:
+            print(f"  {suggestion['text']} [{suggestion['kind']}]")
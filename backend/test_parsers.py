@@ -0,0 +1,103 @@
+from clause_index import parse_clause_reference
+from glossary_index import GlossaryIndex, parse_definition_query
+from pdf_split import plan_page_ranges
+from search_service import definition_search_response, parse_search_request
+
+# query -> expected parse_clause_reference() result
+CLAUSE_REFERENCES = {
+    "ECSS-E-ST-40C 5.4.2.1a": {'standard': 'E-ST-40C', 'clause': '5.4.2.1a'},
+    "ECSS‑E‑ST‑40C clause 5.4.2.1 a": {'standard': 'E-ST-40C', 'clause': '5.4.2.1a'},
+    "ECSS-Q-ST-80C Rev.1 6.2.3": {'standard': 'Q-ST-80C', 'clause': '6.2.3'},
+    "clause 5.8.3.2": {'standard': None, 'clause': '5.8.3.2'},
+    "ECSS-E-ST-32-10_0110001": {'standard': None, 'clause': 'ECSS-E-ST-32-10_0110001'},
+    "5": None,
+    "ECSS-E-ST-40C": None,
+    "software 5.4": None,
+    "thermal vacuum test": None,
+}
+
+# query -> expected parse_definition_query() result
+DEFINITION_QUERIES = {
+    "what is a critical item?": 'critical item',
+    "define configuration baseline": 'configuration baseline',
+    "definition of COTS": 'cots',
+    "meaning of the term \"MEOP\"": 'meop',
+    "critical item": None,
+    "how to test software": None,
+}
+
+# (page_count, size, max_pages, max_bytes) -> expected plan_page_ranges() result
+PAGE_RANGES = {
+    (0, 0, 100, 0): [],
+    (50, 10**6, 100, 0): [(1, 50)],
+    (250, 0, 100, 0): [(1, 84), (85, 168), (169, 250)],
+    (10, 10**8, 0, 20 * 10**6): [(1, 2), (3, 4), (5, 6), (7, 8), (9, 10)],
+    (3, 10**9, 100, 1): [(1, 1), (2, 2), (3, 3)],
+}
+
+
+def check_cases(name: str, function, cases: dict) -> int:
+    failures = 0
+    for arguments, expected in cases.items():
+        result = function(*arguments) if isinstance(arguments, tuple) else function(arguments)
+        if result == expected:
+            print(f"✓ {name}({arguments!r})")
+        else:
+            print(f"✗ {name}({arguments!r}) = {result!r}, expected {expected!r}")
+            failures += 1
+    return failures
+
+
+def test_parse_clause_reference():
+    """Clause and requirement references are recognized, topical queries are not."""
+    assert check_cases('parse_clause_reference', parse_clause_reference, CLAUSE_REFERENCES) == 0
+
+
+def test_parse_definition_query():
+    """Definitional questions yield their normalized term."""
+    assert check_cases('parse_definition_query', parse_definition_query, DEFINITION_QUERIES) == 0
+
+
+def test_plan_page_ranges():
+    """Parts respect both limits and cover every page exactly once."""
+    assert check_cases('plan_page_ranges', plan_page_ranges, PAGE_RANGES) == 0
+
+
+def test_definition_search_response():
+    """Questions, and bare defined terms unless an engine was chosen, are answered from the glossary."""
+    index = GlossaryIndex({
+        'documents': [{'path': 'S.pdf', 'filename': 'ECSS-S-ST-00-01C(1October2012).pdf',
+                       'designation': 'S-ST-00-01C', 'base': 'S-ST-00-01', 'metadata': {}}],
+        'entries': [[0, '2.3.50', 12, 'critical item', 'item that needs specific attention', ''],
+                    [0, '2.3.120', 20, 'maximum expected operating pressure (MEOP)', 'highest pressure', '']]
+    })
+    # (query, engine parameter) -> expected term
+    cases = {
+        ("what is a critical item?", None): 'critical item',
+        ("what is a critical item?", 'local'): 'critical item',
+        ("critical item", None): 'critical item',
+        ("critical item", 'auto'): 'critical item',
+        ("critical item", 'local'): None,
+        ("critical item", 'morphik'): None,
+        ("MEOP", None): 'maximum expected operating pressure (MEOP)',
+        ("critical item list for the propulsion subsystem", None): None,
+        ("software verification", None): None,
+    }
+    failures = 0
+    for (query, engine), expected in cases.items():
+        params, _ = parse_search_request({'q': query, 'engine': engine} if engine else {'q': query})
+        response = definition_search_response(index, params)
+        term = response['term'] if response else None
+        print(f"{'✓' if term == expected else '✗'} "
+              f"definition_search_response({query!r}, engine={engine}) -> {term!r}")
+        failures += term != expected
+    assert failures == 0
+
+
+if __name__ == "__main__":
+    print("\n=== Parser Regression Checks ===\n")
+    test_parse_clause_reference()
+    test_parse_definition_query()
+    test_plan_page_ranges()
+    test_definition_search_response()
+    print("\n✓ All parser checks passed (semantic cache near misses: python test_semantic_cache.py)")
@@ -0,0 +1,74 @@
+from semantic_cache import SemanticCache, exact_terms
+
+CONTEXT = 'filters:{}|engine:morphik|generate'
+
+# (cached query, new query): paraphrases that must reuse the cached answer
+PARAPHRASES = [
+    ("thermal vacuum test requirements", "requirements for TVAC testing"),
+    ("what are the software verification requirements", "software verification requirements"),
+    ("requirements of ECSS-E-ST-40C clause 5.4.2", "ECSS-E-ST-40C clause 5.4.2 requirements"),
+]
+
+# Near misses that must not: other identifiers, opposite meaning
+NEAR_MISSES = [
+    ("requirements of ECSS-E-ST-40C clause 5.4.2", "requirements of ECSS-E-ST-40C clause 5.4.3"),
+    ("software requirements of ECSS-E-ST-40C", "software requirements of ECSS-E-ST-40B"),
+    ("software testing required", "software testing not required"),
+    ("is software testing required", "isn't software testing required"),
+    ("when shall software be tested", "when may software be tested"),
+]
+
+
+def lookup(cached_query: str, query: str):
+    cache = SemanticCache(max_entries=8)
+    cache.set(cached_query, CONTEXT, {'answer': cached_query})
+    return cache.get(query, CONTEXT)
+
+
+def test_paraphrases_hit():
+    """Paraphrases of a cached query are answered from the cache."""
+    failures = 0
+    for cached_query, query in PARAPHRASES:
+        match = lookup(cached_query, query)
+        if match is not None and match[0]['answer'] == cached_query:
+            print(f"✓ {query!r} -> {cached_query!r} ({match[2]:.3f})")
+        else:
+            print(f"✗ {query!r} missed {cached_query!r}")
+            failures += 1
+    assert failures == 0
+
+
+def test_near_misses_miss():
+    """Queries differing in an identifier, a negation or a modal verb get their own answer."""
+    failures = 0
+    for cached_query, query in NEAR_MISSES:
+        match = lookup(cached_query, query)
+        if match is None:
+            print(f"✓ {query!r} does not match {cached_query!r}")
+        else:
+            print(f"✗ {query!r} served the answer to {cached_query!r} ({match[2]:.3f})")
+            failures += 1
+    assert failures == 0
+
+
+def test_exact_terms():
+    """Identifiers and negation are extracted for the exact-match context."""
+    cases = {
+        "ECSS-E-ST-40C clause 5.4.2.1a": "5.4.2.1a ecss-e-st-40c",
+        "software testing not required": "!not",
+        "thermal vacuum test": "",
+    }
+    failures = 0
+    for query, expected in cases.items():
+        terms = exact_terms(query)
+        print(f"{'✓' if terms == expected else '✗'} exact_terms({query!r}) = {terms!r}")
+        failures += terms != expected
+    assert failures == 0
+
+
+if __name__ == "__main__":
+    print("\n=== Semantic Cache Regression Checks ===\n")
+    test_paraphrases_hit()
+    test_near_misses_miss()
+    test_exact_terms()
+    print("\n✓ All semantic cache checks passed")
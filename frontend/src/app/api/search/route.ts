@@ -75,11 +75,27 @@ const mockResults: SearchResult[] = [
   }
 ];
 
-async function searchMorphik(query: string): Promise<SearchResult[]> {
+interface SearchFilters {
+  branch: string;
+  discipline: string;
+  revision: string;
+  status: string;
+  date_from: string;
+  date_to: string;
+}
+
+async function searchMorphik(query: string, filters: SearchFilters): Promise<SearchResult[]> {
   try {
     // Use environment variable for backend API URL, fallback to Render URL
     const apiUrl = process.env.NEXT_PUBLIC_API_URL || 'https://ecss-hunt.onrender.com';
-    const response = await fetch(`${apiUrl}/api/search?q=${encodeURIComponent(query)}`);
+    // engine=auto answers keyword queries from the backend's local index and
+    // falls back to it when Morphik is unavailable. Filters are applied by the
+    // backend during retrieval, before ranking and answer generation.
+    const params = new URLSearchParams({ q: query, engine: 'auto' });
+    for (const [name, value] of Object.entries(filters)) {
+      if (value) params.append(name, value);
+    }
+    const response = await fetch(`${apiUrl}/api/search?${params.toString()}`);
     
     if (!response.ok) {
       throw new Error(`HTTP error! status: ${response.status}`);
@@ -103,6 +119,14 @@ export async function GET(request: NextRequest) {
   const branch = searchParams.get('branch') || '';
   const discipline = searchParams.get('discipline') || '';
   const revision = searchParams.get('revision') || '';
+  const filters: SearchFilters = {
+    branch,
+    discipline,
+    revision,
+    status: searchParams.get('status') || '',
+    date_from: searchParams.get('date_from') || '',
+    date_to: searchParams.get('date_to') || ''
+  };
 
   if (!query.trim()) {
     return NextResponse.json({ results: [], total: 0 });
@@ -111,34 +135,31 @@ export async function GET(request: NextRequest) {
   try {
     console.log(`Searching for: "${query}"`);
     
-    // Try to use Morphik first (Flask backend)
-    let results: SearchResult[];
+    // Try to use Morphik first (Flask backend), which applies the filters itself
+    let finalResults: SearchResult[];
     try {
-      results = await searchMorphik(query);
+      finalResults = await searchMorphik(query, filters);
       console.log('Using Morphik search results from Flask backend');
     } catch (morphikError) {
       console.log('Morphik search failed, using mock data:', morphikError);
       
-      // Fallback to mock data
-      results = mockResults.filter(result => 
+      // Fallback to mock data, filtered locally
+      finalResults = mockResults.filter(result => 
         result.title.toLowerCase().includes(query.toLowerCase()) ||
         result.content.toLowerCase().includes(query.toLowerCase())
       );
-    }
-    
-    // Apply additional filters
-    let finalResults = results;
-    
-    if (branch) {
-      finalResults = finalResults.filter((r: SearchResult) => r.metadata.branch === branch);
-    }
-    
-    if (discipline) {
-      finalResults = finalResults.filter((r: SearchResult) => r.metadata.discipline === discipline);
-    }
-    
-    if (revision) {
-      finalResults = finalResults.filter((r: SearchResult) => r.metadata.revision === revision);
+      
+      if (branch) {
+        finalResults = finalResults.filter((r: SearchResult) => r.metadata.branch === branch);
+      }
+      
+      if (discipline) {
+        finalResults = finalResults.filter((r: SearchResult) => r.metadata.discipline === discipline);
+      }
+      
+      if (revision) {
+        finalResults = finalResults.filter((r: SearchResult) => r.metadata.revision === revision);
+      }
     }
     
     return NextResponse.json({
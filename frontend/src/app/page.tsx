@@ -1,6 +1,6 @@
 'use client';
 
-import { useState } from 'react';
+import { useRef, useState } from 'react';
 import styles from './page.module.css';
 
 interface SearchResult {
@@ -29,6 +29,8 @@ export default function Home() {
   const [results, setResults] = useState<SearchResult[]>([]);
   const [loading, setLoading] = useState(false);
   const [error, setError] = useState<string | null>(null);
+  const [suggestions, setSuggestions] = useState<string[]>([]);
+  const suggestTimer = useRef<ReturnType<typeof setTimeout> | undefined>(undefined);
   const [filters, setFilters] = useState<SearchFilters>({
     branch: '',
     discipline: '',
@@ -68,6 +70,32 @@ export default function Home() {
     }
   };
 
+  const handleQueryChange = (value: string) => {
+    setQuery(value);
+    clearTimeout(suggestTimer.current);
+
+    // Complete the word being typed from the backend's in-memory prefix index
+    const words = value.split(/\s+/);
+    const prefix = words.pop() || '';
+    if (prefix.length < 2) {
+      setSuggestions([]);
+      return;
+    }
+    suggestTimer.current = setTimeout(async () => {
+      try {
+        const apiUrl = process.env.NEXT_PUBLIC_API_URL || 'https://ecss-hunt.onrender.com';
+        const params = new URLSearchParams({ q: prefix, limit: '8' });
+        const response = await fetch(`${apiUrl}/api/suggest?${params.toString()}`);
+        if (!response.ok) return;
+        const data = await response.json();
+        const head = words.length ? `${words.join(' ')} ` : '';
+        setSuggestions((data.suggestions || []).map((s: { text: string }) => head + s.text));
+      } catch {
+        setSuggestions([]);
+      }
+    }, 100);
+  };
+
   const handleKeyPress = (e: React.KeyboardEvent) => {
     if (e.key === 'Enter') {
       handleSearch();
@@ -120,12 +148,18 @@ export default function Home() {
               <input
                 type="text"
                 value={query}
-                onChange={(e) => setQuery(e.target.value)}
+                onChange={(e) => handleQueryChange(e.target.value)}
                 onKeyPress={handleKeyPress}
+                list="query-suggestions"
                 placeholder="Search ECSS standards (e.g., 'software requirements', 'materials testing')"
                 className={styles.searchInput}
                 disabled={loading}
               />
+              <datalist id="query-suggestions">
+                {suggestions.map((suggestion) => (
+                  <option key={suggestion} value={suggestion} />
+                ))}
+              </datalist>
               <button
                 onClick={handleSearch}
                 disabled={loading || !query.trim()}